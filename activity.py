@@ -0,0 +1,101 @@
+"""
+TimerFreak Owner Activity Feed
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Timer events on a user's sequences, newest first, read straight from
+counter_log by its denormalized owner_id. Pages are keyset-paginated on
+(timestamp DESC, id DESC): the cursor names the last row shown and the next
+page is an indexed range read after it, so page 1000 costs the same as
+page 1. Filtering by event type uses (owner_id, event_type, timestamp, id);
+filtering by sequence checks ownership once and reads (sequence_id, timestamp).
+Sequences are named by their public id (slug) in arguments and items.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+
+from models import db, CounterLog, Sequence
+
+ACTIVITY_PAGE_SIZE = 20
+ACTIVITY_MAX_PAGE_SIZE = 100
+
+# Events the timer page records (static/timer.js), for filter menus
+ACTIVITY_EVENT_TYPES = (
+    'sequence_start', 'sequence_end', 'restart_sequence',
+    'timer_start', 'timer_end', 'pause_timer', 'resume_timer', 'restart_timer', 'goto_timer',
+    'timer_copied',
+)
+
+
+def encode_activity_cursor(timestamp, log_id):
+    """Opaque keyset cursor for the (timestamp DESC, id DESC) ordering"""
+    raw = json.dumps([timestamp.isoformat(), log_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_activity_cursor(cursor):
+    """Inverse of encode_activity_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, log_id = json.loads(raw)
+        timestamp = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if not isinstance(log_id, int) or isinstance(log_id, bool):
+        raise ValueError("Invalid cursor")
+    return timestamp, log_id
+
+
+def activity_page(owner_id, cursor=None, limit=ACTIVITY_PAGE_SIZE, sequence_id=None, event_type=None):
+    """
+    One page of the owner's events as (items, next_cursor). sequence_id is a
+    slug. Items are dicts with the CounterLog fields plus the sequence name.
+    """
+    if sequence_id:
+        # One sequence has one owner: check it once, then read that sequence's index
+        internal_id = db.session.query(Sequence.id).filter_by(slug=sequence_id, owner_id=owner_id).scalar()
+        if internal_id is None:
+            return [], None
+        query = CounterLog.query.filter(CounterLog.sequence_id == internal_id)
+    else:
+        query = CounterLog.query.filter(CounterLog.owner_id == owner_id)
+    if event_type:
+        query = query.filter(CounterLog.event_type == event_type)
+    if cursor:
+        after_time, after_id = decode_activity_cursor(cursor)
+        query = query.filter(db.or_(
+            CounterLog.timestamp < after_time,
+            db.and_(CounterLog.timestamp == after_time, CounterLog.id < after_id)
+        ))
+    rows = query.order_by(CounterLog.timestamp.desc(), CounterLog.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Slugs and names only for the sequences on this page
+    sequences = {}
+    if rows:
+        sequences = {s.id: s for s in db.session.query(Sequence.id, Sequence.slug, Sequence.name)
+                     .filter(Sequence.id.in_({row.sequence_id for row in rows}))}
+
+    items = []
+    for row in rows:
+        timestamp = row.timestamp
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        sequence = sequences.get(row.sequence_id)
+        items.append({
+            'id': row.id,
+            'sequence_id': sequence.slug if sequence else None,
+            'sequence_name': (sequence.name if sequence else None) or 'Unnamed Sequence',
+            'timer_order': row.timer_order,
+            'event_type': row.event_type,
+            'timestamp': timestamp,
+        })
+
+    next_cursor = encode_activity_cursor(rows[-1].timestamp, rows[-1].id) if has_more else None
+    return items, next_cursor
@@ -5,11 +5,16 @@ Copyright (c) 2025 - Pet Martino
 This software is licensed under the MIT License.
 See the LICENSE file for more details.
 
+`app` below is the single app instance: configure_app() sets it up and the
+routes in this module are registered on it (wsgi.py serves it). Rarely used
+subsystems (QR codes, OAuth clients, Alembic) are imported on first use so
+worker boot does not pay for them; tests/test_imports.py keeps it that way
+and `flask import-report` tracks the cost.
 """
 from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from .env file
 
-from flask import Flask, render_template, request, redirect, url_for, jsonify, abort, session, send_file
+from flask import Flask, render_template, request, redirect, url_for, jsonify, abort, session, send_file, make_response
 from flask_wtf.csrf import CSRFProtect
 from werkzeug.middleware.proxy_fix import ProxyFix
 import os
@@ -17,22 +22,39 @@ import secrets
 import json
 import logging
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import DateTime, Integer, String, ForeignKey, extract
+from sqlalchemy import DateTime, Integer, String, ForeignKey
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship, joinedload
-from flask_migrate import Migrate
+from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 from collections import defaultdict, OrderedDict
 import time
+import base64
+import binascii
+import math
 from sqlalchemy.types import TypeDecorator, DateTime as SQLADateTime
-from dateutil import parser
 from __version__ import __version__ as APP_VERSION
-import qrcode
 import io
 
 # Import models from models.py
 from models import db, User, Sequence, Timer, Sound, CounterLog, UserActivityLog, OAuthAccount, SubscriptionTier, SequenceShare, PreviewTempData, TimerCategory
+from database import resolve_database_uri, engine_options, register_db_commands, utc_date, utc_hour
+from search import search_sequences, index_sequence, register_search_commands
+from ranking import record_sequence_start, register_ranking_commands
+from assets import init_assets, register_asset_commands
+from compression import CompressionMiddleware
+from live import SESSION_RE as LIVE_SESSION_RE, new_session_code, make_host_token, register_live_commands
+from diagnostics import register_diagnostic_commands
+from journal import journal, register_journal_commands
+from user_stats import bump_user_stats, sequence_stats, register_user_stats_commands
+from dedupe import sequence_content_hash, find_sequence, find_sequences, register_dedupe_commands
+from sequence_view import build_sequence_view, cache_sequence_view, get_sequence_view, format_duration_display
+from activity import ACTIVITY_PAGE_SIZE, ACTIVITY_MAX_PAGE_SIZE, activity_page
+from templating import init_template_cache
+from metrics import init_metrics, metrics
+from auth import init_auth, login_manager, log_user_activity, owner_required
 
 class UTCDateTime(TypeDecorator):
     """
@@ -82,6 +104,7 @@ class UTCDateTime(TypeDecorator):
                 except ValueError:
                     # If still fails, use dateutil.parser as a last resort for robustness
                     try:
+                        from dateutil import parser
                         dt = parser.parse(value)
                     except Exception:
                         return value
@@ -89,6 +112,7 @@ class UTCDateTime(TypeDecorator):
             dt = value
         else:
             try:
+                from dateutil import parser
                 dt = parser.parse(str(value))
             except Exception:
                 return value
@@ -116,67 +140,121 @@ class ScriptNameMiddleware:
                 environ['PATH_INFO'] = path_info[len(script_name)+1:]
         return self.app(environ, start_response)
 
+# Extensions whose decorators are used at module level; bound in configure_app()
+csrf = CSRFProtect()
+
+
+def configure_app(app, config=None):
+    """
+    Set up app: middleware, configuration, extensions, CLI commands and the
+    auth blueprint. `config` is applied over the environment-derived settings
+    before the extensions are initialised. Called once, on the module-level
+    app the routes below are registered on; this is not a factory.
+    """
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_host=1, x_prefix=1)
+    app.wsgi_app = ScriptNameMiddleware(app.wsgi_app)
+    # Compress HTML/JSON/JS/CSS when the client accepts it; set COMPRESS_RESPONSES=0
+    # when a reverse proxy already does this
+    if os.environ.get('COMPRESS_RESPONSES', '1').lower() not in ('0', 'false', 'no'):
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            level=int(os.environ.get('COMPRESS_LEVEL', 6)),
+            min_size=int(os.environ.get('COMPRESS_MIN_SIZE', 500)),
+            brotli_quality=int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4)),
+        )
+    # Content-hashed static URLs once `flask assets-build` has run
+    init_assets(app)
+    # Compiled templates cached on disk for all workers, per release
+    init_template_cache(app, APP_VERSION)
+    # Request, render and query timing for /admin/metrics
+    init_metrics(app)
+
+    # Security: Require FLASK_SECRET_KEY to be set in production
+    secret_key = os.environ.get('FLASK_SECRET_KEY')
+    if not secret_key:
+        # Generate a random secret key for development only
+        secret_key = secrets.token_hex(32)
+        app.logger.warning("FLASK_SECRET_KEY not set. Using auto-generated random key (NOT for production).")
+    app.secret_key = secret_key
+
+    # Database configuration
+    basedir = os.path.abspath(os.path.dirname(__file__))
+
+    # DATABASE_URL selects a server database (e.g. PostgreSQL); without it we fall
+    # back to the root-level or instance/ timerfreak.db SQLite file.
+    database_uri = resolve_database_uri(basedir)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_uri)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['WTF_CSRF_TIME_LIMIT'] = 3600
+
+    # Session configuration for "Remember Me" functionality
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
+    app.config['REMEMBER_COOKIE_DURATION'] = timedelta(days=30)
+    app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    # Seconds a worker reuses a logged-in user's record (auth/user_cache.py); 0 disables
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))
+    # Per-worker cache of sequence views (sequence_view.py): entries, and seconds kept (0 disables)
+    app.config['SEQUENCE_CACHE_SIZE'] = int(os.environ.get('SEQUENCE_CACHE_SIZE', 2000))
+    app.config['SEQUENCE_CACHE_TTL'] = int(os.environ.get('SEQUENCE_CACHE_TTL', 300))
+    # Password hashing cost and concurrency (auth/passwords.py, `flask password-benchmark`)
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    app.config['PASSWORD_HASH_THREADS'] = int(os.environ.get('PASSWORD_HASH_THREADS', 0))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+
+    # OAuth configuration
+    app.config['GOOGLE_CLIENT_ID'] = os.environ.get('GOOGLE_CLIENT_ID')
+    app.config['GOOGLE_CLIENT_SECRET'] = os.environ.get('GOOGLE_CLIENT_SECRET')
+    app.config['GITHUB_CLIENT_ID'] = os.environ.get('GITHUB_CLIENT_ID')
+    app.config['GITHUB_CLIENT_SECRET'] = os.environ.get('GITHUB_CLIENT_SECRET')
+
+    # Live sync: base URL of the `flask live-server` process. Empty means it is
+    # routed under this site's own /timer/<id>/live (see DEPLOYMENT.md).
+    app.config['LIVE_URL'] = os.environ.get('LIVE_URL', '').rstrip('/')
+    app.config['LIVE_SECRET_CONFIGURED'] = bool(os.environ.get('FLASK_SECRET_KEY'))
+
+    # User activity journal (see journal.py): db, file or sync
+    app.config['ACTIVITY_JOURNAL'] = os.environ.get('ACTIVITY_JOURNAL', 'db')
+    app.config['ACTIVITY_JOURNAL_FILE'] = os.environ.get('ACTIVITY_JOURNAL_FILE')
+    app.config['ACTIVITY_JOURNAL_BATCH'] = int(os.environ.get('ACTIVITY_JOURNAL_BATCH', 200))
+    app.config['ACTIVITY_JOURNAL_INTERVAL'] = float(os.environ.get('ACTIVITY_JOURNAL_INTERVAL', 1.0))
+    app.config['ACTIVITY_JOURNAL_QUEUE'] = int(os.environ.get('ACTIVITY_JOURNAL_QUEUE', 10000))
+
+    if config:
+        app.config.update(config)
+
+    # Log database URL on startup (never the password)
+    app.logger.info(f"Using database: {make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True)}")
+
+    csrf.init_app(app)
+    db.init_app(app)
+    # Alembic is only needed by `flask db ...`; web workers skip the import
+    if os.environ.get('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    register_db_commands(app)
+    register_search_commands(app)
+    register_ranking_commands(app)
+    register_asset_commands(app)
+    register_live_commands(app)
+    register_diagnostic_commands(app)
+    register_journal_commands(app)
+    register_user_stats_commands(app)
+    register_dedupe_commands(app)
+
+    journal.init_app(app)
+    init_auth(app)
+
+
 app = Flask(__name__, static_url_path='/static')
-app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_host=1, x_prefix=1)
-app.wsgi_app = ScriptNameMiddleware(app.wsgi_app)
-
-# Security: Require FLASK_SECRET_KEY to be set in production
-secret_key = os.environ.get('FLASK_SECRET_KEY')
-if not secret_key:
-    # Generate a random secret key for development only
-    secret_key = secrets.token_hex(32)
-    app.logger.warning("FLASK_SECRET_KEY not set. Using auto-generated random key (NOT for production).")
-app.secret_key = secret_key
-
-# Initialize CSRF protection
-csrf = CSRFProtect(app)
-
-# Database configuration
-basedir = os.path.abspath(os.path.dirname(__file__))
-
-# Support both root-level and instance/ database paths
-# Priority: 1) root-level timerfreak.db (production), 2) instance/ (local dev)
-if os.path.exists(os.path.join(basedir, 'timerfreak.db')):
-    db_path = os.path.join(basedir, 'timerfreak.db')
-elif os.path.exists(os.path.join(basedir, 'instance', 'timerfreak.db')):
-    db_path = os.path.join(basedir, 'instance', 'timerfreak.db')
-else:
-    # Default to instance/ for new deployments
-    db_path = os.path.join(basedir, 'instance', 'timerfreak.db')
-    os.makedirs(os.path.join(basedir, 'instance'), exist_ok=True)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['WTF_CSRF_TIME_LIMIT'] = 3600
-
-# Log database path on startup
-app.logger.info(f"Using database: {db_path}")
-
-# Session configuration for "Remember Me" functionality
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=30)
-app.config['REMEMBER_COOKIE_DURATION'] = timedelta(days=30)
-app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
-
-# OAuth configuration
-app.config['GOOGLE_CLIENT_ID'] = os.environ.get('GOOGLE_CLIENT_ID')
-app.config['GOOGLE_CLIENT_SECRET'] = os.environ.get('GOOGLE_CLIENT_SECRET')
-app.config['GITHUB_CLIENT_ID'] = os.environ.get('GITHUB_CLIENT_ID')
-app.config['GITHUB_CLIENT_SECRET'] = os.environ.get('GITHUB_CLIENT_SECRET')
-
-# Initialize database with app
-db.init_app(app)
-migrate = Migrate(app, db)
+configure_app(app)
 
 # Application defaults
 DEFAULT_TIMER_COLOR = "#0cd413"
 FALLBACK_ALARM_SOUND_FILENAME = "alarm.mp3"
 
-# Initialize authentication
-from auth import init_auth, login_manager, log_user_activity, owner_required
-init_auth(app)
-
 
 @app.context_processor
 def inject_global_data():
@@ -203,58 +281,8 @@ def index():
         default_alarm_sound_filename = FALLBACK_ALARM_SOUND_FILENAME
     # --- END MODIFIED ---
 
-    # Fetch most used sequences from the database (EXISTING CODE)
-    sequence_start_counts = db.session.query(
-        CounterLog.sequence_id,
-        func.count(CounterLog.id).label('start_count')
-    ).filter(CounterLog.event_type == 'sequence_start')\
-    .group_by(CounterLog.sequence_id).subquery()
-
-    sequence_timer_info = db.session.query(
-        Timer.sequence_id,
-        func.count(Timer.id).label('timer_count'),
-        func.sum(Timer.duration).label('total_sequence_duration')
-    ).group_by(Timer.sequence_id).subquery()
-
-    most_used_sequences_query = db.session.query(
-        Sequence.id,
-        Sequence.name,
-        sequence_start_counts.c.start_count,
-        sequence_timer_info.c.timer_count,
-        sequence_timer_info.c.total_sequence_duration
-    ).join(sequence_start_counts, Sequence.id == sequence_start_counts.c.sequence_id)\
-    .outerjoin(sequence_timer_info, Sequence.id == sequence_timer_info.c.sequence_id)\
-    .order_by(sequence_start_counts.c.start_count.desc())\
-    .limit(35)
-
-    most_used_sequences_raw = most_used_sequences_query.all()
-
-    most_used_sequences = []
-    for seq in most_used_sequences_raw:
-        total_seconds = seq.total_sequence_duration if seq.total_sequence_duration is not None else 0
-        start_count = seq.start_count if seq.start_count is not None else 0
-
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-
-        duration_parts = []
-        if hours > 0:
-            duration_parts.append(f"{hours}h")
-        if minutes > 0:
-            duration_parts.append(f"{minutes}m")
-        if seconds > 0 or (total_seconds == 0 and not duration_parts):
-            duration_parts.append(f"{seconds}s")
-
-        duration_display = " ".join(duration_parts) if duration_parts else "0s"
-
-        most_used_sequences.append({
-            'id': seq.id,
-            'name': seq.name if seq.name else f'Unnamed Sequence',
-            'use_count': start_count,
-            'timer_count': seq.timer_count if seq.timer_count is not None else 0,
-            'total_duration_display': duration_display.strip()
-        })
+    # Most used public sequences: one indexed read on the precomputed ranking
+    most_used_sequences, _ = browse_page(limit=35)
 
     # Division by zero protection for avg_timers calculation in template context
     total_sequences_count = Sequence.query.count()
@@ -310,73 +338,185 @@ def index():
                            prefilled_loop_count=prefilled_loop_count,
                            prefill_token=prefill_token or '')
 
+# Browse pagination
+BROWSE_FIRST_PAGE_SIZE = 15  # per category on the initial render
+BROWSE_PAGE_SIZE = 30        # per "load more" request
+BROWSE_MAX_PAGE_SIZE = 100
+
+# Ranking column per ?sort= value; both are kept current by record_sequence_start
+BROWSE_SORTS = {
+    'popular': Sequence.start_count,      # all-time starts
+    'trending': Sequence.trending_score,  # time-decayed starts, see ranking.py
+}
+
+def encode_browse_cursor(rank, sequence_id):
+    """Opaque keyset cursor for the (rank DESC, id DESC) ordering"""
+    raw = json.dumps([rank, sequence_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_browse_cursor(cursor, sort='popular'):
+    """Inverse of encode_browse_cursor; raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, sequence_id = json.loads(raw)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    rank_types = (int,) if sort == 'popular' else (int, float)
+    if not isinstance(rank, rank_types) or isinstance(rank, bool) \
+            or not isinstance(sequence_id, int) or isinstance(sequence_id, bool):
+        raise ValueError("Invalid cursor")
+    # Keep the values bindable as 64-bit integers / finite floats
+    if not math.isfinite(rank) or abs(rank) >= 2**63 or abs(sequence_id) >= 2**63:
+        raise ValueError("Invalid cursor")
+    return rank, sequence_id
+
+def browse_page(category_id=None, uncategorized_ids=None, cursor=None, limit=BROWSE_PAGE_SIZE, sort='popular'):
+    """
+    One page of public sequences as (items, next_cursor), ranked by all-time
+    starts (sort='popular') or decayed recent starts (sort='trending').
+
+    category_id limits to one category; uncategorized_ids (the active category
+    ids) selects sequences in none of them. Each page is an indexed range read
+    on (is_public, [category_id,] rank, id), so cost is the same at any depth.
+    """
+    rank = BROWSE_SORTS[sort]
+    query = db.session.query(Sequence.id, Sequence.slug, Sequence.name, Sequence.start_count, rank.label('rank'))\
+        .filter(Sequence.is_public == True)
+    if category_id is not None:
+        query = query.filter(Sequence.category_id == category_id)
+    elif uncategorized_ids is not None:
+        query = query.filter(db.or_(Sequence.category_id.is_(None), Sequence.category_id.notin_(uncategorized_ids)))
+    if cursor:
+        after_rank, after_id = decode_browse_cursor(cursor, sort)
+        query = query.filter(db.or_(
+            rank < after_rank,
+            db.and_(rank == after_rank, Sequence.id < after_id)
+        ))
+    rows = query.order_by(rank.desc(), Sequence.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Timer stats only for the sequences on this page
+    timer_stats = {}
+    if rows:
+        timer_stats = {
+            r.sequence_id: (r.timer_count, r.total_duration)
+            for r in db.session.query(
+                Timer.sequence_id,
+                func.count(Timer.id).label('timer_count'),
+                func.sum(Timer.duration).label('total_duration')
+            ).filter(Timer.sequence_id.in_([row.id for row in rows])).group_by(Timer.sequence_id)
+        }
+
+    items = []
+    for row in rows:
+        timer_count, total_duration = timer_stats.get(row.id, (0, 0))
+        items.append({
+            'id': row.slug,
+            'url': url_for('redirect_to_timer', sequence_id=row.slug),
+            'name': row.name if row.name else 'Unnamed Timer',
+            'use_count': row.start_count,
+            'timer_count': timer_count or 0,
+            'total_duration_display': format_duration_display(total_duration)
+        })
+
+    next_cursor = encode_browse_cursor(rows[-1].rank, rows[-1].id) if has_more else None
+    return items, next_cursor
+
 @app.route("/browse")
 def browse():
-    """Browse public Timers - top 100 by usage, grouped by category"""
-    # Fetch all public Timers with their stats using subqueries to avoid cartesian product
-    timer_counts = db.session.query(
-        Timer.sequence_id,
-        db.func.count(Timer.id).label('timer_count'),
-        db.func.sum(Timer.duration).label('total_duration')
-    ).group_by(Timer.sequence_id).subquery()
-
-    # Top 100 sequences by use count
-    Timers_query = db.session.query(
-        Sequence,
-        db.func.count(CounterLog.id).label('start_count'),
-        timer_counts.c.timer_count,
-        timer_counts.c.total_duration
-    ).outerjoin(CounterLog, Sequence.id == CounterLog.sequence_id)\
-    .outerjoin(timer_counts, Sequence.id == timer_counts.c.sequence_id)\
-    .filter(Sequence.is_public == True)\
-    .group_by(Sequence.id, timer_counts.c.timer_count, timer_counts.c.total_duration)\
-    .order_by(db.func.count(CounterLog.id).desc().nullslast())\
-    .limit(100).all()
-
-    # Fetch all categories
+    """Browse public Timers - first page of each category, more loaded via /api/browse"""
+    sort = request.args.get('sort', 'popular')
+    if sort not in BROWSE_SORTS:
+        sort = 'popular'
     categories = TimerCategory.query.filter_by(is_active=1).order_by(TimerCategory.sort_order).all()
     category_map = {c.id: c for c in categories}
 
-    # Build timer list with category info (ordered by category sort_order)
+    # Each section is a small indexed read; further pages come from /api/browse
     categorized = OrderedDict()
+    next_cursors = {}
     for c in categories:
-        categorized[c.id] = []
-    uncategorized = []
-
-    for seq, start_count, timer_count, total_duration in Timers_query:
-        total_seconds = total_duration if total_duration else 0
-
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-
-        duration_parts = []
-        if hours > 0:
-            duration_parts.append(f"{hours}h")
-        if minutes > 0:
-            duration_parts.append(f"{minutes}m")
-        if seconds > 0 or not duration_parts:
-            duration_parts.append(f"{seconds}s")
-
-        duration_display = " ".join(duration_parts)
-
-        timer_data = {
-            'id': seq.id,
-            'name': seq.name if seq.name else 'Unnamed Timer',
-            'use_count': start_count or 0,
-            'timer_count': timer_count or 0,
-            'total_duration_display': duration_display.strip()
-        }
-
-        if seq.category_id and seq.category_id in category_map:
-            categorized[seq.category_id].append(timer_data)
-        else:
-            uncategorized.append(timer_data)
+        categorized[c.id], next_cursors[c.id] = browse_page(category_id=c.id, limit=BROWSE_FIRST_PAGE_SIZE, sort=sort)
+    uncategorized, next_cursors['uncategorized'] = browse_page(
+        uncategorized_ids=list(category_map), limit=BROWSE_FIRST_PAGE_SIZE, sort=sort)
 
     return render_template("browse.html",
                            categories=categorized,
                            uncategorized=uncategorized,
-                           category_map=category_map)
+                           category_map=category_map,
+                           next_cursors=next_cursors,
+                           sort=sort)
+
+@app.route("/api/browse")
+def api_browse():
+    """Paginated public sequences: ?category=<id|slug|uncategorized>&sort=popular|trending&cursor=...&limit=N"""
+    sort = request.args.get('sort', 'popular')
+    if sort not in BROWSE_SORTS:
+        return jsonify({'error': f"sort must be one of: {', '.join(BROWSE_SORTS)}"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', BROWSE_PAGE_SIZE)), 1), BROWSE_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    category = request.args.get('category', '').strip()
+    category_id = None
+    uncategorized_ids = None
+    if category == 'uncategorized':
+        uncategorized_ids = [c.id for c in TimerCategory.query.filter_by(is_active=1)]
+    elif category:
+        cat = TimerCategory.query.filter(
+            TimerCategory.id == int(category) if category.isdigit() else TimerCategory.slug == category
+        ).first()
+        if not cat:
+            return jsonify({'error': f"Unknown category '{category}'"}), 400
+        category_id = cat.id
+
+    try:
+        items, next_cursor = browse_page(category_id=category_id, uncategorized_ids=uncategorized_ids,
+                                         cursor=request.args.get('cursor') or None, limit=limit, sort=sort)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
+@app.route("/api/search")
+def api_search():
+    """Full-text search over public sequences, ranked by relevance and usage"""
+    started = time.perf_counter()
+    q = request.args.get('q', '').strip()
+
+    filters = {}
+    try:
+        for key in ('min_duration', 'max_duration', 'min_timers', 'max_timers'):
+            if request.args.get(key):
+                filters[key] = int(request.args[key])
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'Filters and limit must be integers'}), 400
+
+    category = request.args.get('category', '').strip()
+    if category:
+        if category.isdigit():
+            filters['category_id'] = int(category)
+        else:
+            cat = TimerCategory.query.filter_by(slug=category).first()
+            if not cat:
+                return jsonify({'error': f"Unknown category '{category}'"}), 400
+            filters['category_id'] = cat.id
+
+    results = search_sequences(q, limit=limit, **filters) if q else []
+    for r in results:
+        r['name'] = r['name'] or 'Unnamed Timer'
+        r['total_duration_display'] = format_duration_display(r['total_duration'])
+        r['url'] = url_for('redirect_to_timer', sequence_id=r['id'])
+        r.pop('score')
+
+    return jsonify({
+        'query': q,
+        'results': results,
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
 
 @app.route("/timer", methods=["POST"])
 def start_timer():
@@ -464,46 +604,73 @@ def start_timer():
         except (ValueError, TypeError):
             loop_count = None  # Empty or invalid = unlimited
 
-    sequence_id = secrets.token_urlsafe(8)
-
     # Create sequence with owner if user is logged in
     from flask_login import current_user
     owner_id = current_user.id if current_user.is_authenticated else None
 
-    sequence = Sequence(
-        id=sequence_id,
-        name=sequence_name,
-        owner_id=owner_id,
-        is_public=True  # Public by default for backward compatibility
-    )
-    db.session.add(sequence)
-
-    for i, data in enumerate(timers_data):
-        timer = Timer(
-            sequence_id=sequence_id,
-            timer_name=data['name'],
-            duration=data['duration'],
-            timer_order=i,
-            color=data['color'],
-            alarm_sound=data['alarm_sound'],
-            loop_default=loop_default,
-            loop_count=loop_count
-        )
-        db.session.add(timer)
-    db.session.commit()
+    # An anonymous submission identical to an earlier one reuses it (see dedupe.py)
+    sequence = None
+    content_hash = None
+    if owner_id is None:
+        content_hash = sequence_content_hash(sequence_name, timers_data, loop_default, loop_count)
+        sequence = Sequence.query.filter_by(content_hash=content_hash).first()
 
-    # Log sequence start with owner info
+    created = sequence is None
+    if created:
+        try:
+            with db.session.begin_nested():
+                sequence = Sequence(
+                    slug=secrets.token_urlsafe(8),
+                    name=sequence_name,
+                    owner_id=owner_id,
+                    is_public=True,  # Public by default for backward compatibility
+                    loop_default=loop_default,
+                    loop_count=loop_count,
+                    content_hash=content_hash
+                )
+                db.session.add(sequence)
+                db.session.flush()  # assigns sequence.id for the timer rows
+
+                timers = []
+                for i, data in enumerate(timers_data):
+                    timer = Timer(
+                        sequence_id=sequence.id,
+                        timer_name=data['name'],
+                        duration=data['duration'],
+                        timer_order=i,
+                        color=data['color'],
+                        alarm_sound=data['alarm_sound']
+                    )
+                    db.session.add(timer)
+                    timers.append(timer)
+                index_sequence(sequence, timers)
+                view = build_sequence_view(sequence, timers)
+        except IntegrityError:
+            if content_hash is None:
+                raise
+            # The same content was stored concurrently; use that row
+            sequence = Sequence.query.filter_by(content_hash=content_hash).one()
+            created = False
+        db.session.commit()
+        if created:
+            # The preview we redirect to reads it from the cache
+            cache_sequence_view(view)
+
+    # Log sequence start with owner info; a reused sequence counts one more start
     log = CounterLog(
-        sequence_id=sequence_id,
+        sequence_id=sequence.id,
         event_type='sequence_start',
         owner_id=owner_id
     )
     db.session.add(log)
+    record_sequence_start(sequence.id)
+    if created:
+        bump_user_stats(owner_id, sequences=1, timers=len(timers), starts=1)
     db.session.commit()
 
     # Log user activity if logged in
     if current_user.is_authenticated:
-        log_user_activity('create_sequence', 'sequence', sequence_id=sequence_id)
+        log_user_activity('create_sequence', 'sequence', sequence_id=sequence.id)
 
     # Clean up temporary preview data since the form has been successfully created
     prefill_token_from_form = request.form.get('prefill_token', '')
@@ -524,24 +691,23 @@ def start_timer():
             app.logger.info(f"Cleaned up legacy temp data for session_id: {session['session_id'][:20]}...")
     db.session.commit()
 
-    app.logger.info(f"Created sequence {sequence_id} with {len(timers_data)} timers.")
-    return redirect(url_for('preview_sequence', sequence_id=sequence_id))
+    if created:
+        app.logger.info(f"Created sequence {sequence.slug} with {len(timers_data)} timers.")
+    else:
+        app.logger.info(f"Reused sequence {sequence.slug} for an identical submission.")
+    return redirect(url_for('preview_sequence', sequence_id=sequence.slug))
 
 @app.route("/timer/<sequence_id>")
 def show_timer(sequence_id):
-    sequence = Sequence.query.options(joinedload(Sequence.timers)).get_or_404(sequence_id)
-
-    timers_in_order = sequence.timers
+    sequence = get_sequence_view(sequence_id) or abort(404)
 
-    timers_durations = [timer.duration for timer in timers_in_order]
-    timer_names = [timer.timer_name if timer.timer_name else f"Timer {timer.timer_order + 1}" for timer in timers_in_order]
-    timer_colors = [timer.color for timer in timers_in_order]
-    timer_alarm_sounds = [timer.alarm_sound for timer in timers_in_order]
+    timers_durations = sequence.timer_durations
+    timer_names = sequence.timer_names
+    timer_colors = sequence.timer_colors
+    timer_alarm_sounds = sequence.timer_alarm_sounds
 
-    # Get loop settings from the first timer (they're the same for all timers in a sequence)
-    # Handle NULL values for existing timers created before migration
-    loop_default = bool(timers_in_order[0].loop_default) if timers_in_order else False
-    loop_count = timers_in_order[0].loop_count if (timers_in_order and timers_in_order[0].loop_count is not None) else None
+    loop_default = sequence.loop_default
+    loop_count = sequence.loop_count
 
     all_available_sounds_db = Sound.query.order_by(Sound.name).all()
     all_available_sound_filenames = [s.filename for s in all_available_sounds_db]
@@ -549,10 +715,10 @@ def show_timer(sequence_id):
     sequence_name_for_logs = sequence.name if sequence.name else f"Timer {sequence_id}"
 
     # Generate or get share token
-    share = SequenceShare.query.filter_by(sequence_id=sequence_id).first()
+    share = SequenceShare.query.filter_by(sequence_id=sequence.id).first()
     if not share:
         share = SequenceShare(
-            sequence_id=sequence_id,
+            sequence_id=sequence.id,
             share_token=secrets.token_urlsafe(16),
             is_public=sequence.is_public,
             allow_copy=True
@@ -564,7 +730,37 @@ def show_timer(sequence_id):
     share_url = url_for('show_timer', sequence_id=sequence_id, _external=True)
     qr_code_url = url_for('qr_code', sequence_id=sequence_id)
 
-    return render_template("timer.html",
+    # ?live=<code> opens the page as a viewer of a host's live session
+    live_code = request.args.get('live', '')
+    if not LIVE_SESSION_RE.match(live_code):
+        live_code = None
+
+    # Everything the static timer engine (static/timer.js) needs for this sequence
+    from flask_login import current_user
+    timer_config = {
+        'sequence_id': sequence_id,
+        'timers': timers_durations,
+        'timer_names': timer_names,
+        'timer_colors': timer_colors,
+        'timer_alarm_sounds': timer_alarm_sounds,
+        'loop_default': loop_default,
+        'loop_count': loop_count,
+        'is_logged_in': current_user.is_authenticated,
+        'static_base_url': url_for('static', filename=''),
+        'sound_urls': {s: url_for('static', filename=s) for s in [*timer_alarm_sounds, 'beep.mp3'] if s},
+        'scheduler_url': url_for('static', filename='timer-scheduler.js'),
+        'live_url': live_stream_url(sequence_id),
+        'live_session_url': url_for('live_session', sequence_id=sequence_id),
+        'live_session': live_code,
+        'time_url': url_for('server_time'),
+        # Precached by the service worker so the page works offline
+        'precache_urls': [
+            url_for('static', filename=name)
+            for name in ('silence.mp3', 'timer-scheduler.js', 'timer.js', 'style.css', 'timer.css')
+        ] + [url_for('get_manifest', sequence_id=sequence_id), qr_code_url],
+    }
+
+    response = make_response(render_template("timer.html",
                            timers=timers_durations,
                            timer_names=timer_names,
                            sequence_name=sequence.name,
@@ -578,16 +774,52 @@ def show_timer(sequence_id):
                            share_token=share.share_token,
                            qr_code_url=qr_code_url,
                            loop_default=loop_default,
-                           loop_count=loop_count)
+                           loop_count=loop_count,
+                           timer_config=timer_config))
+
+    # Start downloading the alarm sounds with the page; the page fetch()es and
+    # decodes them, so as=fetch + crossorigin lets it reuse these responses
+    for sound in dict.fromkeys(filter(None, timer_alarm_sounds)):
+        response.headers.add('Link', f"<{url_for('static', filename=sound)}>; rel=preload; as=fetch; crossorigin=anonymous")
+    return response
+
+def live_stream_url(sequence_id):
+    """Where the live sync server answers for this sequence (see live.py)"""
+    if app.config['LIVE_URL']:
+        return f"{app.config['LIVE_URL']}/timer/{sequence_id}/live"
+    return url_for('show_timer', sequence_id=sequence_id) + '/live'
+
+@app.route("/timer/<sequence_id>/live/session", methods=["POST"])
+@csrf.exempt
+def live_session(sequence_id):
+    """
+    Start hosting a live session: returns a fresh session code, the token the
+    host publishes with, and the URL viewers open to follow along.
+    """
+    client_ip = get_client_ip()
+    if not check_rate_limit(client_ip):
+        return jsonify({'error': 'Rate limit exceeded. Try again later.'}), 429
+    if get_sequence_view(sequence_id) is None:
+        return jsonify({'error': 'Sequence not found'}), 404
+
+    session_code = new_session_code()
+    app.logger.info(f"Live session {session_code} started for sequence {sequence_id}")
+    return jsonify({
+        'session': session_code,
+        'token': make_host_token(app.secret_key, sequence_id, session_code),
+        'live_url': live_stream_url(sequence_id),
+        'viewer_url': url_for('show_timer', sequence_id=sequence_id, live=session_code, _external=True),
+    }), 201
 
 @app.route("/qr/<sequence_id>.png")
 def qr_code(sequence_id):
     """Generate and serve QR code for timer sequence"""
     from flask import make_response
-    sequence = db.session.get(Sequence, sequence_id) or abort(404)
+    get_sequence_view(sequence_id) or abort(404)
     share_url = url_for('show_timer', sequence_id=sequence_id, _external=True)
 
     # Generate QR code
+    import qrcode  # pulls in Pillow; only this route needs it
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -612,70 +844,37 @@ def qr_code(sequence_id):
 @app.route("/preview/<sequence_id>")
 def preview_sequence(sequence_id):
     """Preview page showing timers in order with arrows before starting"""
-    sequence = Sequence.query.options(joinedload(Sequence.timers)).get_or_404(sequence_id)
+    sequence = get_sequence_view(sequence_id) or abort(404)
 
-    timers_in_order = sequence.timers
-
-    timers_data = []
-    for timer in timers_in_order:
-        timer_name = timer.timer_name if timer.timer_name else f"Timer {timer.timer_order + 1}"
-        hours = timer.duration // 3600
-        minutes = (timer.duration % 3600) // 60
-        seconds = timer.duration % 60
-        duration_parts = []
-        if hours > 0:
-            duration_parts.append(f"{hours}h")
-        if minutes > 0:
-            duration_parts.append(f"{minutes}m")
-        duration_parts.append(f"{seconds}s")
-        duration_display = " ".join(duration_parts)
-
-        timers_data.append({
-            'order': timer.timer_order,
-            'name': timer_name,
-            'duration': duration_display,
+    timers_data = [
+        {
+            'order': timer.order,
+            'name': timer.label,
+            'duration': timer.duration_display,
             'color': timer.color,
             'total_seconds': timer.duration
-        })
+        }
+        for timer in sequence.timers
+    ]
 
-    # Get loop settings
-    # Handle NULL values for existing timers created before migration
-    loop_default = bool(timers_in_order[0].loop_default) if timers_in_order else False
-    loop_count = timers_in_order[0].loop_count if (timers_in_order and timers_in_order[0].loop_count is not None) else None
+    loop_default = sequence.loop_default
+    loop_count = sequence.loop_count
 
     # Generate a URL-based preview token that survives server restarts
     preview_token = secrets.token_urlsafe(32)
 
     # Store timer data in session for backward compatibility (cookie-based, may break on restart)
-    session['preview_timers'] = [
-        {
-            'name': t.timer_name,
-            'duration': t.duration,
-            'color': t.color,
-            'alarm_sound': t.alarm_sound
-        }
-        for t in timers_in_order
-    ]
+    session['preview_timers'] = sequence.form_timers()
     session['preview_sequence_name'] = sequence.name
     session['preview_loop_default'] = loop_default
     session['preview_loop_count'] = loop_count
 
     # Persist form data to database with the preview_token for reliable back-button restoration
-    timers_json = json.dumps([
-        {
-            'name': t.timer_name,
-            'duration': t.duration,
-            'color': t.color,
-            'alarm_sound': t.alarm_sound
-        }
-        for t in timers_in_order
-    ])
-
     temp_data = PreviewTempData(
         preview_token=preview_token,
         session_id=session.get('session_id'),
         sequence_name=sequence.name,
-        timers_data=timers_json,
+        timers_data=sequence.timers_json,
         loop_default=loop_default,
         loop_count=loop_count
     )
@@ -701,15 +900,13 @@ def preview_back():
 @app.route("/clone/<sequence_id>")
 def clone_timer(sequence_id):
     """Clone a timer sequence - store data and redirect to index with prefilled form"""
-    sequence = Sequence.query.options(joinedload(Sequence.timers)).get_or_404(sequence_id)
-    timers_in_order = sequence.timers
+    sequence = get_sequence_view(sequence_id) or abort(404)
 
     # Generate a new preview_token for the cloned data
     preview_token = secrets.token_urlsafe(32)
 
-    # Get loop settings
-    loop_default = bool(timers_in_order[0].loop_default) if timers_in_order else False
-    loop_count = timers_in_order[0].loop_count if (timers_in_order and timers_in_order[0].loop_count is not None) else None
+    loop_default = sequence.loop_default
+    loop_count = sequence.loop_count
 
     # Clean up any existing temp data for this session to avoid conflicts
     current_session_id = session.get('session_id')
@@ -719,21 +916,11 @@ def clone_timer(sequence_id):
             db.session.delete(old)
 
     # Store timer data in database
-    timers_json = json.dumps([
-        {
-            'name': t.timer_name,
-            'duration': t.duration,
-            'color': t.color,
-            'alarm_sound': t.alarm_sound
-        }
-        for t in timers_in_order
-    ])
-
     temp_data = PreviewTempData(
         preview_token=preview_token,
         session_id=current_session_id,
         sequence_name=sequence.name,
-        timers_data=timers_json,
+        timers_data=sequence.timers_json,
         loop_default=loop_default,
         loop_count=loop_count
     )
@@ -745,12 +932,37 @@ def clone_timer(sequence_id):
 
 @app.route("/<string:sequence_id>")
 def redirect_to_timer(sequence_id):
-    sequence = db.session.get(Sequence, sequence_id)
-    if sequence:
+    if get_sequence_view(sequence_id):
         return redirect(url_for('show_timer', sequence_id=sequence_id))
     else:
         return redirect(url_for('index', error=f"Sequence '{sequence_id}' not found."))
 
+# Offline replay (see static/worker.js): events older than this are dropped
+ACTIVITY_REPLAY_MAX_AGE = timedelta(days=7)
+ACTIVITY_BATCH_MAX = 50
+
+def record_counter_event(sequence, timer_order, event_type, when=None):
+    """
+    Add one CounterLog row for `sequence` to the session; a sequence_start
+    also bumps the rankings and the owner's user_stats.
+
+    timer_order must already be an int or None; `when` backdates replayed
+    events. The caller commits.
+    """
+    log = CounterLog(
+        sequence_id=sequence.id,
+        timer_order=timer_order,
+        event_type=event_type,
+        owner_id=sequence.owner_id
+    )
+    if when is not None:
+        log.timestamp = when
+    db.session.add(log)
+    if event_type == 'sequence_start':
+        record_sequence_start(sequence.id, when)
+        bump_user_stats(sequence.owner_id, starts=1, when=when)
+    return log
+
 @app.route("/log_activity", methods=["POST"])
 @csrf.exempt
 def log_activity():
@@ -780,24 +992,18 @@ def log_activity():
                 app.logger.error(f"Invalid timer_order format: {timer_order} (type: {type(timer_order)})")
                 return jsonify({'message': 'Invalid timer_order format'}), 400
 
-        # Get owner info from sequence if available
-        sequence = db.session.get(Sequence, sequence_id)
-        owner_id = sequence.owner_id if sequence else None
+        sequence = find_sequence(str(sequence_id))
+        if sequence is None:
+            return jsonify({'message': 'Sequence not found'}), 404
 
-        log = CounterLog(
-            sequence_id=sequence_id,
-            timer_order=timer_order_int,
-            event_type=event_type,
-            owner_id=owner_id
-        )
-        db.session.add(log)
+        record_counter_event(sequence, timer_order_int, event_type)
         db.session.commit()
         app.logger.info(f"Activity logged successfully: Seq={sequence_id}, TimerOrder={timer_order_int}, Event={event_type}")
         
         # Log user activity if logged in
         from flask_login import current_user
         if current_user.is_authenticated:
-            log_user_activity(event_type, 'timer', sequence_id=sequence_id, timer_order=timer_order_int)
+            log_user_activity(event_type, 'timer', sequence_id=sequence.id, timer_order=timer_order_int)
         
         return jsonify({'message': 'Activity logged successfully'}), 201
     except Exception as e:
@@ -805,13 +1011,72 @@ def log_activity():
         app.logger.exception(f"Database error logging activity: {data}")
         return jsonify({'message': 'Failed to log activity', 'error': str(e)}), 500
 
+@app.route("/log_activity/batch", methods=["POST"])
+@csrf.exempt
+def log_activity_batch():
+    """
+    Replay of events queued by the service worker while offline:
+    {"events": [{sequence_id, timer_order, event_type, occurred_at (ms since epoch)}, ...]}.
+    Each event counts against the rate limit like a /log_activity call (so a
+    batch cannot multiply starts); one commit per batch. Malformed events and
+    events for unknown sequences are skipped.
+    """
+    data = request.get_json(silent=True) or {}
+    events = data.get('events')
+    if not isinstance(events, list) or not events:
+        return jsonify({'message': 'Missing data (events)'}), 400
+    if len(events) > ACTIVITY_BATCH_MAX:
+        return jsonify({'message': f'At most {ACTIVITY_BATCH_MAX} events per batch'}), 400
+
+    client_ip = get_client_ip()
+    if not check_rate_limit(client_ip, cost=len(events)):
+        app.logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+        return jsonify({'message': 'Rate limit exceeded. Try again later.'}), 429
+
+    now = datetime.now(timezone.utc)
+    accepted = []
+    for event in events:
+        if not isinstance(event, dict) or not event.get('sequence_id') or not event.get('event_type'):
+            continue
+        try:
+            timer_order = int(event['timer_order']) if event.get('timer_order') is not None else None
+            when = datetime.fromtimestamp(float(event['occurred_at']) / 1000, timezone.utc) \
+                if event.get('occurred_at') is not None else now
+        except (ValueError, TypeError, OverflowError, OSError):
+            continue
+        if when < now - ACTIVITY_REPLAY_MAX_AGE:
+            continue
+        accepted.append((str(event['sequence_id']), timer_order, str(event['event_type']), min(when, now)))
+
+    # One lookup for every sequence in the batch
+    sequences = find_sequences(e[0] for e in accepted) if accepted else {}
+    accepted = [(sequences[slug], *rest) for slug, *rest in accepted if slug in sequences]
+
+    try:
+        for sequence, timer_order, event_type, when in accepted:
+            record_counter_event(sequence, timer_order, event_type, when)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        app.logger.exception(f"Database error replaying {len(accepted)} activity events")
+        return jsonify({'message': 'Failed to log activity', 'error': str(e)}), 500
+
+    from flask_login import current_user
+    if current_user.is_authenticated:
+        for sequence, timer_order, event_type, _ in accepted:
+            log_user_activity(event_type, 'timer', sequence_id=sequence.id, timer_order=timer_order)
+
+    app.logger.info(f"Replayed {len(accepted)} of {len(events)} queued activity events")
+    return jsonify({'message': 'Activity logged successfully', 'accepted': len(accepted),
+                    'skipped': len(events) - len(accepted)}), 201
+
 @app.route("/logs/<sequence_id>")
 def show_logs(sequence_id):
-    sequence = db.session.get(Sequence, sequence_id) or abort(404)
+    sequence = find_sequence(sequence_id) or abort(404)
 
     logs_raw = db.session.query(CounterLog, Timer)\
                      .outerjoin(Timer, (CounterLog.sequence_id == Timer.sequence_id) & (CounterLog.timer_order == Timer.timer_order))\
-                     .filter(CounterLog.sequence_id == sequence_id)\
+                     .filter(CounterLog.sequence_id == sequence.id)\
                      .order_by(CounterLog.timestamp).all()
 
     logs_formatted = []
@@ -832,7 +1097,7 @@ def show_logs(sequence_id):
 
         log_dict = {
             'id': log_entry.id,
-            'sequence_id': log_entry.sequence_id,
+            'sequence_id': sequence.slug,
             'timer_order': log_entry.timer_order,
             'event_type': log_entry.event_type,
             # Pass the converted timestamp to the template
@@ -848,8 +1113,11 @@ _rate_limit_store = defaultdict(list)
 _RATE_LIMIT_WINDOW = 60  # seconds
 _RATE_LIMIT_MAX_REQUESTS = 100  # max requests per window
 
-def check_rate_limit(client_ip):
-    """Check if client has exceeded rate limit. Returns True if allowed, False if limited."""
+def check_rate_limit(client_ip, cost=1):
+    """
+    Check if client has exceeded rate limit. Returns True if allowed (and
+    records `cost` requests), False if limited.
+    """
     current_time = time.time()
     # Clean old entries
     _rate_limit_store[client_ip] = [
@@ -857,10 +1125,10 @@ def check_rate_limit(client_ip):
         if current_time - t < _RATE_LIMIT_WINDOW
     ]
     # Check limit
-    if len(_rate_limit_store[client_ip]) >= _RATE_LIMIT_MAX_REQUESTS:
+    if len(_rate_limit_store[client_ip]) + cost > _RATE_LIMIT_MAX_REQUESTS:
         return False
     # Record this request
-    _rate_limit_store[client_ip].append(current_time)
+    _rate_limit_store[client_ip].extend([current_time] * cost)
     return True
 
 def get_client_ip():
@@ -888,12 +1156,13 @@ def admin_required(f):
 def admin_stats():
     # 1. Daily Sequence Creation (Last 14 Days)
     fourteen_days_ago = datetime.now(timezone.utc) - timedelta(days=14)
+    creation_date = utc_date(Sequence.created_at)
     daily_creation = db.session.query(
-        func.date(Sequence.created_at).label('date'),
+        creation_date.label('date'),
         func.count(Sequence.id)
     ).filter(Sequence.created_at >= fourteen_days_ago)\
-    .group_by(func.date(Sequence.created_at))\
-    .order_by(func.date(Sequence.created_at).desc()).all()
+    .group_by(creation_date)\
+    .order_by(creation_date.desc()).all()
 
     # 2. Completion Funnel (Last 30 Days)
     thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
@@ -906,11 +1175,12 @@ def admin_stats():
         CounterLog.timestamp >= thirty_days_ago
     ).count()
 
-    # 3. Hourly Activity (Peak Times) - Fixed: use column expression instead of string
+    # 3. Hourly Activity (Peak Times) - integer UTC hour on every dialect
+    log_hour = utc_hour(CounterLog.timestamp)
     hourly_dist = db.session.query(
-        extract('hour', CounterLog.timestamp).label('hour'),
+        log_hour.label('hour'),
         func.count(CounterLog.id)
-    ).group_by(extract('hour', CounterLog.timestamp)).order_by(func.count(CounterLog.id).desc()).limit(5).all()
+    ).group_by(log_hour).order_by(func.count(CounterLog.id).desc()).limit(5).all()
 
     # 4. Sound Popularity
     sound_popularity = db.session.query(
@@ -920,12 +1190,12 @@ def admin_stats():
 
     # 5. Most Engaged Sequences (Top 10)
     top_sequences = db.session.query(
-        Sequence.id,
+        Sequence.slug,
         Sequence.name,
         func.count(CounterLog.id).label('start_count')
     ).join(CounterLog, Sequence.id == CounterLog.sequence_id)\
     .filter(CounterLog.event_type == 'sequence_start')\
-    .group_by(Sequence.id).order_by(func.count(CounterLog.id).desc()).limit(10).all()
+    .group_by(Sequence.id, Sequence.slug, Sequence.name).order_by(func.count(CounterLog.id).desc()).limit(10).all()
 
     # Summary Stats
     total_sequences = Sequence.query.count()
@@ -944,6 +1214,67 @@ def admin_stats():
                            total_starts=total_starts,
                            avg_timers=avg_timers)
 
+@app.route("/admin/metrics")
+@admin_required
+def admin_metrics():
+    """Request and template render timing of the worker that answers (see metrics.py)"""
+    snapshot = metrics.snapshot()
+    snapshot['activity_journal'] = journal.stats()
+    return jsonify(snapshot)
+
+
+# --- Account API Endpoints ---
+SEQUENCE_STATS_MAX = 100
+
+
+@app.route("/api/me/sequences/stats")
+def my_sequence_stats():
+    """
+    Stats for many of the logged-in user's sequences in one query:
+    ?ids=a,b,c (up to SEQUENCE_STATS_MAX). Unknown or foreign ids are omitted.
+    """
+    from flask_login import current_user
+
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Login required'}), 401
+
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    if len(ids) > SEQUENCE_STATS_MAX:
+        return jsonify({'error': f'At most {SEQUENCE_STATS_MAX} ids per request'}), 400
+
+    stats = sequence_stats(current_user.id, ids)
+    return jsonify({
+        sequence_id: {**row, 'last_activity': row['last_activity'].isoformat() if row['last_activity'] else None}
+        for sequence_id, row in stats.items()
+    })
+
+
+@app.route("/api/me/activity")
+def my_activity():
+    """
+    Events on the logged-in user's sequences, newest first:
+    ?cursor=...&limit=N&sequence=<id>&event_type=<type>
+    """
+    from flask_login import current_user
+
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Login required'}), 401
+    try:
+        limit = min(max(int(request.args.get('limit', ACTIVITY_PAGE_SIZE)), 1), ACTIVITY_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    try:
+        items, next_cursor = activity_page(current_user.id, cursor=request.args.get('cursor') or None, limit=limit,
+                                           sequence_id=request.args.get('sequence') or None,
+                                           event_type=request.args.get('event_type') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    for item in items:
+        item['timestamp'] = item['timestamp'].isoformat()
+    return jsonify({'items': items, 'next_cursor': next_cursor})
+
 
 # --- Sharing API Endpoints ---
 @app.route("/api/share/<sequence_id>", methods=["POST"])
@@ -951,18 +1282,18 @@ def manage_share(sequence_id):
     """Manage sharing settings for a timer"""
     from flask_login import current_user
     
-    sequence = db.session.get(Sequence, sequence_id) or abort(404)
+    sequence = find_sequence(sequence_id) or abort(404)
     
     # Check ownership
     if sequence.owner_id and (not current_user.is_authenticated or current_user.id != sequence.owner_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     data = request.get_json()
-    share = SequenceShare.query.filter_by(sequence_id=sequence_id).first()
+    share = SequenceShare.query.filter_by(sequence_id=sequence.id).first()
     
     if not share:
         share = SequenceShare(
-            sequence_id=sequence_id,
+            sequence_id=sequence.id,
             share_token=secrets.token_urlsafe(16),
             is_public=data.get('is_public', True),
             allow_copy=data.get('allow_copy', True)
@@ -996,56 +1327,63 @@ def copy_shared_timer(sequence_id):
     if not current_user.is_authenticated:
         return jsonify({'error': 'Login required'}), 401
     
-    sequence = Sequence.query.options(joinedload(Sequence.timers)).get_or_404(sequence_id)
+    sequence = get_sequence_view(sequence_id) or abort(404)
     
     # Check if copying is allowed
-    share = SequenceShare.query.filter_by(sequence_id=sequence_id).first()
+    share = SequenceShare.query.filter_by(sequence_id=sequence.id).first()
     if share and not share.allow_copy:
         return jsonify({'error': 'Copying not allowed for this timer'}), 403
     
     # Create a copy
-    new_sequence_id = secrets.token_urlsafe(8)
     new_sequence = Sequence(
-        id=new_sequence_id,
+        slug=secrets.token_urlsafe(8),
         name=f"{sequence.name} (Copy)" if sequence.name else f"Timer Copy",
         owner_id=current_user.id,
         is_public=False,
+        loop_default=sequence.loop_default,
+        loop_count=sequence.loop_count,
         created_at=datetime.now(timezone.utc)
     )
     db.session.add(new_sequence)
+    db.session.flush()
     
     # Copy all segments
+    new_timers = []
     for timer in sequence.timers:
         new_timer = Timer(
-            sequence_id=new_sequence_id,
-            timer_name=timer.timer_name,
+            sequence_id=new_sequence.id,
+            timer_name=timer.name,
             duration=timer.duration,
-            timer_order=timer.timer_order,
+            timer_order=timer.order,
             color=timer.color,
             alarm_sound=timer.alarm_sound
         )
         db.session.add(new_timer)
+        new_timers.append(new_timer)
+    new_view = build_sequence_view(new_sequence, new_timers)
     
     # Update copy count
     if share:
         share.copy_count += 1
     
     db.session.commit()
+    cache_sequence_view(new_view)
     
     # Log activity
-    log = CounterLog(sequence_id=new_sequence_id, event_type='timer_copied', owner_id=current_user.id)
+    log = CounterLog(sequence_id=new_sequence.id, event_type='timer_copied', owner_id=current_user.id)
     db.session.add(log)
+    bump_user_stats(current_user.id, sequences=1, timers=len(sequence.timers))
     db.session.commit()
     
     return jsonify({
         'message': 'Timer copied successfully',
-        'new_sequence_id': new_sequence_id,
-        'redirect_url': url_for('show_timer', sequence_id=new_sequence_id)
+        'new_sequence_id': new_sequence.slug,
+        'redirect_url': url_for('show_timer', sequence_id=new_sequence.slug)
     })
 
 @app.route("/manifest/<sequence_id>.json")
 def get_manifest(sequence_id):
-    sequence = db.session.get(Sequence, sequence_id) or abort(404)
+    sequence = get_sequence_view(sequence_id) or abort(404)
     name = sequence.name if sequence.name else f"Timer {sequence_id}"
     
     manifest = {
@@ -1057,12 +1395,12 @@ def get_manifest(sequence_id):
         "theme_color": "#00ffae",
         "icons": [
             {
-                "src": "/static/android-chrome-192x192.png",
+                "src": url_for('static', filename='android-chrome-192x192.png'),
                 "sizes": "192x192",
                 "type": "image/png"
             },
             {
-                "src": "/static/android-chrome-512x512.png",
+                "src": url_for('static', filename='android-chrome-512x512.png'),
                 "sizes": "512x512",
                 "type": "image/png"
             }
@@ -1072,6 +1410,24 @@ def get_manifest(sequence_id):
     }
     return jsonify(manifest)
 
+@app.route("/worker.js")
+def service_worker():
+    """Service worker at the site root so its scope covers every page"""
+    response = send_file(os.path.join(app.static_folder, 'worker.js'), mimetype='application/javascript', max_age=0)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Service-Worker-Allowed'] = url_for('index')
+    return response
+
+@app.route("/time")
+def server_time():
+    """
+    Server wall-clock time in ms for the timer page's clock-offset estimator.
+    Kept trivial (no DB, session or template) so its round trip is mostly network.
+    """
+    response = app.response_class(f'{{"t":{time.time() * 1000:.3f}}}', mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
 @app.route("/about")
 def about():
     return render_template("about.html")
@@ -0,0 +1,201 @@
+"""
+TimerFreak Static Assets
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Fingerprinted static assets. `flask assets-build` (run at deploy time) copies
+every file in static/ to static/dist/ under a content-hashed name, writes
+precompressed .gz (and .br when the optional `brotli` package is installed)
+variants of text assets, and records the mapping in static/dist/assets.json.
+
+Once the manifest exists, url_for('static', filename='style.css') resolves to
+the hashed copy automatically, and hashed files are served with a one-year
+immutable Cache-Control plus Accept-Encoding negotiation. Without a manifest
+(development) everything falls back to the plain files.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+import click
+from flask import request, send_from_directory, url_for
+from werkzeug.exceptions import NotFound
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # optional; .gz variants are still produced
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'assets.json'
+
+# Service worker and PWA manifest must keep stable URLs
+UNVERSIONED = {'worker.js', 'manifest.json', 'site.webmanifest'}
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg', '.ico', '.txt', '.webmanifest', '.map'}
+# Variants are only kept when they save at least this fraction
+MIN_SAVING = 0.05
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _write_variant(path, suffix, data, original_size):
+    if len(data) > original_size * (1 - MIN_SAVING):
+        return False
+    with open(path + suffix, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def build_assets(static_folder, echo=print):
+    """
+    Fingerprint everything under static_folder into static_folder/dist.
+
+    Returns the manifest dict {logical name: {'path', 'gz', 'br'}}. The dist
+    directory is rebuilt from scratch so stale hashes do not accumulate.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.makedirs(dist)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist and not d.startswith('.'))
+        for name in sorted(files):
+            if name.startswith('.'):
+                continue
+            src = os.path.join(root, name)
+            logical = os.path.relpath(src, static_folder).replace(os.sep, '/')
+            if logical in UNVERSIONED:
+                continue
+
+            stem, ext = os.path.splitext(logical)
+            hashed = f"{stem}.{_hash_file(src)}{ext}"
+            dest = os.path.join(dist, hashed)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copy2(src, dest)
+
+            entry = {'path': f"{DIST_DIR}/{hashed}", 'gz': False, 'br': False}
+            if ext.lower() in COMPRESSIBLE:
+                with open(src, 'rb') as f:
+                    data = f.read()
+                entry['gz'] = _write_variant(dest, '.gz', gzip.compress(data, 9, mtime=0), len(data))
+                if brotli is not None:
+                    entry['br'] = _write_variant(dest, '.br', brotli.compress(data, quality=11), len(data))
+            manifest[logical] = entry
+            echo(f"  {logical} -> {entry['path']}" + ''.join(f" +{e}" for e in ('gz', 'br') if entry[e]))
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    if brotli is None:
+        echo("brotli not installed; only .gz variants were written.")
+    return manifest
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _preferred_encodings(header):
+    """Encodings the client accepts, best first (br before gzip on ties)"""
+    accepted = parse_accept_header(header or '')
+    order = []
+    for encoding in ('br', 'gzip'):
+        quality = accepted.quality(encoding)
+        if quality > 0:
+            order.append((quality, encoding == 'br', encoding))
+    return [e for _, _, e in sorted(order, reverse=True)]
+
+
+def init_assets(app):
+    """
+    Rewrite static URLs through the manifest and serve hashed files with
+    immutable caching and precompressed variants.
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions['assets'] = manifest
+    hashed = {entry['path']: entry for entry in manifest.values()}
+    if manifest:
+        app.logger.info(f"Serving {len(manifest)} fingerprinted static assets")
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static':
+            entry = manifest.get(values.get('filename'))
+            if entry:
+                values['filename'] = entry['path']
+
+    plain_static = app.view_functions['static']
+
+    def static(filename):
+        entry = hashed.get(filename)
+        if entry is None:
+            response = plain_static(filename=filename)
+            if filename in UNVERSIONED:
+                response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        encoding = None
+        for candidate in _preferred_encodings(request.headers.get('Accept-Encoding')):
+            if entry['br' if candidate == 'br' else 'gz']:
+                encoding = candidate
+                break
+
+        if encoding:
+            suffix = '.br' if encoding == 'br' else '.gz'
+            # Content-Type of the original file, not application/gzip
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            try:
+                response = send_from_directory(app.static_folder, filename + suffix, mimetype=mimetype)
+            except NotFound:
+                response = send_from_directory(app.static_folder, filename)
+            else:
+                response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(app.static_folder, filename)
+        if entry['gz'] or entry['br']:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+    app.view_functions['static'] = static
+
+    def asset_url(filename):
+        """URL of a static file by its logical name, e.g. for JS-side sound maps"""
+        return url_for('static', filename=filename)
+
+    def asset_urls(filenames):
+        """{logical name: URL} for a set of static files"""
+        return {name: url_for('static', filename=name) for name in filenames if name}
+
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.jinja_env.globals['asset_urls'] = asset_urls
+
+
+def register_asset_commands(app):
+    """Attach asset building to the Flask CLI"""
+
+    @app.cli.command('assets-build')
+    def assets_build():
+        """Fingerprint and precompress static files into static/dist (run at deploy time)."""
+        manifest = build_assets(app.static_folder, echo=click.echo)
+        click.echo(f"Wrote {len(manifest)} assets to {os.path.join(app.static_folder, DIST_DIR)}. "
+                   "Restart the app to pick up the new manifest.")
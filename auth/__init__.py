@@ -3,45 +3,57 @@ TimerFreak Authentication Blueprint
 """
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, session
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from authlib.integrations.flask_client import OAuth
 from datetime import datetime, timezone, timedelta
 import secrets
 from functools import wraps
 
-from models import db, User, OAuthAccount, UserActivityLog, Sequence, CounterLog
+from models import db, User, OAuthAccount, UserActivityLog, Sequence
+from auth.user_cache import load_user
+from auth.passwords import (PasswordHashBusy, hash_password, needs_rehash, normalize_method, verify_password,
+                            register_password_commands)
+from journal import journal
+from user_stats import get_user_stats, sequence_stats
+from activity import ACTIVITY_EVENT_TYPES, activity_page
+from dedupe import find_sequence
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 
-# OAuth setup
-oauth = OAuth()
+# OAuth client registry, built by get_oauth() on the first OAuth request:
+# Authlib imports requests and its HTTP stack, which most workers never use
+_oauth = None
 
 
-def init_auth(app):
-    """Initialize authentication with the Flask app"""
-    login_manager.init_app(app)
-    oauth.init_app(app)
-    
-    # Configure OAuth providers
-    if app.config.get('GOOGLE_CLIENT_ID'):
+def get_oauth():
+    """The Authlib registry with the configured providers"""
+    global _oauth
+    if _oauth is None:
+        from authlib.integrations.flask_client import OAuth
+        oauth = OAuth(current_app._get_current_object())
+        _register_oauth_providers(oauth, current_app.config)
+        _oauth = oauth
+    return _oauth
+
+
+def _register_oauth_providers(oauth, config):
+    if config.get('GOOGLE_CLIENT_ID'):
         oauth.register(
             name='google',
-            client_id=app.config['GOOGLE_CLIENT_ID'],
-            client_secret=app.config['GOOGLE_CLIENT_SECRET'],
+            client_id=config['GOOGLE_CLIENT_ID'],
+            client_secret=config['GOOGLE_CLIENT_SECRET'],
             server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
             client_kwargs={
                 'scope': 'openid email profile',
             },
         )
     
-    if app.config.get('GITHUB_CLIENT_ID'):
+    if config.get('GITHUB_CLIENT_ID'):
         oauth.register(
             name='github',
-            client_id=app.config['GITHUB_CLIENT_ID'],
-            client_secret=app.config['GITHUB_CLIENT_SECRET'],
+            client_id=config['GITHUB_CLIENT_ID'],
+            client_secret=config['GITHUB_CLIENT_SECRET'],
             access_token_url='https://github.com/login/oauth/access_token',
             authorize_url='https://github.com/login/oauth/authorize',
             api_base_url='https://api.github.com/',
@@ -52,11 +64,11 @@ def init_auth(app):
     
     # Note: Apple Sign In requires Apple Developer Program ($99/year)
     # Uncomment below to enable when you have an Apple Developer account
-    # if app.config.get('APPLE_CLIENT_ID'):
+    # if config.get('APPLE_CLIENT_ID'):
     #     oauth.register(
     #         name='apple',
-    #         client_id=app.config['APPLE_CLIENT_ID'],
-    #         client_secret=app.config['APPLE_CLIENT_SECRET'],
+    #         client_id=config['APPLE_CLIENT_ID'],
+    #         client_secret=config['APPLE_CLIENT_SECRET'],
     #         server_metadata_url='https://appleid.apple.com/.well-known/openid-configuration',
     #         client_kwargs={
     #             'scope': 'name email',
@@ -64,37 +76,50 @@ def init_auth(app):
     #             'response_mode': 'form_post',
     #         },
     #     )
-    
+
+
+def init_auth(app):
+    """Initialize authentication with the Flask app"""
+    login_manager.init_app(app)
+
     # Register blueprint
     app.register_blueprint(auth_bp)
     
-    # Setup user loader
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    # Setup user loader (cached per worker, see auth/user_cache.py)
+    login_manager.user_loader(load_user)
+
+    # Fail at startup rather than on the first login
+    normalize_method(app.config['PASSWORD_HASH_METHOD'])
+    register_password_commands(app)
+
+
+@auth_bp.errorhandler(PasswordHashBusy)
+def password_hash_busy(error):
+    """Login burst: this worker's password hashing queue is full (see auth/passwords.py)"""
+    flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'warning')
+    return redirect(request.url, code=303)
 
 
 def log_user_activity(action, category, sequence_id=None, timer_order=None, metadata=None):
-    """Log user activity for analytics and security"""
+    """Log user activity for analytics and security (written in the background, see journal.py)"""
     if not current_user.is_authenticated:
         return
     
     import json
     metadata_str = json.dumps(metadata) if metadata else None
     
-    log = UserActivityLog(
-        user_id=current_user.id,
-        action=action,
-        category=category,
-        ip_address=request.remote_addr,
-        user_agent=request.headers.get('User-Agent', '')[:500],
-        session_id=session.get('session_id', ''),
-        sequence_id=sequence_id,
-        timer_order=timer_order,
-        extra_data=metadata_str,
-    )
-    db.session.add(log)
-    db.session.commit()
+    journal.append({
+        'user_id': current_user.id,
+        'action': action,
+        'category': category,
+        'ip_address': request.remote_addr,
+        'user_agent': request.headers.get('User-Agent', '')[:500],
+        'session_id': session.get('session_id', ''),
+        'sequence_id': sequence_id,
+        'timer_order': timer_order,
+        'extra_data': metadata_str,
+        'timestamp': datetime.now(timezone.utc),
+    })
 
 
 def owner_required(f):
@@ -109,7 +134,7 @@ def owner_required(f):
         sequence_id = kwargs.get('sequence_id') or request.args.get('sequence_id')
         
         if sequence_id:
-            sequence = Sequence.query.get(sequence_id)
+            sequence = find_sequence(sequence_id)
             if sequence and sequence.owner_id and sequence.owner_id != current_user.id:
                 flash('You do not have permission to access this resource.', 'error')
                 return redirect(url_for('index'))
@@ -135,7 +160,7 @@ def login():
         
         user = User.query.filter_by(email=email).first()
         
-        if user and check_password_hash(user.password_hash, password):
+        if user and verify_password(user.password_hash, password):
             if not user.is_active:
                 flash('This account has been deactivated.', 'error')
                 return render_template('auth/login.html')
@@ -143,6 +168,10 @@ def login():
             login_user(user, remember=remember)
             session['session_id'] = secrets.token_urlsafe(32)
             
+            # Upgrade hashes made with older PASSWORD_HASH_METHOD settings
+            if needs_rehash(user.password_hash):
+                user.password_hash = hash_password(password)
+            
             # Update last login
             user.last_login = datetime.now(timezone.utc)
             db.session.commit()
@@ -198,7 +227,7 @@ def register():
         user = User(
             email=email,
             username=username,
-            password_hash=generate_password_hash(password),
+            password_hash=hash_password(password),
             display_name=username,
             verification_token=secrets.token_urlsafe(32),
         )
@@ -284,7 +313,7 @@ def reset_password(token):
             flash('Passwords do not match.', 'error')
             return render_template('auth/reset_password.html', token=token)
         
-        user.password_hash = generate_password_hash(password)
+        user.password_hash = hash_password(password)
         user.reset_token = None
         db.session.commit()
         
@@ -301,7 +330,7 @@ def oauth_login(provider):
         flash('Invalid OAuth provider.', 'error')
         return redirect(url_for('auth.login'))
 
-    oauth_client = oauth.create_client(provider)
+    oauth_client = get_oauth().create_client(provider)
     if not oauth_client:
         flash(f'{provider.capitalize()} login is not configured.', 'error')
         return redirect(url_for('auth.login'))
@@ -317,7 +346,7 @@ def oauth_callback(provider):
         flash('Invalid OAuth provider.', 'error')
         return redirect(url_for('auth.login'))
 
-    oauth_client = oauth.create_client(provider)
+    oauth_client = get_oauth().create_client(provider)
     if not oauth_client:
         flash(f'{provider.capitalize()} login is not configured.', 'error')
         return redirect(url_for('auth.login'))
@@ -425,8 +454,8 @@ def oauth_callback(provider):
 @login_required
 def profile():
     """User profile page"""
-    # Get user's sequences count
-    sequences_count = current_user.sequences.count()
+    # Get user's sequences count (maintained on write, see user_stats.py)
+    stats = get_user_stats(current_user.id)
     
     # Get recent activity
     recent_activity = UserActivityLog.query.filter_by(
@@ -434,7 +463,8 @@ def profile():
     ).order_by(UserActivityLog.timestamp.desc()).limit(10).all()
     
     return render_template('auth/profile.html', 
-                         sequences_count=sequences_count,
+                         sequences_count=stats.sequence_count,
+                         stats=stats,
                          recent_activity=recent_activity)
 
 
@@ -476,7 +506,7 @@ def change_password():
     new_password = request.form.get('new_password')
     confirm_password = request.form.get('confirm_password')
     
-    if not check_password_hash(current_user.password_hash, current_password):
+    if not verify_password(current_user.password_hash, current_password):
         flash('Current password is incorrect.', 'error')
         return redirect(url_for('auth.settings'))
     
@@ -488,7 +518,7 @@ def change_password():
         flash('New passwords do not match.', 'error')
         return redirect(url_for('auth.settings'))
     
-    current_user.password_hash = generate_password_hash(new_password)
+    current_user.password_hash = hash_password(new_password)
     db.session.commit()
     
     log_user_activity('change_password', 'auth')
@@ -501,23 +531,31 @@ def change_password():
 def dashboard():
     """User dashboard with stats"""
     # Get user's sequences
-    user_sequences = current_user.sequences.order_by(Sequence.created_at.desc()).limit(10).all()
+    user_sequences = Sequence.query.filter_by(owner_id=current_user.id).order_by(Sequence.created_at.desc()).limit(10).all()
     
-    # Get stats
-    total_sequences = current_user.sequences.count()
-    total_timers = db.session.query(Sequence).join(Timer).filter(Sequence.owner_id == current_user.id).count()
+    # Get stats: totals from user_stats, per-sequence numbers in one query
+    stats = get_user_stats(current_user.id)
+    user_sequence_stats = sequence_stats(current_user.id, [s.slug for s in user_sequences])
     
-    # Get recent activity logs for owned sequences
-    recent_logs = CounterLog.query.join(Sequence).filter(
-        Sequence.owner_id == current_user.id
-    ).order_by(CounterLog.timestamp.desc()).limit(20).all()
+    # Activity feed on counter_log.owner_id, one keyset page at a time
+    feed_sequence = request.args.get('sequence') or None
+    feed_event_type = request.args.get('event_type') or None
+    try:
+        recent_logs, next_cursor = activity_page(current_user.id, cursor=request.args.get('cursor') or None,
+                                                 sequence_id=feed_sequence, event_type=feed_event_type)
+    except ValueError:
+        return redirect(url_for('auth.dashboard', sequence=feed_sequence, event_type=feed_event_type))
     
     return render_template('auth/dashboard.html',
                          user_sequences=user_sequences,
-                         total_sequences=total_sequences,
-                         total_timers=total_timers,
-                         recent_logs=recent_logs)
-
+                         sequence_stats=user_sequence_stats,
+                         total_sequences=stats.sequence_count,
+                         total_timers=stats.timer_count,
+                         stats=stats,
+                         recent_logs=recent_logs,
+                         next_cursor=next_cursor,
+                         is_first_page=not request.args.get('cursor'),
+                         feed_sequence=feed_sequence,
+                         feed_event_type=feed_event_type,
+                         event_types=ACTIVITY_EVENT_TYPES)
 
-# Import Timer for dashboard
-from models import Timer
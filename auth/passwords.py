@@ -0,0 +1,157 @@
+"""
+TimerFreak Password Hashing
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Werkzeug password hashes with deployment-specific cost. PASSWORD_HASH_METHOD
+takes Werkzeug's method strings, e.g. scrypt:32768:8:1 (the default) or
+pbkdf2:sha256:600000; `flask password-benchmark` measures the candidates on
+the host and suggests one. A successful login whose stored hash was made
+with other parameters is rehashed with the current ones.
+
+With PASSWORD_HASH_THREADS > 0, hashing runs on a pool of that many threads
+per worker (hashlib releases the GIL), so a login burst uses at most that
+many cores of a threaded worker while its other threads keep serving
+timer pages. At most PASSWORD_HASH_QUEUE further hashes may wait; beyond
+that PasswordHashBusy is raised and the user is asked to retry, instead of
+the burst tying up every request thread.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class PasswordHashBusy(Exception):
+    """Too many password hashes are already running or queued in this worker"""
+
+
+def normalize_method(method):
+    """Werkzeug's canonical form of a method string (what it stores in hashes)"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if not args:
+            return DEFAULT_METHOD
+        if len(args) != 3:
+            raise ValueError("'scrypt' takes 3 arguments: scrypt:N:r:p")
+        n, r, p = map(int, args)
+        return f'scrypt:{n}:{r}:{p}'
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' takes 2 arguments: pbkdf2:hash:iterations")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    raise ValueError(f"Invalid password hash method '{method}'")
+
+
+class _HashPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._key = None
+
+    def run(self, fn, *args):
+        threads = current_app.config.get('PASSWORD_HASH_THREADS', 0)
+        if threads <= 0:
+            return fn(*args)
+        queue_limit = current_app.config.get('PASSWORD_HASH_QUEUE', 8)
+        executor, slots = self._get(threads, queue_limit)
+        if not slots.acquire(blocking=False):
+            raise PasswordHashBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future.result()
+
+    def _get(self, threads, queue_limit):
+        # Built on first use in each worker; threads do not survive fork()
+        with self._lock:
+            key = (os.getpid(), threads, queue_limit)
+            if self._key != key:
+                self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='password-hash')
+                self._slots = threading.BoundedSemaphore(threads + queue_limit)
+                self._key = key
+            return self._executor, self._slots
+
+
+_pool = _HashPool()
+
+
+def hash_password(password):
+    """Hash with the configured PASSWORD_HASH_METHOD"""
+    method = current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+    return _pool.run(generate_password_hash, password, method)
+
+
+def verify_password(pwhash, password):
+    """True if password matches pwhash; False for accounts without a password"""
+    if not pwhash or password is None:
+        return False
+    return _pool.run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """True if pwhash was made with other parameters than PASSWORD_HASH_METHOD"""
+    method = normalize_method(current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+    return bool(pwhash) and pwhash.split('$', 1)[0] != method
+
+
+def _time_method(method, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        generate_password_hash('benchmark-password', method)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _scrypt_memory_mb(method):
+    """Memory one scrypt hash needs (128 * N * r bytes); multiply by concurrent logins"""
+    _, n, r, _ = method.split(':')
+    return 128 * int(n) * int(r) / (1024 * 1024)
+
+
+def register_password_commands(app):
+    """Attach password hashing tools to the Flask CLI"""
+
+    @app.cli.command('password-benchmark')
+    @click.option('--target-ms', default=250.0, show_default=True,
+                  help='Longest acceptable time for one hash on this host.')
+    @click.option('--rounds', default=3, show_default=True, help='Timings per candidate; the fastest counts.')
+    def password_benchmark(target_ms, rounds):
+        """Time password hash parameters and suggest PASSWORD_HASH_METHOD."""
+        candidates = [f'scrypt:{2 ** e}:8:1' for e in range(13, 18)]
+        candidates += [f'pbkdf2:sha256:{i}' for i in (200000, 400000, 600000, 1000000)]
+        current = normalize_method(app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD))
+
+        click.echo(f"{'method':<26}{'ms':>10}{'memory MB':>11}")
+        timings = {}
+        for method in candidates + ([current] if current not in candidates else []):
+            timings[method] = _time_method(method, rounds)
+            memory = f"{_scrypt_memory_mb(method):>11.0f}" if method.startswith('scrypt') else f"{'-':>11}"
+            marker = '  (current)' if method == current else ''
+            click.echo(f"{method:<26}{timings[method]:>10.1f}{memory}{marker}")
+
+        # Strongest scrypt setting within budget; scrypt is also memory-hard
+        fitting = [m for m in candidates if m.startswith('scrypt') and timings[m] <= target_ms]
+        if not fitting:
+            fitting = [m for m in candidates if timings[m] <= target_ms]
+        if not fitting:
+            raise click.ClickException(f"No candidate hashes in {target_ms:.0f} ms on this host.")
+        suggestion = fitting[-1]
+        click.echo(f"Suggested: PASSWORD_HASH_METHOD={suggestion} ({timings[suggestion]:.0f} ms per login)")
+        if suggestion != current:
+            click.echo("Existing hashes are upgraded as users log in.")
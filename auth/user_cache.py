@@ -0,0 +1,187 @@
+"""
+TimerFreak User Cache
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Flask-Login loads the logged-in user on every request, timer beacons
+included. Instead of an ORM query each time, load_user() reads a small
+per-worker cache of user records (id, username, display name, tier, active
+flag) kept for USER_CACHE_TTL seconds.
+
+current_user is a CurrentUser wrapping such a record. The cached fields are
+answered from the record; anything else (relationships, password hash,
+timestamps) and every assignment loads the full User entity from the
+request's session first, so handlers work on it exactly as before.
+
+Any ORM update or delete of a User (settings, password change, subscription
+changes) drops its record in this worker when flushed, and again once the
+transaction commits: until then other threads still read the old row and
+may have cached it anew. Code that changes users with bulk UPDATE
+statements must call invalidate_user() after committing. Other workers
+notice within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from types import MappingProxyType
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from models import db, User, SubscriptionTier
+
+# Fields served without touching the database
+RECORD_FIELDS = ('id', 'username', 'display_name', 'subscription_tier', 'subscription_expires', 'is_active')
+
+DEFAULT_TTL = 60
+DEFAULT_SIZE = 10000
+
+# session.info key: ids of users changed in the session's open transaction
+_CHANGED_KEY = 'user_cache_changed'
+
+
+class _UserCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = OrderedDict()  # user id -> (expires_at, record)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._records.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._records[user_id]
+                return None
+            self._records.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, record, ttl, size):
+        with self._lock:
+            self._records[user_id] = (time.monotonic() + ttl, record)
+            self._records.move_to_end(user_id)
+            while len(self._records) > size:
+                self._records.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._records.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+_cache = _UserCache()
+
+
+def invalidate_user(user_id):
+    """Forget the cached record of a user in this worker"""
+    _cache.discard(int(user_id))
+
+
+def clear_user_cache():
+    _cache.clear()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    if target.id is not None:
+        invalidate_user(target.id)
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(_CHANGED_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _session_committed(session):
+    for user_id in session.info.pop(_CHANGED_KEY, ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _session_rolled_back(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def get_user_record(user_id):
+    """The cached read-only record of RECORD_FIELDS, or None if there is no such user"""
+    record = _cache.get(user_id)
+    if record is not None:
+        return record
+    columns = [getattr(User, name) for name in RECORD_FIELDS]
+    row = db.session.execute(select(*columns).where(User.id == user_id)).first()
+    if row is None:
+        return None
+    record = MappingProxyType(dict(zip(RECORD_FIELDS, row)))
+    ttl = current_app.config.get('USER_CACHE_TTL', DEFAULT_TTL)
+    if ttl > 0:
+        _cache.put(user_id, record, ttl, current_app.config.get('USER_CACHE_SIZE', DEFAULT_SIZE))
+    return record
+
+
+class CurrentUser(UserMixin):
+    """
+    The logged-in user for one request. Reads RECORD_FIELDS from the cached
+    record until the User entity is needed, then delegates everything to it.
+    """
+
+    def __init__(self, record):
+        object.__setattr__(self, '_record', record)
+        object.__setattr__(self, '_entity', None)
+
+    def get_entity(self):
+        """The full User, loaded into the current session on first use"""
+        if self._entity is None:
+            object.__setattr__(self, '_entity', db.session.get(User, self._record['id']))
+        return self._entity
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if self._entity is None and name in self._record:
+            return self._record[name]
+        return getattr(self.get_entity(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_entity(), name, value)
+
+    @property
+    def id(self):
+        return self._record['id']
+
+    @property
+    def is_active(self):
+        return self.__getattr__('is_active')
+
+    def _has_tier(self, tier):
+        expires = self.subscription_expires
+        return self.subscription_tier == tier and (expires is None or expires > datetime.now(timezone.utc))
+
+    @property
+    def is_pro(self):
+        """Check if user has Pro subscription"""
+        return self._has_tier(SubscriptionTier.PRO)
+
+    @property
+    def is_team(self):
+        """Check if user has Team subscription"""
+        return self._has_tier(SubscriptionTier.TEAM)
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+def load_user(user_id):
+    """Flask-Login user_loader: a CurrentUser, or None for unknown ids"""
+    try:
+        record = get_user_record(int(user_id))
+    except (TypeError, ValueError):
+        return None
+    return CurrentUser(record) if record is not None else None
@@ -0,0 +1,168 @@
+"""
+TimerFreak Response Compression
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+WSGI middleware that gzip- or Brotli-compresses text responses (HTML, JSON,
+JS, CSS, SVG) according to Accept-Encoding, so dynamic pages are compressed
+even when no reverse proxy does it. Media (MP3, PNG), responses that already
+carry a Content-Encoding (the precompressed assets from assets.py), ranges and
+event streams pass through untouched.
+
+Responses with a known Content-Length below `min_size` are not worth the
+overhead and are left alone; responses of unknown length are compressed
+chunk by chunk with a sync flush, so streamed output still arrives as it is
+produced.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/javascript',
+    'application/json',
+    'application/manifest+json',
+    'application/xml',
+    'image/svg+xml',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+}
+# Compressing these would delay events until a buffer fills
+STREAMING_TYPES = {'text/event-stream'}
+
+
+def _is_compressible(content_type):
+    mimetype = content_type.split(';', 1)[0].strip().lower()
+    if mimetype in STREAMING_TYPES:
+        return False
+    return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES or mimetype.endswith('+json')
+
+
+def _accepted_encoding(header):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None"""
+    qualities = {}
+    for part in (header or '').lower().split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name] = q
+    wildcard = qualities.get('*', 0.0)
+    options = []
+    if brotli is not None:
+        options.append((qualities.get('br', wildcard), 1, 'br'))
+    options.append((qualities.get('gzip', wildcard), 0, 'gzip'))
+    q, _, encoding = max(options)
+    return encoding if q > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding, level, brotli_quality):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 16+ -> gzip container
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data, flush=False):
+        if self.encoding == 'br':
+            out = self._br.process(data)
+            return out + self._br.flush() if flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._br.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compress eligible responses. `level` is the gzip level (1-9),
+    `brotli_quality` the Brotli quality (0-11); `min_size` is in bytes.
+    """
+
+    def __init__(self, app, level=6, min_size=500, brotli_quality=4):
+        self.app = app
+        self.level = level
+        self.min_size = min_size
+        self.brotli_quality = brotli_quality
+
+    def __call__(self, environ, start_response):
+        encoding = _accepted_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            encoding = None
+        state = {}
+
+        def _start_response(status, headers, exc_info=None):
+            state['started'] = True
+            names = {name.lower(): value for name, value in headers}
+            eligible = _is_compressible(names.get('content-type', ''))
+            if eligible:
+                vary = names.get('vary', '')
+                if 'accept-encoding' not in vary.lower() and vary != '*':
+                    headers = [(k, v) for k, v in headers if k.lower() != 'vary']
+                    headers.append(('Vary', f"{vary}, Accept-Encoding" if vary else 'Accept-Encoding'))
+
+            length = names.get('content-length')
+            if (not eligible or encoding is None
+                    or status[:3] in ('204', '206', '304')
+                    or 'content-encoding' in names
+                    or 'content-range' in names
+                    or 'no-transform' in names.get('cache-control', '').lower()
+                    or (length is not None and length.isdigit() and int(length) < self.min_size)):
+                return start_response(status, headers, exc_info)
+
+            compressor = _Compressor(encoding, self.level, self.brotli_quality)
+            state['compressor'] = compressor
+            # Unknown length means the app is streaming; flush every chunk
+            state['stream'] = length is None
+            new_headers = []
+            for name, value in headers:
+                lname = name.lower()
+                if lname == 'content-length':
+                    continue
+                if lname == 'etag' and not value.startswith('W/'):
+                    # Same resource, different bytes: no longer a strong validator
+                    value = 'W/' + value
+                new_headers.append((name, value))
+            new_headers.append(('Content-Encoding', encoding))
+            write = start_response(status, new_headers, exc_info)
+            return lambda data: write(compressor.compress(data, flush=True))
+
+        app_iter = self.app(environ, _start_response)
+        if state.get('started') and 'compressor' not in state:
+            # Decided up front (the usual Flask case): keep file_wrapper etc. intact
+            return app_iter
+        return self._compress_iter(app_iter, state)
+
+    @staticmethod
+    def _compress_iter(app_iter, state):
+        # start_response may also be called lazily, before the first chunk
+        try:
+            for chunk in app_iter:
+                compressor = state.get('compressor')
+                if compressor is None:
+                    yield chunk
+                    continue
+                data = compressor.compress(chunk, flush=state['stream'])
+                if data:
+                    yield data
+            if state.get('compressor') is not None:
+                yield state['compressor'].finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
@@ -0,0 +1,191 @@
+"""
+TimerFreak Sequence Deduplication
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Anonymous visitors submit the same few sequences ("25/5 pomodoro", "Tabata
+20/10") over and over. Anonymous sequences carry content_hash, a SHA-256 of
+their canonical content (name, timers with colors and sounds, loop
+settings), under a unique index: start_timer() looks the hash up and sends
+an identical submission to the existing sequence instead of inserting a
+copy, while still counting it as a start. Sequences with an owner are
+private copies and keep content_hash NULL.
+
+`flask sequence-dedupe` hashes older anonymous sequences and merges
+duplicates into the oldest one. Their public ids stay valid through
+sequence_alias, which find_sequence() follows.
+"""
+import hashlib
+import json
+from collections import defaultdict
+
+import click
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import selectinload
+
+from models import db, Sequence, SequenceAlias, Timer, CounterLog, SequenceShare, UserActivityLog, add_trending_scores
+from search import SEARCH_TABLE, search_available
+
+# Bump when the canonical form changes; old hashes then stop matching
+HASH_VERSION = 1
+
+
+def sequence_content_hash(name, timers, loop_default, loop_count):
+    """
+    Hex SHA-256 of a sequence's canonical content. timers are dicts with
+    name, duration, color and alarm_sound, in order. Missing and empty names
+    hash alike, as they display alike.
+    """
+    canonical = {
+        'v': HASH_VERSION,
+        'name': name or '',
+        'timers': [[t['name'] or '', int(t['duration']), t['color'] or '', t['alarm_sound'] or ''] for t in timers],
+        'loop': [bool(loop_default), loop_count if loop_default else None],
+    }
+    raw = json.dumps(canonical, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _stored_hash(sequence):
+    timers = [{'name': t.timer_name, 'duration': t.duration, 'color': t.color, 'alarm_sound': t.alarm_sound}
+              for t in sequence.timers]
+    return sequence_content_hash(sequence.name, timers, sequence.loop_default, sequence.loop_count)
+
+
+def find_sequence(slug, *options):
+    """The sequence with public id slug (or merged into one), else None"""
+    sequence = Sequence.query.options(*options).filter_by(slug=slug).first()
+    if sequence is None:
+        sequence = Sequence.query.options(*options)\
+            .join(SequenceAlias, SequenceAlias.sequence_id == Sequence.id)\
+            .filter(SequenceAlias.slug == slug).first()
+    return sequence
+
+
+def find_sequences(slugs):
+    """{slug: Sequence} for those of slugs that exist, in at most two queries"""
+    slugs = set(slugs)
+    found = {s.slug: s for s in Sequence.query.filter(Sequence.slug.in_(slugs))}
+    missing = slugs - found.keys()
+    if missing:
+        rows = db.session.query(SequenceAlias.slug, Sequence)\
+            .join(Sequence, SequenceAlias.sequence_id == Sequence.id)\
+            .filter(SequenceAlias.slug.in_(missing))
+        found.update(dict(rows.all()))
+    return found
+
+
+def _merge(keeper_id, duplicate_ids, content_hash, use_fts):
+    """Fold duplicate_ids into keeper_id on the current session; returns rows deleted per table"""
+    keeper = db.session.get(Sequence, keeper_id)
+    duplicates = Sequence.query.filter(Sequence.id.in_(duplicate_ids)).all()
+    for duplicate in duplicates:
+        keeper.start_count += duplicate.start_count
+        keeper.trending_score = add_trending_scores(keeper.trending_score, duplicate.trending_score)
+        keeper.featured = max(keeper.featured, duplicate.featured)
+        if keeper.category_id is None:
+            keeper.category_id = duplicate.category_id
+    keeper.content_hash = content_hash
+
+    # Share links already handed out keep working through the keeper
+    for model in (CounterLog, UserActivityLog, SequenceShare, SequenceAlias):
+        db.session.execute(update(model).where(model.sequence_id.in_(duplicate_ids))
+                           .values(sequence_id=keeper_id))
+    db.session.add_all(SequenceAlias(slug=d.slug, sequence_id=keeper_id) for d in duplicates)
+
+    deleted = {'timer': db.session.execute(delete(Timer).where(Timer.sequence_id.in_(duplicate_ids))).rowcount}
+    if use_fts:
+        db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE sequence_id IN ({','.join(map(str, duplicate_ids))})"))
+    db.session.flush()
+    deleted['sequence'] = db.session.execute(delete(Sequence).where(Sequence.id.in_(duplicate_ids))).rowcount
+    return deleted
+
+
+def _free_bytes():
+    """Bytes on the SQLite freelist (reusable, returned to the OS by VACUUM); None elsewhere"""
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    page_size = db.session.execute(text("PRAGMA page_size")).scalar()
+    return db.session.execute(text("PRAGMA freelist_count")).scalar() * page_size
+
+
+def _age(member):
+    """Sort key of a (created_at, id) group member, oldest first; no created_at counts as oldest"""
+    created_at, sequence_id = member
+    return (created_at is not None, created_at, sequence_id)
+
+
+def dedupe_sequences(batch_size=500, dry_run=False):
+    """
+    Hash every anonymous sequence that has no content_hash yet and merge each
+    group of identical ones into its oldest member by created_at (or the one
+    already hashed): starts, rankings, logs, share links and public ids move
+    to it, the rest are deleted. Commits per batch. Returns a report dict.
+    """
+    hashed = dict(db.session.execute(
+        select(Sequence.content_hash, Sequence.id).where(Sequence.content_hash.isnot(None))).all())
+    groups = defaultdict(list)
+    last_id = 0
+    while True:
+        batch = Sequence.query.options(selectinload(Sequence.timers))\
+            .filter(Sequence.owner_id.is_(None), Sequence.content_hash.is_(None), Sequence.id > last_id)\
+            .order_by(Sequence.id).limit(batch_size).all()
+        if not batch:
+            break
+        for sequence in batch:
+            groups[_stored_hash(sequence)].append((sequence.created_at, sequence.id))
+        last_id = batch[-1].id
+        db.session.expunge_all()
+
+    report = {'scanned': sum(len(members) for members in groups.values()), 'groups': 0,
+              'sequence': 0, 'timer': 0, 'bytes_freed': None}
+    merges = []
+    for content_hash, members in groups.items():
+        keeper_id = hashed.get(content_hash) or min(members, key=_age)[1]
+        duplicate_ids = [i for _, i in members if i != keeper_id]
+        if duplicate_ids:
+            merges.append((keeper_id, duplicate_ids, content_hash))
+        elif not dry_run:
+            db.session.execute(update(Sequence).where(Sequence.id == keeper_id).values(content_hash=content_hash))
+    report['groups'] = len(merges)
+
+    if dry_run:
+        duplicate_ids = [i for _, ids, _ in merges for i in ids]
+        report['sequence'] = len(duplicate_ids)
+        for start in range(0, len(duplicate_ids), batch_size):
+            chunk = duplicate_ids[start:start + batch_size]
+            report['timer'] += db.session.query(func.count(Timer.id))\
+                .filter(Timer.sequence_id.in_(chunk)).scalar()
+        return report
+
+    db.session.commit()
+    free_before = _free_bytes()
+    use_fts = search_available()
+    for start in range(0, len(merges), batch_size):
+        for keeper_id, duplicate_ids, content_hash in merges[start:start + batch_size]:
+            for table, count in _merge(keeper_id, duplicate_ids, content_hash, use_fts).items():
+                report[table] += count
+        db.session.commit()
+    if free_before is not None:
+        report['bytes_freed'] = _free_bytes() - free_before
+    return report
+
+
+def register_dedupe_commands(app):
+    """Attach sequence deduplication to the Flask CLI"""
+
+    @app.cli.command('sequence-dedupe')
+    @click.option('--dry-run', is_flag=True, help='Only report what would be merged.')
+    @click.option('--batch-size', default=500, show_default=True, help='Sequences loaded or merged per transaction.')
+    def sequence_dedupe(dry_run, batch_size):
+        """Merge identical anonymous sequences and report the space reclaimed."""
+        report = dedupe_sequences(batch_size=batch_size, dry_run=dry_run)
+        verb = 'Would remove' if dry_run else 'Removed'
+        click.echo(f"Scanned {report['scanned']} unhashed anonymous sequences; "
+                   f"{report['groups']} have duplicates.")
+        click.echo(f"{verb} {report['sequence']} sequences and {report['timer']} timers.")
+        if report['bytes_freed'] is not None:
+            click.echo(f"Freed {report['bytes_freed'] / 1024:.0f} KiB of database pages; "
+                       "VACUUM returns them to the filesystem.")
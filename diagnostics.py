@@ -0,0 +1,144 @@
+"""
+TimerFreak Diagnostics
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Operational reports for the Flask CLI. `flask import-report` imports the app
+in fresh interpreters under `python -X importtime` (as a gunicorn worker
+would, without the CLI-only extensions) and summarises boot time, peak RSS
+and the packages that dominate it. With --budget-ms it exits non-zero when
+boot is over budget or a deferred subsystem is imported eagerly again, so it
+can gate CI or a deploy.
+
+`flask memory-report --pid <gunicorn master>` breaks down the memory of a
+running gunicorn (Linux /proc): per process RSS, PSS and unique (private)
+memory. Unique memory is what each extra worker really costs; compare runs
+with GUNICORN_PRELOAD=1 and 0 to see what preloading and gc.freeze() share.
+"""
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+import click
+
+# Imported on first use by the code that needs them; a worker boot must not
+# pull these in (QR codes, OAuth logins, migrations, odd datetime strings)
+DEFERRED_MODULES = ('qrcode', 'PIL', 'authlib', 'requests', 'alembic', 'flask_migrate', 'dateutil')
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$')
+_PROBE = "import resource, app; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def measure_import(root_path):
+    """
+    Import app.py in a clean interpreter. Returns (total_us, rss_kb, modules)
+    where modules is a list of (name, self_us, cumulative_us, depth).
+    """
+    env = dict(os.environ)
+    env.pop('FLASK_RUN_FROM_CLI', None)  # measure what a web worker loads
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE],
+        cwd=root_path, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    total_us = sum(self_us for _, self_us, _, _ in modules)
+    rss_kb = int(result.stdout.strip().splitlines()[-1])
+    return total_us, rss_kb, modules
+
+
+def summarize_packages(modules):
+    """Self time per top-level package, largest first"""
+    totals = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        totals[name.split('.', 1)[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def _smaps_rollup(pid):
+    """{field: kB} from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # ppid is the 2nd field after the parenthesised command name
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def process_memory(pid):
+    """(rss, pss, unique) in kB for one process"""
+    fields = _smaps_rollup(pid)
+    unique = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return fields.get('Rss', 0), fields.get('Pss', 0), unique
+
+
+def register_diagnostic_commands(app):
+    """Attach diagnostic reports to the Flask CLI"""
+
+    @app.cli.command('import-report')
+    @click.option('--runs', default=3, show_default=True, help='Fresh interpreters to try; the fastest is reported.')
+    @click.option('--top', default=15, show_default=True, help='Packages to list.')
+    @click.option('--budget-ms', type=float, default=None, help='Fail if importing the app takes longer.')
+    def import_report(runs, top, budget_ms):
+        """Report app import time and memory as a web worker sees it."""
+        best = min((measure_import(app.root_path) for _ in range(max(1, runs))), key=lambda r: r[0])
+        total_us, rss_kb, modules = best
+
+        click.echo(f"App import: {total_us / 1000:.1f} ms, {len(modules)} modules, peak RSS {rss_kb / 1024:.1f} MB")
+        click.echo(f"{'package':<32}{'self ms':>10}")
+        for package, self_us in summarize_packages(modules)[:top]:
+            click.echo(f"{package:<32}{self_us / 1000:>10.1f}")
+
+        eager = sorted({name.split('.', 1)[0] for name, _, _, _ in modules} & set(DEFERRED_MODULES))
+        if eager:
+            click.echo(f"Eagerly imported (should be deferred): {', '.join(eager)}", err=True)
+        over_budget = budget_ms is not None and total_us / 1000 > budget_ms
+        if over_budget:
+            click.echo(f"Import time is over the {budget_ms:.0f} ms budget.", err=True)
+        if budget_ms is not None and (eager or over_budget):
+            sys.exit(1)
+
+    @app.cli.command('memory-report')
+    @click.option('--pid', type=int, required=True, help='PID of the gunicorn master (e.g. systemctl show -p MainPID timerfreak).')
+    def memory_report(pid):
+        """Per-worker RSS, PSS and unique memory of a running gunicorn (Linux)."""
+        try:
+            rows = [('master', pid, *process_memory(pid))]
+            rows += [('worker', child, *process_memory(child)) for child in _children(pid)]
+        except OSError as e:
+            raise click.ClickException(f"Cannot read /proc for pid {pid}: {e}")
+
+        click.echo(f"{'role':<8}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}{'unique MB':>11}")
+        for role, proc_pid, rss, pss, unique in rows:
+            click.echo(f"{role:<8}{proc_pid:>8}{rss / 1024:>10.1f}{pss / 1024:>10.1f}{unique / 1024:>11.1f}")
+        workers = rows[1:]
+        total_pss = sum(row[3] for row in rows)
+        click.echo(f"Total PSS (actual footprint): {total_pss / 1024:.1f} MB")
+        if workers:
+            mean_unique = sum(row[4] for row in workers) / len(workers)
+            click.echo(f"{len(workers)} workers, mean unique {mean_unique / 1024:.1f} MB each")
@@ -0,0 +1,282 @@
+"""
+TimerFreak Activity Journal
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+User activity (logins, profile changes, timer events) is appended to an
+in-memory queue and written by a background thread, so requests neither
+wait for an extra commit nor share a transaction with it. ACTIVITY_JOURNAL
+selects where batches go:
+
+- db (default): one INSERT transaction per batch on its own connection
+- file: JSON lines appended to ACTIVITY_JOURNAL_FILE, loaded into the
+  database later with `flask journal-ingest` (e.g. from cron)
+- sync: written immediately, still outside the request's session
+
+A batch is written once it holds ACTIVITY_JOURNAL_BATCH records or its
+oldest record is ACTIVITY_JOURNAL_INTERVAL seconds old. When the queue is
+full, append() waits up to ACTIVITY_JOURNAL_BLOCK seconds and then writes a
+batch itself: producers slow down instead of records being dropped. A batch
+the database rejects is spilled to the journal file. Pending records are
+written when the worker exits (atexit and gunicorn's worker_exit).
+"""
+import atexit
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import click
+
+from models import db, UserActivityLog
+
+MODES = ('db', 'file', 'sync')
+
+
+class _Marker:
+    """Queued behind pending records; set once they are written"""
+    __slots__ = ('stop', 'done')
+
+    def __init__(self, stop=False):
+        self.stop = stop
+        self.done = threading.Event()
+
+
+def _encode(record):
+    data = dict(record)
+    data['timestamp'] = data['timestamp'].isoformat()
+    return json.dumps(data, separators=(',', ':')) + '\n'
+
+
+def _decode(line):
+    data = json.loads(line)
+    data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+    return data
+
+
+def append_to_file(path, records):
+    """
+    Append records as JSON lines. The exclusive lock and inode check make
+    concurrent writers and `flask journal-ingest` (which renames the file)
+    safe to run together.
+    """
+    payload = ''.join(_encode(r) for r in records).encode()
+    while True:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                same_file = os.fstat(fd).st_ino == os.stat(path).st_ino
+            except FileNotFoundError:
+                same_file = False
+            if not same_file:
+                continue  # renamed away by an ingest while we waited
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view):]
+            return
+        finally:
+            os.close(fd)
+
+
+def insert_records(records, batch_size=500):
+    """Insert journal records into user_activity_log in one transaction"""
+    table = UserActivityLog.__table__
+    with db.engine.begin() as conn:
+        for i in range(0, len(records), batch_size):
+            conn.execute(table.insert(), records[i:i + batch_size])
+
+
+def ingest_file(path, batch_size=500):
+    """
+    Move the records of a journal file into the database. Returns
+    (inserted, skipped). The file is renamed first, so workers keep
+    appending to a new one; an interrupted ingest is resumed next run.
+    """
+    work = path + '.ingesting'
+    if not os.path.exists(work):
+        try:
+            os.replace(path, work)
+        except FileNotFoundError:
+            return 0, 0
+    with open(work, 'rb') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # wait for an append in progress
+        lines = f.read().decode(errors='replace').splitlines()
+    records, skipped = [], 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            records.append(_decode(line))
+        except (ValueError, KeyError, TypeError):
+            skipped += 1  # torn final line after a crash
+    if records:
+        insert_records(records, batch_size)
+    os.remove(work)
+    return len(records), skipped
+
+
+class ActivityJournal:
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self.mode = 'db'
+        self.written = 0
+        self.spilled = 0
+        self.lost = 0
+        self.inline_writes = 0
+
+    def init_app(self, app):
+        mode = app.config.get('ACTIVITY_JOURNAL', 'db')
+        if mode not in MODES:
+            raise ValueError(f"ACTIVITY_JOURNAL must be one of {', '.join(MODES)}, not {mode!r}")
+        self._app = app
+        self.mode = mode
+        self.path = app.config.get('ACTIVITY_JOURNAL_FILE') or os.path.join(app.instance_path, 'activity-journal.jsonl')
+        self.batch_size = max(1, app.config.get('ACTIVITY_JOURNAL_BATCH', 200))
+        self.interval = app.config.get('ACTIVITY_JOURNAL_INTERVAL', 1.0)
+        self.queue_size = max(self.batch_size, app.config.get('ACTIVITY_JOURNAL_QUEUE', 10000))
+        self.block = app.config.get('ACTIVITY_JOURNAL_BLOCK', 0.25)
+        atexit.register(self.close)
+
+    def append(self, record):
+        """Queue one user_activity_log row (a dict of column values)"""
+        if self.mode == 'sync':
+            self._write([record])
+            return
+        records = self._started()
+        try:
+            records.put(record, timeout=self.block)
+        except queue.Full:
+            # Backpressure: this request writes a batch instead of waiting longer
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    item = records.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, _Marker):
+                    records.put(item)  # keep flush/close markers for the writer
+                    break
+                batch.append(item)
+            self.inline_writes += 1
+            self._write(batch)
+
+    def flush(self, timeout=10):
+        """Block until everything queued so far is written. Returns False on timeout."""
+        return self._send_marker(_Marker(), timeout)
+
+    def close(self, timeout=10):
+        """Write pending records and stop the writer (idempotent)"""
+        return self._send_marker(_Marker(stop=True), timeout)
+
+    def stats(self):
+        pending = self._queue.qsize() if self._pid == os.getpid() else 0
+        return {
+            'mode': self.mode,
+            'pending': pending,
+            'written': self.written,
+            'spilled_to_file': self.spilled,
+            'lost': self.lost,
+            'inline_writes': self.inline_writes,
+        }
+
+    def _send_marker(self, marker, timeout):
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return True
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def _started(self):
+        """The queue of this process; the writer thread does not survive fork()"""
+        pid = os.getpid()
+        if self._pid != pid or not self._thread.is_alive():
+            with self._lock:
+                if self._pid != pid or not self._thread.is_alive():
+                    if self._pid != pid:
+                        self._queue = queue.Queue(maxsize=self.queue_size)
+                    self._thread = threading.Thread(target=self._run, name='activity-journal', daemon=True)
+                    self._thread.start()
+                    self._pid = pid
+        return self._queue
+
+    def _run(self):
+        records = self._queue
+        while True:
+            batch, marker = [], None
+            item = records.get()
+            if isinstance(item, _Marker):
+                marker = item
+            else:
+                batch.append(item)
+                deadline = time.monotonic() + self.interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = records.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if isinstance(item, _Marker):
+                        marker = item
+                        break
+                    batch.append(item)
+            if batch:
+                self._write(batch)
+            if marker is not None:
+                marker.done.set()
+                if marker.stop:
+                    return
+
+    def _write(self, batch):
+        if self.mode == 'file':
+            self._append_file(batch)
+            return
+        try:
+            with self._app.app_context():
+                insert_records(batch)
+            self.written += len(batch)
+        except Exception:
+            self._app.logger.exception(f"Activity journal: insert of {len(batch)} records failed, spilling to {self.path}")
+            if self._append_file(batch):
+                self.spilled += len(batch)
+
+    def _append_file(self, batch):
+        try:
+            append_to_file(self.path, batch)
+        except OSError:
+            self._app.logger.exception(f"Activity journal: lost {len(batch)} records, cannot write {self.path}")
+            self.lost += len(batch)
+            return False
+        if self.mode == 'file':
+            self.written += len(batch)
+        return True
+
+
+journal = ActivityJournal()
+
+
+def register_journal_commands(app):
+    """Attach activity journal maintenance to the Flask CLI"""
+
+    @app.cli.command('journal-ingest')
+    @click.option('--path', default=None, help='Journal file (defaults to ACTIVITY_JOURNAL_FILE).')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per INSERT.')
+    def journal_ingest(path, batch_size):
+        """Load activity records from the journal file into the database."""
+        path = path or journal.path
+        inserted, skipped = ingest_file(path, batch_size)
+        click.echo(f"Ingested {inserted} activity records from {path}"
+                   + (f", skipped {skipped} unreadable lines" if skipped else ""))
@@ -0,0 +1,294 @@
+"""
+TimerFreak Live Sync
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Live multi-device sync for a running sequence. A host page publishes its
+engine state (start, pause, goto, restart, stop) and viewer pages follow it
+over Server-Sent Events:
+
+    GET  /timer/<sequence_id>/live?session=<code>   SSE stream of state events
+    POST /timer/<sequence_id>/live                  {"session", "token", "state"}
+
+Both are served by `flask live-server`, a small asyncio HTTP server with an
+in-memory fan-out broker, so thousands of idle viewers cost one coroutine and
+a small queue each instead of a WSGI worker. Run it next to the WSGI app and
+route /timer/<id>/live to it (see DEPLOYMENT.md), or point LIVE_URL at it.
+
+Sessions are created by the Flask app (POST /timer/<id>/live/session), which
+hands the host a token signed with FLASK_SECRET_KEY; the live server checks
+it before accepting a publish, so both processes must share that key.
+"""
+import asyncio
+import json
+import re
+import secrets
+import time
+from urllib.parse import urlsplit, parse_qs
+
+import click
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+TOKEN_SALT = 'timerfreak-live'
+TOKEN_MAX_AGE = 12 * 3600        # a host token is good for one long class
+SESSION_RE = re.compile(r'^[A-Za-z0-9_-]{6,32}$')
+PATH_RE = re.compile(r'^(?:/.*)?/timer/([^/]+)/live$')
+
+HEARTBEAT_SECONDS = 15           # keeps proxies from closing idle streams
+SUBSCRIBER_QUEUE = 16            # per viewer; older states are dropped when full
+CHANNEL_IDLE_SECONDS = 3600      # forget channels with no viewers and no publishes
+MAX_HEADER_BYTES = 8192
+MAX_BODY_BYTES = 16384
+
+
+def new_session_code():
+    return secrets.token_urlsafe(8)
+
+
+def _serializer(secret_key):
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+
+
+def make_host_token(secret_key, sequence_id, session):
+    """Token allowing its holder to publish to one live session"""
+    return _serializer(secret_key).dumps([sequence_id, session])
+
+
+def check_host_token(secret_key, token, sequence_id, session):
+    try:
+        return _serializer(secret_key).loads(token, max_age=TOKEN_MAX_AGE) == [sequence_id, session]
+    except (BadSignature, TypeError, ValueError):
+        return False
+
+
+class LiveBroker:
+    """
+    Channels keyed by (sequence_id, session). Each subscriber owns a bounded
+    asyncio.Queue; publish() never blocks, and a slow viewer just skips to
+    newer states. The last state is kept so late joiners sync immediately.
+
+    Messages are (state JSON, monotonic publish time); the stream adds the
+    message's age at delivery, so viewers can advance a running timer by the
+    time it spent in flight without trusting anyone's wall clock.
+    """
+
+    def __init__(self):
+        self.channels = {}
+
+    def _channel(self, key):
+        channel = self.channels.get(key)
+        if channel is None:
+            channel = self.channels[key] = {'subscribers': set(), 'last': None, 'touched': time.monotonic()}
+        return channel
+
+    def subscribe(self, key):
+        channel = self._channel(key)
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        if channel['last'] is not None:
+            queue.put_nowait(channel['last'])
+        channel['subscribers'].add(queue)
+        channel['touched'] = time.monotonic()
+        return queue
+
+    def unsubscribe(self, key, queue):
+        channel = self.channels.get(key)
+        if channel:
+            channel['subscribers'].discard(queue)
+            channel['touched'] = time.monotonic()
+
+    def publish(self, key, state_json):
+        channel = self._channel(key)
+        message = (state_json, time.monotonic())
+        channel['last'] = message
+        channel['touched'] = message[1]
+        for queue in channel['subscribers']:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+        return len(channel['subscribers'])
+
+    def prune(self):
+        cutoff = time.monotonic() - CHANNEL_IDLE_SECONDS
+        for key in [k for k, c in self.channels.items() if not c['subscribers'] and c['touched'] < cutoff]:
+            del self.channels[key]
+
+    @property
+    def subscriber_count(self):
+        return sum(len(c['subscribers']) for c in self.channels.values())
+
+
+def _response(status, body=b'', content_type='application/json', extra=()):
+    headers = [
+        f"HTTP/1.1 {status}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Access-Control-Allow-Origin: *",
+        "Connection: close",
+        *extra,
+    ]
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode() + body
+
+
+def _json_error(status, message):
+    return _response(status, json.dumps({'error': message}).encode())
+
+
+class LiveServer:
+    def __init__(self, secret_key, logger=None):
+        self.secret_key = secret_key
+        self.broker = LiveBroker()
+        self.log = logger or (lambda msg: None)
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        try:
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, _ = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            match = PATH_RE.match(url.path)
+        except ValueError:
+            await self._send(writer, _json_error('400 Bad Request', 'Malformed request'))
+            return
+
+        if not match:
+            await self._send(writer, _json_error('404 Not Found', 'Not found'))
+        elif method == 'OPTIONS':
+            await self._send(writer, _response('204 No Content', extra=(
+                "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+                "Access-Control-Allow-Headers: Content-Type",
+                "Access-Control-Max-Age: 86400",
+            )))
+        elif method == 'GET':
+            session = parse_qs(url.query).get('session', [''])[0]
+            if not SESSION_RE.match(session):
+                await self._send(writer, _json_error('400 Bad Request', 'Missing or invalid session'))
+            else:
+                await self._stream(reader, writer, (match.group(1), session))
+        elif method == 'POST':
+            await self._publish(reader, writer, match.group(1), headers)
+        else:
+            await self._send(writer, _json_error('405 Method Not Allowed', 'Method not allowed'))
+
+    async def _send(self, writer, data):
+        try:
+            writer.write(data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _publish(self, reader, writer, sequence_id, headers):
+        try:
+            length = int(headers.get('content-length', '0'))
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_BODY_BYTES:
+            await self._send(writer, _json_error('400 Bad Request', 'Missing or oversized body'))
+            return
+        try:
+            payload = json.loads(await reader.readexactly(length))
+            session, token, state = payload['session'], payload['token'], payload['state']
+        except (asyncio.IncompleteReadError, ValueError, KeyError, TypeError):
+            await self._send(writer, _json_error('400 Bad Request', 'Expected {"session", "token", "state"}'))
+            return
+        if not isinstance(session, str) or not SESSION_RE.match(session) or not isinstance(state, dict):
+            await self._send(writer, _json_error('400 Bad Request', 'Invalid session or state'))
+            return
+        if not check_host_token(self.secret_key, token, sequence_id, session):
+            await self._send(writer, _json_error('403 Forbidden', 'Invalid host token'))
+            return
+
+        viewers = self.broker.publish((sequence_id, session), json.dumps(state, separators=(',', ':')))
+        await self._send(writer, _response('200 OK', json.dumps({'viewers': viewers}).encode()))
+
+    async def _stream(self, reader, writer, key):
+        queue = self.broker.subscribe(key)
+
+        async def watch_disconnect():
+            # Viewers never send anything; EOF means they left. A None in the
+            # queue ends the stream loop below right away.
+            try:
+                while await reader.read(1024):
+                    pass
+            except ConnectionError:
+                pass
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            writer.write((
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: text/event-stream\r\n"
+                "Cache-Control: no-cache\r\n"
+                "X-Accel-Buffering: no\r\n"
+                "Access-Control-Allow-Origin: *\r\n"
+                "Connection: keep-alive\r\n\r\n"
+                "retry: 2000\n\n"
+            ).encode())
+            await writer.drain()
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                else:
+                    if message is None:
+                        break
+                    state_json, published = message
+                    age_ms = int((time.monotonic() - published) * 1000)
+                    writer.write(f'event: state\ndata: {{"age_ms":{age_ms},"state":{state_json}}}\n\n'.encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            watcher.cancel()
+            self.broker.unsubscribe(key, queue)
+            writer.close()
+
+    async def _housekeeping(self):
+        while True:
+            await asyncio.sleep(60)
+            self.broker.prune()
+            self.log(f"live: {self.broker.subscriber_count} viewers in {len(self.broker.channels)} sessions")
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        self.log(f"Live sync server listening on http://{host}:{port}")
+        housekeeping = asyncio.create_task(self._housekeeping())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            housekeeping.cancel()
+
+
+def register_live_commands(app):
+    """Attach the live sync server to the Flask CLI"""
+
+    @app.cli.command('live-server')
+    @click.option('--host', default='127.0.0.1', show_default=True)
+    @click.option('--port', default=5002, show_default=True, type=int)
+    def live_server(host, port):
+        """Run the SSE server for live multi-device sync (one per node)."""
+        if not app.config.get('LIVE_SECRET_CONFIGURED'):
+            click.echo("Warning: FLASK_SECRET_KEY is not set, so host tokens issued by the web app "
+                       "will not verify here.", err=True)
+        server = LiveServer(app.secret_key, logger=click.echo)
+        try:
+            asyncio.run(server.serve(host, port))
+        except KeyboardInterrupt:
+            pass
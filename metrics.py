@@ -0,0 +1,155 @@
+"""
+TimerFreak Request Metrics
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+In-process timing for this worker, exported as JSON by /admin/metrics:
+
+- requests, per URL rule: wall time, plus how much of it went to template
+  rendering and to database round trips (count and time)
+- templates, per top-level template: render time, measured between Flask's
+  before_render_template and template_rendered signals
+
+Each entry keeps a count, total, max and a fixed-bucket histogram (for
+p50/p95), so numbers from several workers can be summed. Every gunicorn
+worker has its own registry; the response says which pid answered.
+"""
+import bisect
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Histogram upper bounds in ms; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class _Series:
+    __slots__ = ('count', 'total', 'max', 'buckets', 'extra')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.extra = {}
+
+    def observe(self, ms, **extra):
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        for key, value in extra.items():
+            self.extra[key] = self.extra.get(key, 0) + value
+
+    def _quantile(self, q):
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else round(self.max, 1)
+        return round(self.max, 1)
+
+    def as_dict(self):
+        data = {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 2) if self.count else 0,
+            'max_ms': round(self.max, 2),
+            'p50_ms': self._quantile(0.5),
+            'p95_ms': self._quantile(0.95),
+            'buckets_ms': dict(zip([*map(str, BUCKETS_MS), 'inf'], self.buckets)),
+        }
+        for key, value in self.extra.items():
+            data[f'mean_{key}'] = round(value / self.count, 2) if self.count else 0
+        return data
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.since = datetime.now(timezone.utc)
+        self.requests = {}
+        self.templates = {}
+
+    def observe(self, table, name, ms, **extra):
+        with self._lock:
+            series = table.get(name)
+            if series is None:
+                series = table[name] = _Series()
+            series.observe(ms, **extra)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'since': self.since.isoformat(),
+                'requests': {name: s.as_dict() for name, s in sorted(self.requests.items())},
+                'templates': {name: s.as_dict() for name, s in sorted(self.templates.items())},
+            }
+
+
+metrics = Metrics()
+_render_starts = threading.local()
+
+
+def _on_before_render(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack is None:
+        stack = _render_starts.stack = []
+    stack.append(time.perf_counter())
+
+
+def _on_rendered(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if not stack:
+        return
+    seconds = time.perf_counter() - stack.pop()
+    metrics.observe(metrics.templates, template.name or '<string>', seconds * 1000)
+    if has_request_context():
+        g._metrics_render = g.get('_metrics_render', 0.0) + seconds
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('_metrics_query_start')
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    if has_request_context():
+        g._metrics_db = g.get('_metrics_db', 0.0) + seconds
+        g._metrics_queries = g.get('_metrics_queries', 0) + 1
+
+
+def init_metrics(app):
+    """Time every request and every render_template() call"""
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.teardown_request
+    def _record_request(exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        metrics.observe(
+            metrics.requests, f"{request.method} {rule}", (time.perf_counter() - start) * 1000,
+            render_ms=g.get('_metrics_render', 0.0) * 1000,
+            db_ms=g.get('_metrics_db', 0.0) * 1000,
+            db_queries=g.get('_metrics_queries', 0),
+        )
@@ -0,0 +1,35 @@
+"""add owner activity feed indexes to counter_log
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'a7b8c9d0e1f2'
+down_revision = 'f6a7b8c9d0e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The feed reads counter_log.owner_id only; fill it in for older rows
+    op.execute("""
+    UPDATE counter_log SET owner_id = (
+        SELECT sequence.owner_id FROM sequence WHERE sequence.id = counter_log.sequence_id
+    )
+    WHERE owner_id IS NULL
+    """)
+
+    op.create_index('ix_counter_log_owner_feed', 'counter_log', ['owner_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_counter_log_owner_event_feed', 'counter_log', ['owner_id', 'event_type', 'timestamp', 'id'], unique=False)
+    # Covered by the leading column of ix_counter_log_owner_feed
+    op.drop_index('ix_counter_log_owner_id', table_name='counter_log')
+
+
+def downgrade():
+    op.create_index('ix_counter_log_owner_id', 'counter_log', ['owner_id'], unique=False)
+    op.drop_index('ix_counter_log_owner_event_feed', table_name='counter_log')
+    op.drop_index('ix_counter_log_owner_feed', table_name='counter_log')
@@ -0,0 +1,282 @@
+"""integer primary key for sequence, token kept as public slug
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-19
+
+sequence.id becomes an integer and the old random token moves to
+sequence.slug (unique); timer, counter_log, sequence_share and
+user_activity_log switch their sequence_id to the integer.
+
+The bulk copy and the foreign key backfill run in batches of BATCH_SIZE
+rows, each committed on its own, so the app can keep serving (and writing)
+while they run; if interrupted, running it again resumes where the batches
+stopped. Sequences are copied in creation order, so the new integer ids
+follow created_at. The final step catches up rows and counters written in
+the meantime (including child rows of sequences created during the copy)
+and swaps the tables in one transaction. Drain the activity journal
+(`flask journal-ingest`) before upgrading: records queued with the old
+string ids are not converted.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b8c9d0e1f2a3'
+down_revision = 'a7b8c9d0e1f2'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+# (table, NOT NULL, foreign key) for every column holding a sequence id
+CHILDREN = (
+    ('timer', True, True),
+    ('counter_log', True, True),
+    ('sequence_share', True, True),
+    ('user_activity_log', False, False),
+)
+
+# Indexes on sequence_id besides ix_<table>_sequence_id
+EXTRA_CHILD_INDEXES = {
+    'counter_log': [('ix_counter_log_sequence_time', ['sequence_id', 'timestamp'])],
+}
+
+SEQUENCE_INDEXES = (
+    ('ix_sequence_name', ['name']),
+    ('ix_sequence_featured', ['featured']),
+    ('ix_sequence_created_at', ['created_at']),
+    ('ix_sequence_owner_id', ['owner_id']),
+    ('ix_sequence_is_public', ['is_public']),
+    ('ix_sequence_category_id', ['category_id']),
+    ('ix_sequence_public_rank', ['is_public', 'start_count', 'id']),
+    ('ix_sequence_category_rank', ['is_public', 'category_id', 'start_count', 'id']),
+    ('ix_sequence_public_trending', ['is_public', 'trending_score', 'id']),
+    ('ix_sequence_category_trending', ['is_public', 'category_id', 'trending_score', 'id']),
+)
+
+COPIED_COLUMNS = ('name', 'theme', 'featured', 'created_at', 'owner_id', 'is_public', 'category_id',
+                  'start_count', 'trending_score')
+
+SEARCH_TABLE = 'sequence_search'
+
+# Copy order; sequences without created_at sort first
+SORT_KEY = "COALESCE({t}created_at, :epoch), {t}id"
+EPOCH = sa.bindparam('epoch', datetime(1970, 1, 1), type_=sa.DateTime())
+
+
+def _create_sequence_table(name, integer_ids):
+    if integer_ids:
+        key = [sa.Column('id', sa.Integer(), nullable=False),
+               sa.Column('slug', sa.String(length=20), nullable=False)]
+    else:
+        key = [sa.Column('id', sa.String(length=20), nullable=False)]
+    op.create_table(name,
+    *key,
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('theme', sa.String(length=50), nullable=True),
+    sa.Column('featured', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('is_public', sa.Boolean(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('start_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('trending_score', sa.Float(), server_default='-1000000000', nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], name='fk_sequence_owner_id_user'),
+    sa.ForeignKeyConstraint(['category_id'], ['timer_category.id'], name='fk_sequence_category_id_timer_category'),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def _column_lists(integer_ids):
+    """(target columns, source expressions) copying old-schema rows to the new one or back"""
+    columns = ', '.join(COPIED_COLUMNS)
+    if integer_ids:
+        return f"slug, {columns}", f"id, {columns}"
+    return f"id, {columns}", f"slug, {columns}"
+
+
+def _stage(conn, staged, integer_ids, ref_type):
+    """Staging table and sequence_ref columns; kept from an interrupted run"""
+    inspector = sa.inspect(conn)
+    if not inspector.has_table(staged):
+        _create_sequence_table(staged, integer_ids)
+        if integer_ids:
+            op.create_index('ix_sequence_slug', staged, ['slug'], unique=True)
+    for table, _, _ in CHILDREN:
+        if 'sequence_ref' not in {c['name'] for c in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column('sequence_ref', ref_type, nullable=True))
+
+
+def _keys(integer_ids):
+    """(target column, source column) holding the same public id"""
+    return ('slug', 'id') if integer_ids else ('id', 'slug')
+
+
+def _copy_sequences(conn, target, integer_ids):
+    """
+    Copy sequence rows into target in SORT_KEY order, BATCH_SIZE per
+    statement; integer ids are assigned in that order.
+    """
+    into, select = _column_lists(integer_ids)
+    target_key, source_key = _keys(integer_ids)
+    key = SORT_KEY.format(t='')
+    # Resume after the last row an interrupted run copied
+    last = conn.execute(sa.text(
+        f"SELECT {SORT_KEY.format(t='s.')} FROM sequence s JOIN {target} t ON t.{target_key} = s.{source_key} "
+        f"ORDER BY 1 DESC, 2 DESC LIMIT 1"
+    ).bindparams(EPOCH)).first()
+    while True:
+        after = f"WHERE ({key}) > (:last_at, :last_id) " if last is not None else ""
+        params = {'last_at': last[0], 'last_id': last[1]} if last is not None else {}
+        keys = conn.execute(sa.text(
+            f"SELECT {key} FROM sequence {after}ORDER BY {key} LIMIT :n"
+        ).bindparams(EPOCH), {**params, 'n': BATCH_SIZE}).all()
+        if not keys:
+            return
+        after = f"({key}) > (:last_at, :last_id) AND " if last is not None else ""
+        conn.execute(sa.text(
+            f"INSERT INTO {target} ({into}) SELECT {select} FROM sequence "
+            f"WHERE {after}({key}) <= (:hi_at, :hi_id) ORDER BY {key}"
+        ).bindparams(EPOCH), {**params, 'hi_at': keys[-1][0], 'hi_id': keys[-1][1]})
+        last = keys[-1]
+
+
+def _sync_sequences(conn, target, integer_ids):
+    """Copy sequences created since _copy_sequences and refresh counters changed since"""
+    into, select = _column_lists(integer_ids)
+    target_key, source_key = _keys(integer_ids)
+    conn.execute(sa.text(
+        f"INSERT INTO {target} ({into}) SELECT {select} FROM sequence "
+        f"WHERE {source_key} NOT IN (SELECT {target_key} FROM {target}) ORDER BY {SORT_KEY.format(t='')}"
+    ).bindparams(EPOCH))
+    mutable = ('name', 'theme', 'featured', 'is_public', 'category_id', 'start_count', 'trending_score')
+    op.execute(
+        f"UPDATE {target} SET ({', '.join(mutable)}) = ("
+        f"SELECT {', '.join(mutable)} FROM sequence s WHERE s.{source_key} = {target}.{target_key})"
+    )
+
+
+def _backfill_children(conn, lookup):
+    """
+    Set each child's sequence_ref from its sequence_id via lookup, BATCH_SIZE
+    ids per statement. Returns the highest id seen per table.
+    """
+    tops = {}
+    for table, _, _ in CHILDREN:
+        top = conn.execute(sa.text(f"SELECT MAX(id) FROM {table}")).scalar() or 0
+        for lower in range(0, top, BATCH_SIZE):
+            conn.execute(sa.text(
+                f"UPDATE {table} SET sequence_ref = ({lookup.format(table=table)}) WHERE id > :lo AND id <= :hi"
+            ), {'lo': lower, 'hi': lower + BATCH_SIZE})
+        tops[table] = top
+    return tops
+
+
+def _catch_up_children(conn, lookup, tops):
+    """
+    Backfill rows added since _backfill_children, and rows it left NULL:
+    children of sequences created after the copy can have ids below the top
+    it saw. Runs in the final transaction.
+    """
+    for table, _, _ in CHILDREN:
+        conn.execute(sa.text(
+            f"UPDATE {table} SET sequence_ref = ({lookup.format(table=table)}) "
+            f"WHERE id > :top OR (sequence_ref IS NULL AND sequence_id IS NOT NULL)"
+        ), {'top': tops[table]})
+
+
+def _swap_children(target, ref_type):
+    """Replace each child's sequence_id with sequence_ref, referencing target"""
+    for table, not_null, foreign_key in CHILDREN:
+        if not_null:
+            # Rows of deleted sequences (nothing enforced the string foreign key)
+            op.execute(f"DELETE FROM {table} WHERE sequence_ref IS NULL")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for index_name, _ in EXTRA_CHILD_INDEXES.get(table, []):
+                batch_op.drop_index(index_name)
+            batch_op.drop_index(f'ix_{table}_sequence_id')
+            batch_op.drop_column('sequence_id')
+            if foreign_key:
+                batch_op.create_foreign_key(f'fk_{table}_sequence_id_sequence', target, ['sequence_ref'], ['id'])
+            batch_op.alter_column('sequence_ref', new_column_name='sequence_id',
+                                  existing_type=ref_type, nullable=not not_null)
+        op.create_index(f'ix_{table}_sequence_id', table, ['sequence_id'], unique=False)
+        for index_name, columns in EXTRA_CHILD_INDEXES.get(table, []):
+            op.create_index(index_name, table, columns, unique=False)
+
+
+def _replace_sequence_table(conn, staged):
+    op.drop_table('sequence')
+    op.rename_table(staged, 'sequence')
+    if conn.dialect.name == 'postgresql':
+        op.execute(f"ALTER INDEX {staged}_pkey RENAME TO sequence_pkey")
+    for index_name, columns in SEQUENCE_INDEXES:
+        op.create_index(index_name, 'sequence', columns, unique=False)
+
+
+def _rebuild_search_index(conn, with_slug):
+    """sequence_search holds sequence ids; rebuild it for the new ones (SQLite FTS5 only)"""
+    if conn.dialect.name != 'sqlite' or not conn.execute(sa.text(
+            f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{SEARCH_TABLE}'")).first():
+        return
+    slug_column, slug_value = (",\n        slug UNINDEXED", ", s.slug") if with_slug else ("", "")
+    op.execute(f"DROP TABLE {SEARCH_TABLE}")
+    op.execute(f"""
+    CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        sequence_id UNINDEXED,
+        name,
+        timer_names,
+        category_id UNINDEXED,
+        timer_count UNINDEXED,
+        total_duration UNINDEXED{slug_column},
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """)
+    op.execute(f"""
+    INSERT INTO {SEARCH_TABLE} (sequence_id, name, timer_names, category_id, timer_count, total_duration{', slug' if with_slug else ''})
+    SELECT s.id, COALESCE(s.name, ''), COALESCE(group_concat(t.timer_name, ' '), ''),
+           s.category_id, COUNT(t.id), COALESCE(SUM(t.duration), 0){slug_value}
+    FROM sequence s
+    LEFT JOIN timer t ON t.sequence_id = s.id
+    WHERE s.is_public = 1
+    GROUP BY s.id
+    """)
+
+
+def upgrade():
+    conn = op.get_bind()
+    _stage(conn, 'sequence_new', True, sa.Integer())
+
+    lookup = "SELECT n.id FROM sequence_new n WHERE n.slug = {table}.sequence_id"
+    with op.get_context().autocommit_block():
+        _copy_sequences(conn, 'sequence_new', integer_ids=True)
+        tops = _backfill_children(conn, lookup)
+
+    # Catch up with writes made during the batches, then swap
+    _sync_sequences(conn, 'sequence_new', integer_ids=True)
+    _catch_up_children(conn, lookup, tops)
+    _swap_children('sequence_new', sa.Integer())
+    _replace_sequence_table(conn, 'sequence_new')
+    if conn.dialect.name == 'postgresql':
+        op.execute("ALTER SEQUENCE sequence_new_id_seq RENAME TO sequence_id_seq")
+    _rebuild_search_index(conn, with_slug=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    _stage(conn, 'sequence_old', False, sa.String(length=20))
+
+    lookup = "SELECT s.slug FROM sequence s WHERE s.id = {table}.sequence_id"
+    with op.get_context().autocommit_block():
+        _copy_sequences(conn, 'sequence_old', integer_ids=False)
+        tops = _backfill_children(conn, lookup)
+
+    _sync_sequences(conn, 'sequence_old', integer_ids=False)
+    _catch_up_children(conn, lookup, tops)
+    _swap_children('sequence_old', sa.String(length=20))
+    _replace_sequence_table(conn, 'sequence_old')
+    _rebuild_search_index(conn, with_slug=False)
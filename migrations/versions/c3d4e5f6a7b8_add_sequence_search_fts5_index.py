@@ -0,0 +1,51 @@
+"""add sequence_search FTS5 index
+
+Revision ID: c3d4e5f6a7b8
+Revises: 132b3ae7ac6b
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c3d4e5f6a7b8'
+down_revision = '132b3ae7ac6b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases use the LIKE fallback in search.py
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS sequence_search USING fts5(
+        sequence_id UNINDEXED,
+        name,
+        timer_names,
+        category_id UNINDEXED,
+        timer_count UNINDEXED,
+        total_duration UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """)
+
+    # Backfill existing public sequences
+    op.execute("""
+    INSERT INTO sequence_search (sequence_id, name, timer_names, category_id, timer_count, total_duration)
+    SELECT s.id, COALESCE(s.name, ''), COALESCE(group_concat(t.timer_name, ' '), ''),
+           s.category_id, COUNT(t.id), COALESCE(SUM(t.duration), 0)
+    FROM sequence s
+    LEFT JOIN timer t ON t.sequence_id = s.id
+    WHERE s.is_public = 1
+    GROUP BY s.id
+    """)
+    op.execute("INSERT INTO sequence_search (sequence_search) VALUES ('optimize')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS sequence_search")
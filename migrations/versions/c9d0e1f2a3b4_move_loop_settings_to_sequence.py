@@ -0,0 +1,54 @@
+"""move loop_default and loop_count from timer to sequence
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c9d0e1f2a3b4'
+down_revision = 'b8c9d0e1f2a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('loop_default', sa.Boolean(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('loop_count', sa.Integer(), nullable=True))
+
+    # Every timer of a sequence carried the same settings; take the first one's
+    op.execute("""
+    UPDATE sequence SET
+        loop_default = COALESCE((
+            SELECT t.loop_default FROM timer t WHERE t.sequence_id = sequence.id
+            ORDER BY t.timer_order LIMIT 1
+        ), loop_default),
+        loop_count = (
+            SELECT t.loop_count FROM timer t WHERE t.sequence_id = sequence.id
+            ORDER BY t.timer_order LIMIT 1
+        )
+    """)
+
+    with op.batch_alter_table('timer', schema=None) as batch_op:
+        batch_op.drop_column('loop_count')
+        batch_op.drop_column('loop_default')
+
+
+def downgrade():
+    with op.batch_alter_table('timer', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('loop_default', sa.Boolean(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('loop_count', sa.Integer(), nullable=True))
+
+    op.execute("""
+    UPDATE timer SET
+        loop_default = (SELECT s.loop_default FROM sequence s WHERE s.id = timer.sequence_id),
+        loop_count = (SELECT s.loop_count FROM sequence s WHERE s.id = timer.sequence_id)
+    """)
+
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.drop_column('loop_count')
+        batch_op.drop_column('loop_default')
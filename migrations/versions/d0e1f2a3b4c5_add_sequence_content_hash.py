@@ -0,0 +1,40 @@
+"""add sequence content hash and sequence_alias
+
+Revision ID: d0e1f2a3b4c5
+Revises: c9d0e1f2a3b4
+Create Date: 2026-10-19
+
+Existing sequences keep content_hash NULL; `flask sequence-dedupe` hashes
+them and merges duplicates.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd0e1f2a3b4c5'
+down_revision = 'c9d0e1f2a3b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_sequence_content_hash', 'sequence', ['content_hash'], unique=True)
+
+    op.create_table('sequence_alias',
+    sa.Column('slug', sa.String(length=20), nullable=False),
+    sa.Column('sequence_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['sequence_id'], ['sequence.id'], ),
+    sa.PrimaryKeyConstraint('slug')
+    )
+    op.create_index('ix_sequence_alias_sequence_id', 'sequence_alias', ['sequence_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sequence_alias_sequence_id', table_name='sequence_alias')
+    op.drop_table('sequence_alias')
+
+    op.drop_index('ix_sequence_content_hash', table_name='sequence')
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
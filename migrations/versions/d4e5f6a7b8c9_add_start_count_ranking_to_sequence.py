@@ -0,0 +1,38 @@
+"""add start_count ranking to sequence
+
+Revision ID: d4e5f6a7b8c9
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4e5f6a7b8c9'
+down_revision = 'c3d4e5f6a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('start_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from the event log
+    op.execute("""
+    UPDATE sequence SET start_count = (
+        SELECT COUNT(*) FROM counter_log
+        WHERE counter_log.sequence_id = sequence.id AND counter_log.event_type = 'sequence_start'
+    )
+    """)
+
+    op.create_index('ix_sequence_public_rank', 'sequence', ['is_public', 'start_count', 'id'], unique=False)
+    op.create_index('ix_sequence_category_rank', 'sequence', ['is_public', 'category_id', 'start_count', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sequence_category_rank', table_name='sequence')
+    op.drop_index('ix_sequence_public_rank', table_name='sequence')
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.drop_column('start_count')
@@ -0,0 +1,71 @@
+"""trending_score: sentinel for sequences without starts
+
+Revision ID: e1f2a3b4c5d6
+Revises: d0e1f2a3b4c5
+Create Date: 2026-10-19
+
+trending_score defaulted to 0, which reads as "one start at the epoch":
+sequences whose starts all predate it ranked below never-started ones, and
+every incremental start added that phantom start. Unstarted sequences now
+hold NO_STARTS and every score is recomputed from counter_log (what `flask
+trending-rebuild` does).
+"""
+import math
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e1f2a3b4c5d6'
+down_revision = 'd0e1f2a3b4c5'
+branch_labels = None
+depends_on = None
+
+# Must match ranking.TRENDING_EPOCH / TRENDING_HALF_LIFE_DAYS and models.TRENDING_NO_STARTS
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DECAY_RATE = math.log(2) / (7 * 86400)
+NO_STARTS = -1e9
+
+BATCH_SIZE = 1000
+
+
+def _scores(conn):
+    """log-sum of exp(DECAY_RATE * (t - epoch)) over each sequence's starts"""
+    scores = {}
+    rows = conn.execute(sa.text(
+        "SELECT sequence_id, timestamp FROM counter_log WHERE event_type = 'sequence_start'"
+    ))
+    for sequence_id, timestamp in rows:
+        if timestamp is None:
+            continue
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        x = DECAY_RATE * (timestamp - TRENDING_EPOCH).total_seconds()
+        prev = scores.get(sequence_id)
+        scores[sequence_id] = x if prev is None else max(prev, x) + math.log1p(math.exp(-abs(prev - x)))
+    return scores
+
+
+def upgrade():
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.alter_column('trending_score', existing_type=sa.Float(), existing_nullable=False,
+                              server_default=str(int(NO_STARTS)))
+
+    conn = op.get_bind()
+    scores = list(_scores(conn).items())
+    conn.execute(sa.text("UPDATE sequence SET trending_score = :none"), {'none': NO_STARTS})
+    for i in range(0, len(scores), BATCH_SIZE):
+        conn.execute(
+            sa.text("UPDATE sequence SET trending_score = :score WHERE id = :id"),
+            [{'id': k, 'score': v} for k, v in scores[i:i + BATCH_SIZE]]
+        )
+
+
+def downgrade():
+    op.execute(f"UPDATE sequence SET trending_score = 0 WHERE trending_score <= {NO_STARTS}")
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.alter_column('trending_score', existing_type=sa.Float(), existing_nullable=False,
+                              server_default='0')
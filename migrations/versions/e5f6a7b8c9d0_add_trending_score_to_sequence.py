@@ -0,0 +1,60 @@
+"""add time-decayed trending_score to sequence
+
+Revision ID: e5f6a7b8c9d0
+Revises: d4e5f6a7b8c9
+Create Date: 2026-10-19
+
+"""
+import math
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5f6a7b8c9d0'
+down_revision = 'd4e5f6a7b8c9'
+branch_labels = None
+depends_on = None
+
+# Must match ranking.TRENDING_EPOCH / TRENDING_HALF_LIFE_DAYS and models.TRENDING_NO_STARTS
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DECAY_RATE = math.log(2) / (7 * 86400)
+NO_STARTS = '-1000000000'
+
+
+def upgrade():
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('trending_score', sa.Float(), server_default=NO_STARTS, nullable=False))
+
+    # Backfill sequences with starts (the rest keep NO_STARTS): log-sum of exp(DECAY_RATE * (t - epoch)) over each sequence's starts
+    conn = op.get_bind()
+    scores = {}
+    rows = conn.execute(sa.text(
+        "SELECT sequence_id, timestamp FROM counter_log WHERE event_type = 'sequence_start'"
+    ))
+    for sequence_id, timestamp in rows:
+        if timestamp is None:
+            continue
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        x = DECAY_RATE * (timestamp - TRENDING_EPOCH).total_seconds()
+        prev = scores.get(sequence_id)
+        scores[sequence_id] = x if prev is None else max(prev, x) + math.log1p(math.exp(-abs(prev - x)))
+    if scores:
+        conn.execute(
+            sa.text("UPDATE sequence SET trending_score = :score WHERE id = :id"),
+            [{'id': k, 'score': v} for k, v in scores.items()]
+        )
+
+    op.create_index('ix_sequence_public_trending', 'sequence', ['is_public', 'trending_score', 'id'], unique=False)
+    op.create_index('ix_sequence_category_trending', 'sequence', ['is_public', 'category_id', 'trending_score', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sequence_category_trending', table_name='sequence')
+    op.drop_index('ix_sequence_public_trending', table_name='sequence')
+    with op.batch_alter_table('sequence', schema=None) as batch_op:
+        batch_op.drop_column('trending_score')
@@ -0,0 +1,47 @@
+"""add user_stats table
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f6a7b8c9d0e1'
+down_revision = 'e5f6a7b8c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('sequence_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('timer_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('total_starts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_activity', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+    # Backfill (same query as user_stats.rebuild_user_stats)
+    op.execute("""
+    INSERT INTO user_stats (user_id, sequence_count, timer_count, total_starts, last_activity)
+    SELECT u.id,
+           (SELECT COUNT(*) FROM sequence s WHERE s.owner_id = u.id),
+           (SELECT COUNT(*) FROM timer t JOIN sequence s ON s.id = t.sequence_id WHERE s.owner_id = u.id),
+           (SELECT COALESCE(SUM(s.start_count), 0) FROM sequence s WHERE s.owner_id = u.id),
+           (SELECT MAX(c.timestamp) FROM counter_log c JOIN sequence s ON s.id = c.sequence_id
+            WHERE s.owner_id = u.id AND c.event_type = 'sequence_start')
+    FROM "user" u
+    """)
+
+    op.create_index('ix_counter_log_sequence_time', 'counter_log', ['sequence_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_counter_log_sequence_time', table_name='counter_log')
+    op.drop_table('user_stats')
@@ -5,16 +5,31 @@ Copyright (c) 2025 - Pet Martino
 This software is licensed under the MIT License.
 See the LICENSE file for more details.
 """
+import math
 from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from sqlalchemy import DateTime, Integer, String, ForeignKey, Boolean, Text, Enum as SQLEnum
+from sqlalchemy import DateTime, Integer, Float, String, ForeignKey, Boolean, Text, Enum as SQLEnum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
 
 db = SQLAlchemy()
 
+# Sequence.trending_score of a sequence never started: below any real score
+# (log-space, see ranking.py) and absorbed by the first start
+TRENDING_NO_STARTS = -1e9
+
+
+def add_trending_scores(a, b):
+    """ln(exp(a) + exp(b)) of two trending scores; None and TRENDING_NO_STARTS add nothing"""
+    if a is None or a <= TRENDING_NO_STARTS:
+        return b if b is not None else a
+    if b is None or b <= TRENDING_NO_STARTS:
+        return a
+    hi, lo = (a, b) if a >= b else (b, a)
+    return hi + math.log1p(math.exp(lo - hi))
+
 
 class SubscriptionTier(enum.Enum):
     """Subscription tiers for monetization"""
@@ -75,6 +90,21 @@ class User(UserMixin, db.Model):
         )
 
 
+class UserStats(db.Model):
+    """Per-user totals for the dashboard and profile, maintained on write (see user_stats.py)"""
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    sequence_count = db.Column(Integer, default=0, nullable=False, server_default='0')
+    timer_count = db.Column(Integer, default=0, nullable=False, server_default='0')
+    total_starts = db.Column(Integer, default=0, nullable=False, server_default='0')
+    # Latest sequence_start on any of the user's sequences
+    last_activity = db.Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f'<UserStats {self.user_id}: {self.sequence_count} sequences>'
+
+
 class OAuthAccount(db.Model):
     """OAuth provider accounts linked to users"""
     __tablename__ = 'oauth_account'
@@ -116,7 +146,7 @@ class UserActivityLog(db.Model):
     session_id = db.Column(String(100), nullable=True, index=True)
     
     # Optional references to related objects
-    sequence_id = db.Column(String(20), nullable=True, index=True)
+    sequence_id = db.Column(Integer, nullable=True, index=True)
     timer_order = db.Column(Integer, nullable=True)
     
     # Additional data (JSON string)
@@ -151,7 +181,9 @@ class Sequence(db.Model):
     """Timer sequence model - updated with owner reference"""
     __tablename__ = 'sequence'
 
-    id = db.Column(String(20), primary_key=True)
+    id = db.Column(Integer, primary_key=True)
+    # Public random token; the id in URLs, API payloads and the timer page
+    slug = db.Column(String(20), unique=True, nullable=False, index=True)
     name = db.Column(String(100), index=True)
     theme = db.Column(String(50), nullable=True)
     featured = db.Column(Integer, default=0, nullable=False, index=True)
@@ -164,11 +196,42 @@ class Sequence(db.Model):
     # Category reference (nullable - admin managed only)
     category_id = db.Column(Integer, ForeignKey('timer_category.id'), nullable=True, index=True)
 
+    # Loop settings for the sequence
+    loop_default = db.Column(Boolean, default=False, nullable=False, server_default='0')
+    loop_count = db.Column(Integer, nullable=True)  # NULL means unlimited loops
+
+    # Anonymous sequences only: identical submissions share one row (see dedupe.py)
+    content_hash = db.Column(String(64), unique=True, nullable=True, index=True)
+
+    # Precomputed ranking: number of sequence_start events (maintained on write)
+    start_count = db.Column(Integer, default=0, nullable=False, server_default='0')
+    # log of time-decayed starts relative to ranking.TRENDING_EPOCH; see ranking.py
+    trending_score = db.Column(Float, default=TRENDING_NO_STARTS, nullable=False, server_default='-1000000000')
+
     # Relationships
     timers = relationship('Timer', backref='sequence', cascade="all, delete-orphan", order_by="Timer.timer_order")
 
+    __table_args__ = (
+        # Keyset pagination for browse: (start_count DESC, id DESC) per visibility/category
+        db.Index('ix_sequence_public_rank', 'is_public', 'start_count', 'id'),
+        db.Index('ix_sequence_category_rank', 'is_public', 'category_id', 'start_count', 'id'),
+        db.Index('ix_sequence_public_trending', 'is_public', 'trending_score', 'id'),
+        db.Index('ix_sequence_category_trending', 'is_public', 'category_id', 'trending_score', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<Sequence {self.slug}>'
+
+
+class SequenceAlias(db.Model):
+    """Public ids of duplicate sequences merged into another by `flask sequence-dedupe`"""
+    __tablename__ = 'sequence_alias'
+
+    slug = db.Column(String(20), primary_key=True)
+    sequence_id = db.Column(Integer, ForeignKey('sequence.id'), nullable=False, index=True)
+
     def __repr__(self):
-        return f'<Sequence {self.id}>'
+        return f'<SequenceAlias {self.slug} -> {self.sequence_id}>'
 
 
 class Timer(db.Model):
@@ -176,17 +239,13 @@ class Timer(db.Model):
     __tablename__ = 'timer'
 
     id = db.Column(Integer, primary_key=True)
-    sequence_id = db.Column(String(20), ForeignKey('sequence.id'), nullable=False, index=True)
+    sequence_id = db.Column(Integer, ForeignKey('sequence.id'), nullable=False, index=True)
     timer_name = db.Column(String(100))
     duration = db.Column(Integer, nullable=False)
     timer_order = db.Column(Integer, nullable=False, index=True)
     color = db.Column(String(7), default="#0cd413")
     alarm_sound = db.Column(String(100))
 
-    # Loop settings for the sequence
-    loop_default = db.Column(Boolean, default=False, nullable=False, server_default='0')
-    loop_count = db.Column(Integer, nullable=True)  # NULL means unlimited loops
-
     def __repr__(self):
         return f'<Timer {self.id}>'
 
@@ -212,16 +271,24 @@ class CounterLog(db.Model):
     __tablename__ = 'counter_log'
     
     id = db.Column(Integer, primary_key=True)
-    sequence_id = db.Column(String(20), ForeignKey('sequence.id'), nullable=False, index=True)
+    sequence_id = db.Column(Integer, ForeignKey('sequence.id'), nullable=False, index=True)
     timer_order = db.Column(Integer, nullable=True)
     event_type = db.Column(String(50), nullable=False, index=True)
     timestamp = db.Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
     
     # Owner reference (denormalized for faster queries)
-    owner_id = db.Column(Integer, ForeignKey('user.id'), nullable=True, index=True)
+    owner_id = db.Column(Integer, ForeignKey('user.id'), nullable=True)
     
     # Relationship
     sequence_rel = relationship('Sequence', backref='logs')
+
+    __table_args__ = (
+        # Latest event per sequence (user_stats.sequence_stats)
+        db.Index('ix_counter_log_sequence_time', 'sequence_id', 'timestamp'),
+        # Owner activity feed, newest first, optionally per event type (activity.py)
+        db.Index('ix_counter_log_owner_feed', 'owner_id', 'timestamp', 'id'),
+        db.Index('ix_counter_log_owner_event_feed', 'owner_id', 'event_type', 'timestamp', 'id'),
+    )
     
     def __repr__(self):
         return f'<CounterLog {self.id} - {self.event_type} - Seq: {self.sequence_id}>'
@@ -249,7 +316,7 @@ class SequenceShare(db.Model):
     __tablename__ = 'sequence_share'
     
     id = db.Column(Integer, primary_key=True)
-    sequence_id = db.Column(String(20), ForeignKey('sequence.id'), nullable=False, index=True)
+    sequence_id = db.Column(Integer, ForeignKey('sequence.id'), nullable=False, index=True)
     share_token = db.Column(String(50), unique=True, nullable=False, index=True)
     
     # Share settings
@@ -0,0 +1,90 @@
+"""
+TimerFreak Sequence Ranking
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Time-decayed "trending" popularity for sequences.
+
+Each sequence_start contributes exp(-DECAY_RATE * age) to a sequence's
+popularity. Rather than decaying every row over time, every contribution is
+scaled relative to a fixed epoch, exp(DECAY_RATE * (t - TRENDING_EPOCH)), and
+the running sum is stored as a logarithm (trending_score). Multiplying all
+sums by the same decay factor never changes their order, so ORDER BY
+trending_score ranks by current decayed popularity with no periodic rewrite,
+and recording a start is a single-row UPDATE. A sequence with no starts
+holds TRENDING_NO_STARTS, which ranks below every started one and which
+logaddexp() turns into exactly the first start's weight.
+"""
+import math
+from datetime import datetime, timezone
+
+import click
+from sqlalchemy import text
+
+from models import db, Sequence, TRENDING_NO_STARTS, add_trending_scores
+from database import logaddexp
+
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+# Changing the half-life requires `flask trending-rebuild`
+TRENDING_HALF_LIFE_DAYS = 7
+DECAY_RATE = math.log(2) / (TRENDING_HALF_LIFE_DAYS * 86400)
+
+
+def trending_exponent(when=None):
+    """log-space weight of one start at `when` (default: now)"""
+    when = when or datetime.now(timezone.utc)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return DECAY_RATE * (when - TRENDING_EPOCH).total_seconds()
+
+
+def trending_value(score, now=None):
+    """Decayed start count as of `now`, e.g. 3.2 "recent starts"; for display only"""
+    return math.exp(score - trending_exponent(now))
+
+
+def record_sequence_start(sequence_id, when=None):
+    """
+    Count one start towards both rankings: start_count (all-time) and
+    trending_score (decayed). Single-row UPDATE that commits with the caller.
+    """
+    Sequence.query.filter_by(id=sequence_id).update({
+        Sequence.start_count: Sequence.start_count + 1,
+        Sequence.trending_score: logaddexp(Sequence.trending_score, trending_exponent(when)),
+    }, synchronize_session=False)
+
+
+def rebuild_trending_scores(batch_size=1000):
+    """Recompute trending_score for every sequence from counter_log; returns sequences scored"""
+    scores = {}
+    result = db.session.execute(text(
+        "SELECT sequence_id, timestamp FROM counter_log WHERE event_type = 'sequence_start'"
+    )).yield_per(batch_size)
+    for sequence_id, timestamp in result:
+        if timestamp is None:
+            continue
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        scores[sequence_id] = add_trending_scores(scores.get(sequence_id), trending_exponent(timestamp))
+
+    db.session.execute(text("UPDATE sequence SET trending_score = :none"), {'none': TRENDING_NO_STARTS})
+    items = list(scores.items())
+    for i in range(0, len(items), batch_size):
+        db.session.execute(
+            text("UPDATE sequence SET trending_score = :score WHERE id = :id"),
+            [{'id': k, 'score': v} for k, v in items[i:i + batch_size]]
+        )
+    db.session.commit()
+    return len(scores)
+
+
+def register_ranking_commands(app):
+    """Attach ranking maintenance to the Flask CLI"""
+
+    @app.cli.command('trending-rebuild')
+    def trending_rebuild():
+        """Recompute trending scores from the event log (after changing the half-life)."""
+        count = rebuild_trending_scores()
+        click.echo(f"Recomputed trending scores for {count} sequences.")
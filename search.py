@@ -0,0 +1,213 @@
+"""
+TimerFreak Sequence Search
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Full-text search over public sequence names and their timer names, backed by
+an SQLite FTS5 table (`sequence_search`). Rows are added on the write paths
+that create public sequences; `flask search-reindex` rebuilds the whole index.
+Databases without FTS5 (e.g. PostgreSQL) fall back to a LIKE scan.
+"""
+import math
+import re
+
+import click
+from sqlalchemy import text, func
+
+from models import db, Sequence, Timer
+
+SEARCH_TABLE = 'sequence_search'
+
+# Column order matters: bm25() weights are positional
+_CREATE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    sequence_id UNINDEXED,
+    name,
+    timer_names,
+    category_id UNINDEXED,
+    timer_count UNINDEXED,
+    total_duration UNINDEXED,
+    slug UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+_REBUILD_SQL = f"""
+INSERT INTO {SEARCH_TABLE} (sequence_id, name, timer_names, category_id, timer_count, total_duration, slug)
+SELECT s.id, COALESCE(s.name, ''), COALESCE(group_concat(t.timer_name, ' '), ''),
+       s.category_id, COUNT(t.id), COALESCE(SUM(t.duration), 0), s.slug
+FROM sequence s
+LEFT JOIN timer t ON t.sequence_id = s.id
+WHERE s.is_public = 1
+GROUP BY s.id
+"""
+
+# Name matches count double; timer names still matter ("tabata" inside a HIIT set)
+_BM25 = f"bm25({SEARCH_TABLE}, 0.0, 2.0, 1.0, 0.0, 0.0, 0.0, 0.0)"
+
+# How many text-ranked candidates are re-ranked by usage
+CANDIDATE_POOL = 200
+# Weight of log(usage) relative to text relevance when blending
+USAGE_WEIGHT = 0.25
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(q):
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term ("pomo"*), and terms are ANDed,
+    so partially typed queries match and FTS5 syntax in user input is inert.
+    Returns None when there is nothing searchable.
+    """
+    tokens = _TOKEN_RE.findall(q or '')
+    if not tokens:
+        return None
+    return ' '.join('"%s"*' % t.replace('"', '""') for t in tokens[:8])
+
+
+def search_available():
+    """True when the FTS5 index exists on the current database"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    return db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first() is not None
+
+
+def index_sequence(sequence, timers):
+    """
+    Add a newly created sequence to the search index.
+
+    Runs on the caller's session, so the index row commits (or rolls back)
+    together with the sequence itself. Private sequences are not indexed.
+    """
+    if not sequence.is_public or not search_available():
+        return
+    db.session.execute(text(
+        f"INSERT INTO {SEARCH_TABLE} (sequence_id, name, timer_names, category_id, timer_count, total_duration, slug) "
+        "VALUES (:sequence_id, :name, :timer_names, :category_id, :timer_count, :total_duration, :slug)"
+    ), {
+        'sequence_id': sequence.id,
+        'slug': sequence.slug,
+        'name': sequence.name or '',
+        'timer_names': ' '.join(t.timer_name for t in timers if t.timer_name),
+        'category_id': sequence.category_id,
+        'timer_count': len(timers),
+        'total_duration': sum(t.duration for t in timers),
+    })
+
+
+def rebuild_search_index():
+    """Drop and repopulate the FTS5 table from sequence/timer; returns row count"""
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+        conn.execute(text(_CREATE_SQL))
+        conn.execute(text(_REBUILD_SQL))
+        conn.execute(text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"))
+        return conn.execute(text(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")).scalar()
+
+
+def _fts_candidates(match, filters):
+    f = SEARCH_TABLE
+    where = [f"{f} MATCH :match"]
+    params = {'match': match, 'pool': CANDIDATE_POOL}
+    if filters.get('category_id') is not None:
+        where.append(f"{f}.category_id = :category_id")
+        params['category_id'] = filters['category_id']
+    for key, column, op in (('min_duration', 'total_duration', '>='), ('max_duration', 'total_duration', '<='),
+                            ('min_timers', 'timer_count', '>='), ('max_timers', 'timer_count', '<=')):
+        if filters.get(key) is not None:
+            where.append(f"{f}.{column} {op} :{key}")
+            params[key] = filters[key]
+
+    # Usage comes from sequence.start_count, the number browse ranks by
+    rows = db.session.execute(text(
+        f"SELECT {f}.sequence_id, {f}.slug, {f}.name, {f}.timer_count, {f}.total_duration, {f}.category_id, "
+        f"s.start_count, {_BM25} AS score "
+        f"FROM {f} JOIN sequence s ON s.id = {f}.sequence_id "
+        f"WHERE {' AND '.join(where)} ORDER BY score LIMIT :pool"
+    ), params).all()
+    # bm25() is lower-is-better; flip it so bigger means more relevant
+    return [(r.sequence_id, r.slug, r.name, r.timer_count, r.total_duration, r.category_id, r.start_count, -r.score)
+            for r in rows]
+
+
+def _like_candidates(q, filters):
+    """Fallback for databases without FTS5: name-only substring match"""
+    timer_stats = db.session.query(
+        Timer.sequence_id,
+        func.count(Timer.id).label('timer_count'),
+        func.coalesce(func.sum(Timer.duration), 0).label('total_duration')
+    ).group_by(Timer.sequence_id).subquery()
+
+    query = db.session.query(
+        Sequence.id, Sequence.slug, Sequence.name, timer_stats.c.timer_count, timer_stats.c.total_duration,
+        Sequence.category_id, Sequence.start_count
+    ).join(timer_stats, Sequence.id == timer_stats.c.sequence_id)\
+     .filter(Sequence.is_public == True)
+    for token in _TOKEN_RE.findall(q)[:8]:
+        query = query.filter(Sequence.name.ilike(f"%{token}%"))
+    if filters.get('category_id') is not None:
+        query = query.filter(Sequence.category_id == filters['category_id'])
+    if filters.get('min_duration') is not None:
+        query = query.filter(timer_stats.c.total_duration >= filters['min_duration'])
+    if filters.get('max_duration') is not None:
+        query = query.filter(timer_stats.c.total_duration <= filters['max_duration'])
+    if filters.get('min_timers') is not None:
+        query = query.filter(timer_stats.c.timer_count >= filters['min_timers'])
+    if filters.get('max_timers') is not None:
+        query = query.filter(timer_stats.c.timer_count <= filters['max_timers'])
+    return [(*r, 1.0) for r in query.limit(CANDIDATE_POOL).all()]
+
+
+def search_sequences(q, limit=20, **filters):
+    """
+    Search public sequences.
+
+    Text relevance (BM25) picks the top CANDIDATE_POOL matches; those are
+    re-ranked by relevance * (1 + USAGE_WEIGHT * ln(1 + starts)), so popular
+    sequences win ties without burying a precise name match. Returns a list
+    of dicts ordered best-first.
+    """
+    if search_available():
+        match = build_match_query(q)
+        if match is None:
+            return []
+        candidates = _fts_candidates(match, filters)
+    else:
+        if not _TOKEN_RE.findall(q or ''):
+            return []
+        candidates = _like_candidates(q, filters)
+
+    results = []
+    for sequence_id, slug, name, timer_count, total_duration, category_id, use_count, relevance in candidates:
+        use_count = use_count or 0
+        results.append({
+            'id': slug,
+            'name': name or None,
+            'category_id': int(category_id) if category_id not in (None, '') else None,
+            'timer_count': int(timer_count or 0),
+            'total_duration': int(total_duration or 0),
+            'use_count': use_count,
+            'score': relevance * (1 + USAGE_WEIGHT * math.log1p(use_count)),
+        })
+    results.sort(key=lambda r: r['score'], reverse=True)
+    return results[:limit]
+
+
+def register_search_commands(app):
+    """Attach search index maintenance to the Flask CLI"""
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Rebuild the full-text search index (SQLite only)."""
+        if db.engine.dialect.name != 'sqlite':
+            raise click.ClickException("Full-text index requires SQLite FTS5; other databases use the LIKE fallback.")
+        count = rebuild_search_index()
+        click.echo(f"Indexed {count} public sequences.")
@@ -0,0 +1,238 @@
+"""
+TimerFreak Sequence View Cache
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+The timer, preview, clone, manifest, QR and redirect pages only read a
+sequence and its timers. get_sequence_view() answers them with a
+SequenceView: an immutable snapshot with the timer lists, display strings,
+loop settings and total duration already worked out, kept in a per-worker
+LRU of SEQUENCE_CACHE_SIZE entries for SEQUENCE_CACHE_TTL seconds.
+
+start_timer() stores the view of a new sequence as it creates it, so the
+redirect to its preview is answered from memory. Any ORM update or delete
+of a Sequence or change to its Timers drops its views in this worker when
+flushed, and again once the transaction commits (other threads may have
+cached the old rows in between). Code that changes sequences with bulk
+statements must call invalidate_sequence() after committing; other workers
+notice within the TTL.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session, selectinload
+
+from models import Sequence, Timer
+from dedupe import find_sequence
+
+DEFAULT_TTL = 300
+DEFAULT_SIZE = 2000
+
+# session.info key: ids of sequences changed in the session's open transaction
+_CHANGED_KEY = 'sequence_view_changed'
+
+
+def format_duration_display(total_seconds):
+    """Compact duration string for listings, e.g. 1h 5m, 45s"""
+    total_seconds = int(total_seconds or 0)
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    seconds = total_seconds % 60
+
+    duration_parts = []
+    if hours > 0:
+        duration_parts.append(f"{hours}h")
+    if minutes > 0:
+        duration_parts.append(f"{minutes}m")
+    if seconds > 0 or not duration_parts:
+        duration_parts.append(f"{seconds}s")
+    return " ".join(duration_parts)
+
+
+def _timer_duration_display(total_seconds):
+    """Per-timer duration on the preview page, seconds always shown, e.g. 1m 0s"""
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    duration_parts = []
+    if hours > 0:
+        duration_parts.append(f"{hours}h")
+    if minutes > 0:
+        duration_parts.append(f"{minutes}m")
+    duration_parts.append(f"{total_seconds % 60}s")
+    return " ".join(duration_parts)
+
+
+class TimerView(NamedTuple):
+    order: int
+    name: Optional[str]      # as stored; None if unnamed
+    label: str               # name, or "Timer N"
+    duration: int            # seconds
+    duration_display: str
+    color: Optional[str]
+    alarm_sound: Optional[str]
+
+
+class SequenceView(NamedTuple):
+    """Read-only snapshot of a sequence and its timers, shared between requests"""
+    id: int
+    slug: str
+    name: Optional[str]
+    owner_id: Optional[int]
+    is_public: bool
+    loop_default: bool
+    loop_count: Optional[int]
+    timers: tuple            # TimerView, in order
+    timer_durations: tuple
+    timer_names: tuple       # labels, as the timer page shows them
+    timer_colors: tuple
+    timer_alarm_sounds: tuple
+    total_duration: int
+    total_duration_display: str
+    timers_json: str         # the timers as the index form is prefilled with them
+
+    def form_timers(self):
+        """The timers as fresh dicts (name, duration, color, alarm_sound) for the session"""
+        return json.loads(self.timers_json)
+
+
+def build_sequence_view(sequence, timers):
+    """A SequenceView of sequence and its timers (in order)"""
+    timer_views = tuple(
+        TimerView(
+            order=t.timer_order,
+            name=t.timer_name,
+            label=t.timer_name if t.timer_name else f"Timer {t.timer_order + 1}",
+            duration=t.duration,
+            duration_display=_timer_duration_display(t.duration),
+            color=t.color,
+            alarm_sound=t.alarm_sound,
+        )
+        for t in timers
+    )
+    total = sum(t.duration for t in timer_views)
+    return SequenceView(
+        id=sequence.id,
+        slug=sequence.slug,
+        name=sequence.name,
+        owner_id=sequence.owner_id,
+        is_public=sequence.is_public,
+        loop_default=sequence.loop_default,
+        loop_count=sequence.loop_count,
+        timers=timer_views,
+        timer_durations=tuple(t.duration for t in timer_views),
+        timer_names=tuple(t.label for t in timer_views),
+        timer_colors=tuple(t.color for t in timer_views),
+        timer_alarm_sounds=tuple(t.alarm_sound for t in timer_views),
+        total_duration=total,
+        total_duration_display=format_duration_display(total),
+        timers_json=json.dumps([
+            {'name': t.name, 'duration': t.duration, 'color': t.color, 'alarm_sound': t.alarm_sound}
+            for t in timer_views
+        ]),
+    )
+
+
+class _SequenceCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = OrderedDict()  # public id (slug or alias) -> (expires_at, view)
+
+    def get(self, slug):
+        with self._lock:
+            entry = self._views.get(slug)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._views[slug]
+                return None
+            self._views.move_to_end(slug)
+            return entry[1]
+
+    def put(self, slug, view, ttl, size):
+        with self._lock:
+            self._views[slug] = (time.monotonic() + ttl, view)
+            self._views.move_to_end(slug)
+            while len(self._views) > size:
+                self._views.popitem(last=False)
+
+    def discard_sequence(self, sequence_id):
+        with self._lock:
+            stale = [slug for slug, (_, view) in self._views.items() if view.id == sequence_id]
+            for slug in stale:
+                del self._views[slug]
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+_cache = _SequenceCache()
+
+
+def invalidate_sequence(sequence_id):
+    """Forget every cached view of a sequence in this worker"""
+    _cache.discard_sequence(sequence_id)
+
+
+def clear_sequence_cache():
+    _cache.clear()
+
+
+def _changed(target, sequence_id):
+    invalidate_sequence(sequence_id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_KEY, set()).add(sequence_id)
+
+
+@event.listens_for(Sequence, 'after_update')
+@event.listens_for(Sequence, 'after_delete')
+def _sequence_changed(mapper, connection, target):
+    if target.id is not None:
+        _changed(target, target.id)
+
+
+@event.listens_for(Timer, 'after_insert')
+@event.listens_for(Timer, 'after_update')
+@event.listens_for(Timer, 'after_delete')
+def _timer_changed(mapper, connection, target):
+    if target.sequence_id is not None:
+        _changed(target, target.sequence_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _session_committed(session):
+    for sequence_id in session.info.pop(_CHANGED_KEY, ()):
+        invalidate_sequence(sequence_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _session_rolled_back(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def cache_sequence_view(view, slug=None):
+    """Store view under slug (default: its own) for later requests in this worker"""
+    ttl = current_app.config.get('SEQUENCE_CACHE_TTL', DEFAULT_TTL)
+    if ttl > 0:
+        _cache.put(slug or view.slug, view, ttl, current_app.config.get('SEQUENCE_CACHE_SIZE', DEFAULT_SIZE))
+
+
+def get_sequence_view(slug):
+    """The SequenceView for public id slug (or an alias of it), else None"""
+    view = _cache.get(slug)
+    if view is not None:
+        return view
+    sequence = find_sequence(slug, selectinload(Sequence.timers))
+    if sequence is None:
+        return None
+    view = build_sequence_view(sequence, sequence.timers)
+    cache_sequence_view(view, slug)
+    return view
@@ -0,0 +1,74 @@
+// TimerFreak timer scheduler (dedicated Worker, started by timer.html)
+//
+// The page arms one deadline at a time: the absolute time (timeOrigin +
+// performance.now(), comparable across page and worker) at which the running
+// timer ends. Worker timers are not throttled like a hidden page's, and every
+// wake-up is computed from that fixed anchor, so lateness never accumulates.
+//
+// Messages in:
+//   {type: 'arm', generation, deadline, anchor, tickEvery}  tickEvery (ms) is optional
+//   {type: 'cancel'}
+// Messages out:
+//   {type: 'tick', generation}      at anchor + k * tickEvery, for 1 Hz repaints
+//   {type: 'deadline', generation}  once, at or just after the deadline
+
+let armed = null;
+let timeoutId = null;
+
+function now() {
+    return performance.timeOrigin + performance.now();
+}
+
+function cancel() {
+    clearTimeout(timeoutId);
+    timeoutId = null;
+    armed = null;
+}
+
+function nextTickAfter(t) {
+    return armed.anchor + (Math.floor((t - armed.anchor) / armed.tickEvery) + 1) * armed.tickEvery;
+}
+
+function sleep() {
+    let target = armed.deadline;
+    if (armed.tickEvery) {
+        target = Math.min(target, armed.nextTick);
+    }
+    timeoutId = setTimeout(wake, Math.max(0, target - now()));
+}
+
+function wake() {
+    timeoutId = null;
+    if (!armed) return;
+    const t = now();
+    if (t >= armed.deadline) {
+        postMessage({ type: 'deadline', generation: armed.generation });
+        armed = null;
+        return;
+    }
+    if (armed.tickEvery && t >= armed.nextTick) {
+        postMessage({ type: 'tick', generation: armed.generation });
+        armed.nextTick = nextTickAfter(t);
+    }
+    // Woken early (clock granularity): sleep for the remainder
+    sleep();
+}
+
+self.onmessage = e => {
+    const msg = e.data || {};
+    if (msg.type === 'arm') {
+        cancel();
+        armed = {
+            generation: msg.generation,
+            deadline: msg.deadline,
+            anchor: msg.anchor,
+            tickEvery: msg.tickEvery || 0
+        };
+        if (armed.tickEvery) {
+            armed.nextTick = nextTickAfter(now());
+        }
+        sleep();
+    } else if (msg.type === 'cancel') {
+        cancel();
+    }
+};
@@ -0,0 +1,1592 @@
+// TimerFreak timer engine, shared by every /timer/<id> page.
+// The page supplies everything sequence-specific in <script id="timer-config">
+// (built by show_timer() in app.py); this file is a cacheable static asset.
+const timerConfig = JSON.parse(document.getElementById('timer-config').textContent);
+
+const durations = timerConfig.timers;
+const timerNames = timerConfig.timer_names;
+const sequenceId = timerConfig.sequence_id;
+const timerColors = timerConfig.timer_colors;
+const timerAlarmSounds = timerConfig.timer_alarm_sounds; // Specific sounds for each timer
+
+const staticBaseUrl = timerConfig.static_base_url;
+// Fingerprinted URLs for this sequence's sounds (see assets.py)
+const soundUrls = timerConfig.sound_urls;
+
+// Ask the service worker to keep what this timer needs to run offline
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.ready.then(registration => registration.active && registration.active.postMessage({
+        type: 'precache',
+        urls: Object.values(soundUrls).concat(timerConfig.precache_urls)
+    }));
+}
+
+// Loop settings from database
+const defaultLoopEnabled = timerConfig.loop_default;
+const defaultLoopCount = timerConfig.loop_count;
+
+console.log("Durations:", durations);
+console.log("Timer Names:", timerNames);
+console.log("Sequence ID:", sequenceId);
+console.log("Timer Colors:", timerColors);
+console.log("Timer Alarm Sounds (specific):", timerAlarmSounds);
+const totalDuration = durations.reduce((a, b) => a + b, 0);
+console.log("Total Sequence Duration:", totalDuration);
+
+let current = 0; // Current timer index (0-based)
+let elapsed = 0; // Elapsed time for the current timer
+let globalElapsed = 0; // Total elapsed time across sequence
+let loopIndex = 0; // Current loop number
+let animationFrameId = null; // Stores requestAnimationFrame ID (repaints while visible)
+let paused = false;
+let running = false;
+let timestamps = [];
+let bars = []; // DOM elements for timers
+let loopEnabled = false;
+let loopLimit = null;
+let startTime = null; // Reference time for the current timer's elapsed calculation
+let pauseStartTime = null; // Time when pause was initiated
+// lastUpdateTime will now ONLY be used to calculate delta for globalElapsed in background,
+// elapsed is always calculated from startTime.
+let lastUpdateTime = performance.now();
+
+// Previous button click tracking
+let prevBtnClickCount = 0; // Tracks clicks on previous button
+let prevBtnLastTimerIndex = -1; // Last timer index when prev button was clicked
+let prevBtnLastTimerStartTime = 0; // Time when current timer started (for 10s reset)
+
+// AudioContext for synthesized beeps
+let audioContext;
+
+function initAudioContext() {
+    if (!audioContext) {
+        audioContext = new (window.AudioContext || window.webkitAudioContext)();
+    }
+}
+
+// Decoded alarm sounds, keyed by filename. Fetched and decoded once at page
+// load so an alarm starts instantly and needs no network mid-workout; the
+// <audio id="alarm"> element remains the fallback (e.g. before decoding finishes).
+const alarmBuffers = {};
+let currentAlarmSource = null;
+
+function preloadAlarmSounds() {
+    if (!(window.AudioContext || window.webkitAudioContext)) {
+        return;
+    }
+    initAudioContext(); // starts suspended until the user presses start; decoding still works
+    const distinctSounds = [...new Set(timerAlarmSounds.filter(Boolean))];
+    distinctSounds.forEach(soundFileName => {
+        fetch(soundUrls[soundFileName] || staticBaseUrl + soundFileName)
+            .then(response => {
+                if (!response.ok) throw new Error('HTTP ' + response.status);
+                return response.arrayBuffer();
+            })
+            // Callback form for older Safari, which has no promise-returning decodeAudioData
+            .then(data => new Promise((resolve, reject) => audioContext.decodeAudioData(data, resolve, reject)))
+            .then(buffer => { alarmBuffers[soundFileName] = buffer; })
+            .catch(e => console.warn(`Could not preload alarm sound "${soundFileName}":`, e));
+    });
+}
+
+// Returns false when the sound is not decoded or the context cannot play right now
+function playBufferedAlarm(soundFileName) {
+    const buffer = alarmBuffers[soundFileName];
+    if (!buffer || !audioContext || audioContext.state !== 'running') {
+        return false;
+    }
+    const source = audioContext.createBufferSource();
+    source.buffer = buffer;
+    source.connect(audioContext.destination);
+    source.onended = () => {
+        if (currentAlarmSource === source) currentAlarmSource = null;
+    };
+    source.start();
+    currentAlarmSource = source;
+    return true;
+}
+
+function stopBufferedAlarm() {
+    if (currentAlarmSource) {
+        try {
+            currentAlarmSource.stop();
+        } catch (e) {
+            // already stopped
+        }
+        currentAlarmSource = null;
+    }
+}
+
+// Play a quick synthesized beep
+function playBeep(frequency = 15000, duration = 0.15, volume = 1) { // A7 note for higher pitch
+    initAudioContext();
+    if (!audioContext) {
+        console.warn("AudioContext not available, cannot play beep.");
+        return;
+    }
+    const oscillator = audioContext.createOscillator();
+    const gainNode = audioContext.createGain();
+
+    oscillator.connect(gainNode);
+    gainNode.connect(audioContext.destination);
+
+    oscillator.type = 'sine'; // Sine wave for a clean beep
+    oscillator.frequency.value = frequency;
+
+    gainNode.gain.setValueAtTime(volume, audioContext.currentTime);
+    // gainNode.gain.exponentialRampToValueAtTime(0.00001, audioContext.currentTime + duration); // Fade out
+
+    oscillator.start(audioContext.currentTime);
+    oscillator.stop(audioContext.currentTime + duration);
+}
+
+// Helper to format duration (seconds to readable format)
+function formatDuration(totalSeconds) {
+    if (totalSeconds < 60) {
+        return `${totalSeconds} second${totalSeconds !== 1 ? 's' : ''}`;
+    }
+    
+    const mins = Math.floor(totalSeconds / 60);
+    const secs = totalSeconds % 60;
+    
+    if (mins >= 60) {
+        const hrs = Math.floor(mins / 60);
+        const remainingMins = mins % 60;
+        let parts = [];
+        if (hrs > 0) parts.push(`${hrs} hour${hrs !== 1 ? 's' : ''}`);
+        if (remainingMins > 0) parts.push(`${remainingMins} minute${remainingMins !== 1 ? 's' : ''}`);
+        if (secs > 0) parts.push(`${secs} second${secs !== 1 ? 's' : ''}`);
+        return parts.join(' ');
+    }
+    
+    let parts = [];
+    if (mins > 0) parts.push(`${mins} minute${mins !== 1 ? 's' : ''}`);
+    if (secs > 0) parts.push(`${secs} second${secs !== 1 ? 's' : ''}`);
+    return parts.join(' ');
+}
+
+// Helper to set/get disabled state for links
+function setLinkDisabled(linkElement, disabled) {
+    if (!linkElement) {
+        console.warn("Attempted to set disabled state on a null element. This might be a timing issue or element not found.");
+        return;
+    }
+    if (disabled) {
+        linkElement.setAttribute('data-disabled', 'true');
+        linkElement.classList.add('disabled-link');
+    } else {
+        linkElement.removeAttribute('data-disabled');
+        linkElement.classList.remove('disabled-link');
+    }
+}
+
+function isLinkDisabled(linkElement) {
+    if (!linkElement) return true;
+    return linkElement.getAttribute('data-disabled') === 'true';
+}
+
+// Helper to get the button element from event (handles clicks on SVG icons inside buttons)
+function getButtonElement(event) {
+    const target = event.target;
+    // If target is the button itself (has data-disabled attribute)
+    if (target.getAttribute('data-disabled') !== undefined) {
+        return target;
+    }
+    // If target is SVG or child element, find parent button
+    return target.closest('a');
+}
+
+// Helper to set button text/emoji and class for consistent size
+// Uses CSS min-width for fixed button size.
+function setButtonState(buttonId, text, colorClass) {
+    const button = document.getElementById(buttonId);
+    if (!button) return;
+
+    // Remove all existing color classes except btn-solid-3d (and emoji-btn/btn-icon if applicable)
+    button.className = 'btn-solid-3d'; // Reset base classes
+    if (buttonId === 'advancedBtn' || buttonId === 'theme-toggle') {
+        button.classList.add('btn-icon');
+        button.classList.add('btn-transport');
+    }
+    if (buttonId === 'playPauseBtn' || buttonId === 'stopBtn' || buttonId === 'prevBtn' || buttonId === 'nextBtn' || buttonId === 'loopToggleBtn') {
+        button.classList.add('btn-icon');
+        button.classList.add('btn-transport');
+    }
+    // Add the new color class
+    button.classList.add(colorClass);
+
+    // Handle SVG icon toggling for transport buttons
+    if (buttonId === 'playPauseBtn') {
+        const isPaused = text === "PAUSE";
+        document.getElementById('transportPlayIcon').style.display = isPaused ? 'none' : 'block';
+        document.getElementById('transportPauseIcon').style.display = isPaused ? 'block' : 'none';
+        button.title = isPaused ? 'Pause Timer' : 'Play Timer';
+    }
+    // For buttons with permanent SVG icons (advancedBtn, theme-toggle), don't overwrite innerHTML
+}
+
+
+// --- DAW-style Transport Controls ---
+function togglePlayPause(event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(4400, 0.1, .1);
+
+    if (running) {
+        // Currently playing, so pause
+        _togglePause();
+    } else {
+        // Not playing, so start
+        _toggleStart();
+    }
+}
+
+function toggleStop(event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(880, 0.05, .01);
+    stopSequence();
+}
+
+function restartCurrent(event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(880, 0.05,.01); // Low pitch for other interactions
+    _restartCurrent();
+}
+
+function restartAll(event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(880, 0.05,.01); // Low pitch for other interactions
+    _restartAll();
+}
+
+// New navigation functions for timer sequence
+function goToPreviousTimer(event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(880, 0.05, .01);
+
+    // Check if we should reset the click count
+    // Reset if: timer changed or 10+ seconds elapsed since timer start
+    const now = performance.now();
+    const timeSinceStart = (now / 1000) - startTime;
+    if (prevBtnLastTimerIndex !== current || timeSinceStart >= 10) {
+        prevBtnClickCount = 0;
+    }
+
+    prevBtnClickCount++;
+
+    if (prevBtnClickCount === 1) {
+        // First click: restart current timer
+        _restartCurrent();
+    } else {
+        // Additional clicks: go to previous timer
+        const prevIndex = Math.max(0, current - 1);
+        if (prevIndex !== current) {
+            _jumpToTimer(prevIndex);
+        }
+    }
+
+    // Track state
+    prevBtnLastTimerIndex = current;
+    prevBtnLastTimerStartTime = now;
+}
+
+function goToNextTimer(event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(880, 0.05, .01);
+    const nextIndex = Math.min(durations.length - 1, current + 1);
+    if (nextIndex !== current) {
+        _jumpToTimer(nextIndex);
+    }
+}
+
+// Loop toggle button function
+function toggleLoopMode(event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(880, 0.05, .01);
+
+    loopEnabled = !loopEnabled;
+    updateLoopUI();
+    liveChanged();
+}
+
+function updateLoopUI() {
+    const loopControls = document.getElementById("loopControls");
+    const loopOffIcon = document.getElementById('loopOffIcon');
+    const loopOnIcon = document.getElementById('loopOnIcon');
+    const loopToggleBtn = document.getElementById('loopToggleBtn');
+
+    if (loopEnabled) {
+        loopControls.style.display = 'flex';
+        // Update button to active (green) state
+        loopToggleBtn.classList.remove('btn-gray');
+        loopToggleBtn.classList.add('btn-darkgreen');
+        // Show loop icon (single icon, currentColor will be white)
+        loopOffIcon.style.display = 'none';
+        loopOnIcon.style.display = 'block';
+        loopToggleBtn.title = 'Loop: ON';
+    } else {
+        loopControls.style.display = 'none';
+        // Update button to inactive (gray) state
+        loopToggleBtn.classList.remove('btn-darkgreen');
+        loopToggleBtn.classList.add('btn-gray');
+        // Show loop off icon
+        loopOffIcon.style.display = 'block';
+        loopOnIcon.style.display = 'none';
+        loopToggleBtn.title = 'Loop: OFF';
+    }
+}
+
+function toggleAdvanced(event) {
+    event.preventDefault();
+    playBeep(880, 0.05,.01); // Low pitch for other interactions
+    const advancedControls = document.getElementById("advancedControls");
+
+    // Toggle the 'show' class
+    advancedControls.classList.toggle("show");
+
+    // Toggle disabled state for buttons inside advanced controls
+    const advancedButtons = advancedControls.querySelectorAll('.btn-solid-3d');
+    advancedButtons.forEach(btn => {
+        // If the panel is now showing, enable the buttons; if hiding, disable them.
+        setLinkDisabled(btn, !advancedControls.classList.contains("show"));
+    });
+}
+
+function toggleTheme(event) {
+    event.preventDefault();
+    playBeep(880, 0.05,.01); // Low pitch for other interactions
+    _toggleTheme();
+}
+
+// Cookie helpers for theme preference (only for logged-in users)
+const isLoggedIn = timerConfig.is_logged_in;
+
+function setThemeCookie(isDark) {
+    if (!isLoggedIn) return;
+    // No expiration - cookie persists until browser is closed or manually cleared
+    document.cookie = `tf_theme=${isDark ? 'dark' : 'light'}; path=/; SameSite=Lax`;
+}
+
+function getThemeCookie() {
+    if (!isLoggedIn) return null;
+    const match = document.cookie.match(/(?:^|; )tf_theme=([^;]*)/);
+    return match ? match[1] : null;
+}
+
+function prefersDarkMode() {
+    return window.matchMedia && window.matchMedia('(prefers-color-scheme: dark)').matches;
+}
+
+function _toggleTheme() {
+    const bodyElement = document.body;
+    if (!bodyElement) {
+        console.error("Body element not found!");
+        return;
+    }
+
+    const isDark = bodyElement.classList.contains('dark-theme');
+    const newIsDark = !isDark;
+
+    if (newIsDark) {
+        bodyElement.classList.add('dark-theme');
+    } else {
+        bodyElement.classList.remove('dark-theme');
+    }
+
+    // Update SVG icons
+    document.getElementById('themeLightIcon').style.display = newIsDark ? 'none' : 'block';
+    document.getElementById('themeDarkIcon').style.display = newIsDark ? 'block' : 'none';
+
+    // Save to cookie for logged-in users
+    setThemeCookie(newIsDark);
+}
+
+function applyThemePreference() {
+    const bodyElement = document.body;
+    const cookieTheme = getThemeCookie();
+    let isDark;
+
+    if (cookieTheme) {
+        // Use saved preference
+        isDark = cookieTheme === 'dark';
+    } else {
+        // Default to system/browser preference
+        isDark = prefersDarkMode();
+    }
+
+    if (isDark) {
+        bodyElement.classList.add('dark-theme');
+    } else {
+        bodyElement.classList.remove('dark-theme');
+    }
+
+    // Update SVG icons
+    document.getElementById('themeLightIcon').style.display = isDark ? 'none' : 'block';
+    document.getElementById('themeDarkIcon').style.display = isDark ? 'block' : 'none';
+}
+
+function jumpToTimer(index, event) {
+    event.preventDefault();
+    const btn = getButtonElement(event);
+    if (isLinkDisabled(btn)) return;
+    playBeep(880, 0.05,.01); // Low pitch for other interactions
+    _jumpToTimer(index);
+}
+
+function incrementLoopCount(event) {
+    event.preventDefault();
+    playBeep(880, 0.05,.01); // Low pitch for other interactions
+    const input = document.getElementById("loopCount");
+    let value = parseInt(input.value);
+    if (isNaN(value) || value < 0) { value = 0; }
+    input.value = value + 1;
+    updateLoopSettings();
+}
+
+function decrementLoopCount(event) {
+    event.preventDefault();
+    playBeep(880, 0.05,.01); // Low pitch for other interactions
+    const input = document.getElementById("loopCount");
+    let value = parseInt(input.value);
+    if (isNaN(value) || value <= 1) {
+        input.value = "";
+    } else {
+        input.value = value - 1;
+    }
+    updateLoopSettings();
+}
+// --- End of Event handlers for link buttons ---
+
+// === Helper for playing alarm sound ===
+function playAlarmSound(soundFileName) {
+    const alarm = document.getElementById("alarm");
+    const backgroundAlarm = document.getElementById("backgroundAlarm");
+
+    if (!alarm) {
+        console.error("Audio element #alarm not found.");
+        return;
+    }
+    if (!backgroundAlarm) {
+        console.warn("Background audio element #backgroundAlarm not found. Background audio might not be robust.");
+    }
+
+    // Always stop previous playback before starting new one
+    alarm.pause();
+    alarm.currentTime = 0;
+    stopBufferedAlarm();
+
+    if (!soundFileName) {
+        console.warn(`No valid alarm sound file specified for playback, or it's empty.`);
+        alarm.src = "";
+        return;
+    }
+
+    // Web Audio mixes with the silent background track, so it keeps running
+    if (playBufferedAlarm(soundFileName)) {
+        return;
+    }
+
+    // Remove any previous error handler to prevent duplicates
+    alarm.onerror = null;
+
+    // Add error handler to fallback to beep.mp3 if the sound file fails to load
+    alarm.onerror = function() {
+        console.warn(`Failed to load alarm sound "${soundFileName}", falling back to beep.mp3`);
+        alarm.onerror = null; // Prevent infinite fallback
+        alarm.src = soundUrls['beep.mp3'] || staticBaseUrl + 'beep.mp3';
+        alarm.load();
+        alarm.play().catch(e => {
+            console.error(`Error playing fallback alarm sound beep.mp3:`, e);
+            if (backgroundAlarm && backgroundAlarm.paused && backgroundAlarm.volume === 0) {
+                backgroundAlarm.play().catch(e2 => console.warn("Failed to restart background audio:", e2));
+            }
+        });
+    };
+
+    alarm.src = soundUrls[soundFileName] || staticBaseUrl + soundFileName;
+    alarm.load(); // Explicitly load the media for robustness
+
+    const playPromise = alarm.play();
+
+    if (playPromise !== undefined) {
+        playPromise.then(() => {
+            console.log(`Alarm sound ${soundFileName} started playing.`);
+            // When main alarm plays, temporarily pause background audio if it exists and is playing, to ensure main alarm is heard
+            if (backgroundAlarm && !backgroundAlarm.paused && backgroundAlarm.volume === 0) {
+                backgroundAlarm.pause(); // Pause the silent background track
+                // After main alarm ends, restart background audio
+                alarm.addEventListener('ended', function restartBgAlarm() {
+                    if (backgroundAlarm) {
+                        backgroundAlarm.currentTime = 0; // Reset it to avoid skipping if it was paused partway
+                        backgroundAlarm.play().catch(e => console.warn("Failed to restart background audio after alarm:", e));
+                    }
+                    alarm.removeEventListener('ended', restartBgAlarm); // Remove listener after it fires once
+                }, { once: true }); // Ensure this listener fires only once
+            }
+        }).catch(e => {
+            console.error(`Error playing alarm sound ${soundFileName}:`, e);
+            if (e.name === 'NotAllowedError') {
+                console.warn("Autoplay blocked, user interaction required to enable sound.");
+            }
+            // If playing main alarm fails, ensure background alarm is attempted to be restarted
+            if (backgroundAlarm && backgroundAlarm.paused && backgroundAlarm.volume === 0) {
+                backgroundAlarm.play().catch(e => console.warn("Failed to restart background audio on main alarm play error:", e));
+            }
+        });
+    } else {
+        console.error("play() did not return a promise.");
+        // If playing main alarm fails, ensure background alarm is attempted to be restarted
+        if (backgroundAlarm && backgroundAlarm.paused && backgroundAlarm.volume === 0) {
+            backgroundAlarm.play().catch(e => console.warn("Failed to restart background audio on main alarm play error:", e));
+        }
+    }
+}
+
+
+function updateCompletionBar() {
+    let totalElapsedPercentage = Math.min((globalElapsed / totalDuration) * 100, 100);
+    document.getElementById("globalBar").style.width = totalElapsedPercentage + "%";
+}
+
+let barElements = []; // Cached DOM elements for timers: { container, bar, overlay, timerName, timerCountdown, timerInfo }
+
+function initUI() {
+    const barsContainer = document.getElementById('bars');
+    const jump = document.getElementById('jumpButtons');
+    barsContainer.innerHTML = '';
+    jump.innerHTML = '';
+    bars = [];
+    barElements = [];
+
+    for (let i = 0; i < durations.length; i++) {
+        const outer = document.createElement('div');
+        outer.className = "bar-container";
+
+        const inner = document.createElement('div');
+        inner.className = "bar";
+        inner.style.backgroundColor = timerColors[i];
+        outer.appendChild(inner);
+
+        const timerInfoDiv = document.createElement('div');
+        timerInfoDiv.className = "timer-info";
+        const timerInfoNameDiv = document.createElement('div');
+        timerInfoNameDiv.className = "timer-info-name";
+        timerInfoNameDiv.textContent = timerNames[i] || `Timer ${i + 1}`;
+        timerInfoDiv.appendChild(timerInfoNameDiv);
+        const timerInfoDurationDiv = document.createElement('div');
+        timerInfoDurationDiv.className = "timer-info-duration";
+        timerInfoDurationDiv.textContent = formatDuration(durations[i]);
+        timerInfoDiv.appendChild(timerInfoDurationDiv);
+        outer.appendChild(timerInfoDiv);
+
+        const overlayDiv = document.createElement('div');
+        overlayDiv.className = "overlay";
+        const overlayContentDiv = document.createElement('div');
+        overlayContentDiv.className = "overlay-content";
+
+        const timerNameDiv = document.createElement('div');
+        timerNameDiv.className = "timer-name";
+        timerNameDiv.textContent = timerNames[i] || `Timer ${i + 1}`;
+        overlayContentDiv.appendChild(timerNameDiv);
+
+        const timerCountdownDiv = document.createElement('div');
+        timerCountdownDiv.className = "timer-countdown";
+        timerCountdownDiv.textContent = formatDuration(durations[i]);
+        overlayContentDiv.appendChild(timerCountdownDiv);
+
+        overlayDiv.appendChild(overlayContentDiv);
+        outer.appendChild(overlayDiv);
+
+        // Initial state for all timers on load: overlay visible, info hidden
+        overlayDiv.style.display = "flex";
+        timerInfoDiv.style.display = "none";
+
+        barsContainer.appendChild(outer);
+        bars.push(outer);
+        barElements.push({
+            container: outer,
+            bar: inner,
+            overlay: overlayDiv,
+            timerName: timerNameDiv,
+            timerCountdown: timerCountdownDiv,
+            timerInfo: timerInfoDiv
+        });
+    }
+
+    jump.innerHTML = '';
+    for (let i = 0; i < durations.length; i++) {
+        const jumpBtn = document.createElement("a");
+        jumpBtn.href = "#";
+        jumpBtn.className = "btn-solid-3d btn-small btn-default jump-button"; // Added jump-button class
+        const btnText = timerNames[i] ? `Go to ${timerNames[i]}` : `Go to ${i + 1}`;
+        jumpBtn.textContent = btnText;
+        jumpBtn.onclick = (e) => jumpToTimer(i, e);
+        setLinkDisabled(jumpBtn, true); // Initially disabled
+        jump.appendChild(jumpBtn);
+    }
+}
+
+function resetTimestamps() {
+    timestamps = new Array(durations.length).fill(null).map(() => ({
+        start: null,
+        end: null
+    }));
+}
+
+function logActivity(eventType, timerOrder = null) {
+    // The host's page counts the run; viewers following it would double it
+    if (liveRole === 'viewer') return;
+    fetch('/log_activity', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            sequence_id: sequenceId,
+            timer_order: timerOrder,
+            event_type: eventType
+        })
+    })
+        .then(response => {
+            if (!response.ok) {
+                console.error('Failed to log activity:', response.status);
+            }
+        })
+        .catch(error => {
+            console.error('Error logging activity:', error);
+        });
+}
+
+function _toggleStart() {
+    cancelGroupStart();
+    if (running) {
+        stopSequence();
+        return;
+    }
+
+    initUI(); // Re-initializes bars, setting all to overlay state (flex)
+    resetTimestamps();
+    updateLoopSettings();
+
+    // Start background audio to keep audio engine alive
+    const backgroundAlarm = document.getElementById("backgroundAlarm");
+    if (backgroundAlarm) {
+        backgroundAlarm.volume = 0; // Ensure it's silent
+        backgroundAlarm.play().catch(e => console.warn("Failed to start background audio:", e));
+    }
+    // The start press is the user gesture that lets the preloaded alarms play
+    if (audioContext && audioContext.state === 'suspended') {
+        audioContext.resume().catch(e => console.warn("Failed to resume AudioContext:", e));
+    }
+
+    // Set button states (DAW-style)
+    setButtonState('playPauseBtn', "PAUSE", 'btn-darkgreen'); // Now playing, show pause icon
+    setLinkDisabled(document.getElementById("stopBtn"), false);
+    setLinkDisabled(document.getElementById("prevBtn"), false);
+    setLinkDisabled(document.getElementById("nextBtn"), false);
+    setLinkDisabled(document.getElementById("restartCurrent"), false);
+    setLinkDisabled(document.getElementById("restartAll"), false);
+    // Ensure jump buttons are enabled when sequence starts
+    document.querySelectorAll(".jump-button").forEach(link => setLinkDisabled(link, false));
+
+
+    running = true;
+    paused = false;
+    elapsed = 0;
+    globalElapsed = 0;
+    loopIndex = 1;
+
+    updateCompletionBar();
+
+
+    pauseStartTime = null;
+    startTime = performance.now() / 1000; // Initialize startTime directly
+    lastUpdateTime = performance.now(); // Initialize for accurate time tracking
+    logActivity('sequence_start');
+    startTimer(0);
+}
+
+let stopSequenceFinalAlarmEndedHandler = null; // To store listener for final alarm
+let stopSequenceFinalAlarmTimeoutId = null; // New ID for final alarm delay (fallback)
+let stopSequenceCleanupTimeoutId = null; // ID for actual cleanup
+
+function stopSequence() {
+    cancelGroupStart();
+    running = false;
+    paused = false;
+    current = 0;
+    elapsed = 0;
+    globalElapsed = 0;
+
+    cancelTicks();
+
+    // Clear any pending timeouts related to stopping
+    if (stopSequenceFinalAlarmTimeoutId) {
+        clearTimeout(stopSequenceFinalAlarmTimeoutId);
+        stopSequenceFinalAlarmTimeoutId = null;
+    }
+    if (stopSequenceCleanupTimeoutId) {
+        clearTimeout(stopSequenceCleanupTimeoutId);
+        stopSequenceCleanupTimeoutId = null;
+    }
+    const alarmElement = document.getElementById("alarm");
+    if (stopSequenceFinalAlarmEndedHandler) {
+        alarmElement.removeEventListener('ended', stopSequenceFinalAlarmEndedHandler);
+        stopSequenceFinalAlarmEndedHandler = null;
+    }
+
+
+    // Stop background audio
+    const backgroundAlarm = document.getElementById("backgroundAlarm");
+    if (backgroundAlarm) {
+        backgroundAlarm.pause();
+        backgroundAlarm.currentTime = 0;
+    }
+
+    if (bars) {
+        bars.forEach(bar => {
+            bar.querySelector(".bar").style.width = "0%";
+            bar.querySelector(".overlay").style.display = "flex"; // Reset to overlay (as per initial state)
+            bar.querySelector(".timer-info").style.display = "none";
+        });
+    }
+    document.getElementById("globalBar").style.width = "0%";
+    // Set button states (DAW-style)
+    setButtonState('playPauseBtn', "PLAY", 'btn-darkgreen'); // Reset to play icon
+    setLinkDisabled(document.getElementById("stopBtn"), true);
+    setLinkDisabled(document.getElementById("prevBtn"), true);
+    setLinkDisabled(document.getElementById("nextBtn"), true);
+    setLinkDisabled(document.getElementById("restartCurrent"), true);
+    setLinkDisabled(document.getElementById("restartAll"), true);
+    // Ensure jump buttons are disabled when sequence stops
+    document.querySelectorAll(".jump-button").forEach(link => setLinkDisabled(link, true));
+
+    // Final cleanup of the main alarm element
+    if (alarmElement) {
+        alarmElement.pause();
+        alarmElement.currentTime = 0;
+        alarmElement.src = ""; // Clear sound source
+    }
+
+
+    logActivity('sequence_end');
+    liveChanged();
+}
+
+function _togglePause() {
+    paused = !paused;
+    // Set button states (DAW-style)
+    setButtonState('playPauseBtn', paused ? "PLAY" : "PAUSE", paused ? 'btn-darkgreen' : 'btn-darkgreen');  
+
+
+    logActivity(paused ? 'pause_timer' : 'resume_timer', current);
+
+    if (paused) {
+        cancelTicks();
+        pauseStartTime = performance.now(); // Store exact time of pause
+    } else {
+        // When resuming, adjust startTime by the duration of the pause
+        const pauseDuration = performance.now() - pauseStartTime;
+        startTime += pauseDuration / 1000; // startTime is in seconds
+        lastUpdateTime = performance.now(); // Reset lastUpdateTime
+        pauseStartTime = null;
+
+        if (running) {
+            scheduleTicks(); // Deadline moves by the pause length
+        }
+    }
+    liveChanged();
+}
+
+function _restartCurrent() {
+    const alarm = document.getElementById("alarm");
+    if (alarm) {
+        alarm.pause();
+        alarm.currentTime = 0;
+        alarm.src = "";
+    }
+
+    logActivity('restart_timer', current);
+
+    globalElapsed = durations.slice(0, current).reduce((a, b) => a + b, 0);
+
+    elapsed = 0;
+    timestamps[current].start = new Date().toISOString();
+    timestamps[current].end = null;
+    startTime = performance.now() / 1000;
+    lastUpdateTime = performance.now(); // Reset lastUpdateTime
+
+    if (bars[current]) {
+        bars[current].querySelector(".bar").style.width = "0%";
+        bars[current].querySelector(".overlay").style.display = "flex";
+        bars[current].querySelector(".timer-info").style.display = "none";
+        bars[current].querySelector(".timer-countdown").textContent = `${durations[current]} (${0}%)`;
+    }
+    for (let i = 0; i < bars.length; i++) {
+        if (i !== current) {
+            bars[i].querySelector(".bar").style.width = "0%";
+            bars[i].querySelector(".overlay").style.display = "none";
+            bars[i].querySelector(".timer-info").style.display = "flex";
+        }
+    }
+
+    updateCompletionBar();
+
+    if (!paused && running) {
+        scheduleTicks();
+    } else if (!paused && !running) {
+        _toggleStart();
+    }
+    liveChanged();
+
+}
+
+function _restartAll() {
+    logActivity('restart_sequence');
+    stopSequence();
+    _toggleStart();
+
+}
+
+function _jumpToTimer(index) {
+    if (index < 0 || index >= durations.length) {
+        console.warn("Attempted to jump to invalid timer index:", index);
+        return;
+    }
+
+    cancelTicks();
+
+    const alarm = document.getElementById("alarm");
+    if (alarm) {
+        alarm.pause();
+        alarm.currentTime = 0;
+        alarm.src = "";
+    }
+
+    logActivity('goto_timer', index);
+
+    // Correctly log end for the previous timer if it was running
+    if (running && (typeof current === 'number' && current !== index) && timestamps[current] && timestamps[current].start && !timestamps[current].end) {
+        timestamps[current].end = new Date().toISOString();
+        logActivity('timer_end', current);
+    }
+
+    // Reset all timestamps up to the jumped-to index
+    resetTimestamps();
+    for (let i = 0; i < index; i++) {
+        // Approximate start/end times for prior timers, assuming they ran for their full duration
+        // For a jump, we mark prior ones as "completed instantly" for state tracking.
+        timestamps[i].start = new Date().toISOString();
+        timestamps[i].end = new Date().toISOString();
+    }
+    timestamps[index].start = new Date().toISOString(); // Mark the new current timer as started
+
+    globalElapsed = durations.slice(0, index).reduce((a, b) => a + b, 0);
+    updateCompletionBar();
+
+    if (bars) {
+        bars.forEach((bar, i) => {
+            // Reset all bars to default "info" state, then activate the current one
+            bar.querySelector(".bar").style.width = "0%";
+            // Initial state for all timers on load: overlay visible, info hidden
+            bar.querySelector(".overlay").style.display = "flex";
+            bar.querySelector(".timer-info").style.display = "none";
+            bar.querySelector(".timer-info-name").textContent = timerNames[i] || `Timer ${i + 1}`;
+            bar.querySelector(".timer-info-duration").textContent = formatDuration(durations[i]);
+        });
+    }
+
+    if (!running && !paused) {
+        running = true;
+        setButtonState('playPauseBtn', "PAUSE", 'btn-darkgreen');
+        setLinkDisabled(document.getElementById("stopBtn"), false);
+        setLinkDisabled(document.getElementById("prevBtn"), false);
+        setLinkDisabled(document.getElementById("nextBtn"), false);
+        setLinkDisabled(document.getElementById("restartCurrent"), false);
+        setLinkDisabled(document.getElementById("restartAll"), false);
+        document.querySelectorAll(".jump-button").forEach(link => setLinkDisabled(link, false));
+    }
+
+    if (!paused) {
+        startTimer(index);
+    } else {
+        current = index;
+        elapsed = 0;
+        // If paused, just update UI for the new current timer
+        if (bars[current]) {
+            bars[current].querySelector(".overlay").style.display = "flex";
+            bars[current].querySelector(".timer-info").style.display = "none";
+            bars[current].querySelector(".timer-countdown").textContent = `${durations[current]} (${0}%)`;
+        }
+        liveChanged();
+    }
+
+}
+
+function startTimer(timerIndex) {
+    // Clear any pending stop sequence timeout from a previous final alarm
+    if (stopSequenceCleanupTimeoutId) {
+        clearTimeout(stopSequenceCleanupTimeoutId);
+        stopSequenceCleanupTimeoutId = null;
+    }
+
+    // Clear any previous final alarm fallback timeout
+    if (stopSequenceFinalAlarmTimeoutId) {
+        clearTimeout(stopSequenceFinalAlarmTimeoutId);
+        stopSequenceFinalAlarmTimeoutId = null;
+    }
+    // Remove previous final alarm ended handler
+    const alarmElement = document.getElementById("alarm");
+    if (stopSequenceFinalAlarmEndedHandler) {
+        alarmElement.removeEventListener('ended', stopSequenceFinalAlarmEndedHandler);
+        stopSequenceFinalAlarmEndedHandler = null;
+    }
+
+
+    cancelTicks();
+
+    current = timerIndex;
+    elapsed = 0;
+    startTime = performance.now() / 1000;
+    lastUpdateTime = performance.now(); // Reset lastUpdateTime for accurate start
+
+    timestamps[current].start = new Date().toISOString();
+    logActivity('timer_start', current);
+
+    // Set only the current timer's overlay to flex, others to info
+    bars.forEach((bar, i) => {
+        const overlay = bar.querySelector(".overlay");
+        const timerInfo = bar.querySelector(".timer-info");
+        if (i === current) {
+            overlay.style.display = "flex";
+            timerInfo.style.display = "none";
+        } else {
+            overlay.style.display = "none";
+            timerInfo.style.display = "flex";
+        }
+    });
+
+    scheduleTicks();
+    liveChanged();
+}
+
+let lastCurrent = null; // Track current index to avoid resetting all bars every frame
+
+// --- Scheduling ---
+// The end of the running timer is a deadline armed in a dedicated Worker
+// (static/timer-scheduler.js), computed from the timer's performance.now()
+// anchor: worker timers are not throttled in hidden tabs and nothing polls.
+// Repaints happen on animation frames while visible (1 Hz worker ticks with
+// reduced motion) and not at all while hidden.
+const schedulerUrl = timerConfig.scheduler_url;
+const reducedMotion = window.matchMedia && window.matchMedia('(prefers-reduced-motion: reduce)').matches;
+let schedulerWorker = null;
+let scheduleGeneration = 0; // Messages from an older arm() are ignored
+let fallbackTimeoutId = null; // Main-thread deadline when Workers are unavailable
+
+try {
+    schedulerWorker = new Worker(schedulerUrl);
+    schedulerWorker.onmessage = e => {
+        if (e.data.generation !== scheduleGeneration || !running || paused) return;
+        if (e.data.type === 'deadline') {
+            update(performance.now(), true);
+        } else if (e.data.type === 'tick' && document.visibilityState === 'visible') {
+            update();
+        }
+    };
+} catch (e) {
+    console.warn("Scheduler worker unavailable, using main-thread timeouts:", e);
+}
+
+function requestRepaint() {
+    if (!reducedMotion && animationFrameId === null && document.visibilityState === 'visible' && running && !paused) {
+        animationFrameId = requestAnimationFrame(() => {
+            animationFrameId = null;
+            update();
+        });
+    }
+}
+
+// Arm the deadline for the current timer; call after startTime/current change
+function scheduleTicks() {
+    cancelTicks();
+    if (!running || paused) return;
+    const generation = scheduleGeneration;
+    const anchorMs = startTime * 1000; // performance.now() at elapsed = 0
+    const deadlineMs = anchorMs + durations[current] * 1000;
+    if (schedulerWorker) {
+        schedulerWorker.postMessage({
+            type: 'arm',
+            generation,
+            anchor: performance.timeOrigin + anchorMs,
+            deadline: performance.timeOrigin + deadlineMs,
+            tickEvery: reducedMotion ? 1000 : 0
+        });
+    } else {
+        fallbackTimeoutId = setTimeout(() => {
+            if (generation === scheduleGeneration && running && !paused) update(performance.now(), true);
+        }, Math.max(0, deadlineMs - performance.now()));
+    }
+    requestRepaint();
+}
+
+function cancelTicks() {
+    scheduleGeneration++;
+    cancelAnimationFrame(animationFrameId);
+    animationFrameId = null;
+    clearTimeout(fallbackTimeoutId);
+    fallbackTimeoutId = null;
+    if (schedulerWorker) {
+        schedulerWorker.postMessage({ type: 'cancel' });
+    }
+}
+
+// Advance state and repaint. deadlineReached is set by the scheduler, whose
+// deadline is authoritative even if float rounding leaves elapsed a hair short.
+function update(currentTime, deadlineReached = false) {
+    if (!running || paused) {
+        cancelTicks();
+        return;
+    }
+
+    // Always calculate elapsed from startTime for accuracy.
+    elapsed = (performance.now() / 1000) - startTime;
+    // globalElapsed also relies on this current elapsed
+    globalElapsed = durations.slice(0, current).reduce((a, b) => a + b, 0) + elapsed;
+    lastUpdateTime = performance.now(); // Update for next iteration
+
+    // Check for end of timer *before* potentially stopping sequence
+    if (elapsed >= durations[current] || deadlineReached) {
+        elapsed = Math.max(elapsed, durations[current]);
+        timestamps[current].end = new Date().toISOString();
+        logActivity('timer_end', current);
+
+        playAlarmSound(timerAlarmSounds[current]); // Play alarm as soon as timer ends
+
+        const nextTimerIndex = current + 1;
+        const isLastTimerInSequence = nextTimerIndex >= durations.length;
+        const willLoop = loopEnabled && (!loopLimit || loopIndex < loopLimit);
+
+        if (isLastTimerInSequence && !willLoop) {
+            // This is the very last timer and no looping
+            const alarmElement = document.getElementById("alarm");
+
+            // Clear any previous final alarm specific listeners
+            if (stopSequenceFinalAlarmEndedHandler) {
+                alarmElement.removeEventListener('ended', stopSequenceFinalAlarmEndedHandler);
+                stopSequenceFinalAlarmEndedHandler = null;
+            }
+
+            // Define the handler for when the FINAL alarm sound ends
+            stopSequenceFinalAlarmEndedHandler = () => {
+                console.log("Final alarm ended. Initiating sequence stop cleanup.");
+                // Clear the fallback timeout if alarm actually ended
+                if (stopSequenceFinalAlarmTimeoutId) {
+                    clearTimeout(stopSequenceFinalAlarmTimeoutId);
+                    stopSequenceFinalAlarmTimeoutId = null;
+                }
+                stopSequenceCleanupTimeoutId = setTimeout(() => { // Small delay before cleanup
+                    stopSequence();
+                    stopSequenceCleanupTimeoutId = null;
+                }, 100); // Give browser a moment after onended fires
+                alarmElement.removeEventListener('ended', stopSequenceFinalAlarmEndedHandler); // Remove self
+                stopSequenceFinalAlarmEndedHandler = null; // Clear ref
+            };
+
+            // Give audio element a moment to process .src and .load() before adding listener
+            setTimeout(() => {
+                // Attach the listener only if there's a sound and it's not already ended/errored
+                if (alarmElement && alarmElement.src && !alarmElement.ended && alarmElement.networkState === HTMLMediaElement.NETWORK_IDLE) { // Ensure it's not already ended or errored
+                    // Attach a one-time listener for the 'ended' event
+                    alarmElement.addEventListener('ended', stopSequenceFinalAlarmEndedHandler);
+
+                    // Set a fallback timeout in case 'ended' event doesn't fire (e.g., autoplay issues)
+                    stopSequenceFinalAlarmTimeoutId = setTimeout(() => {
+                        if (running) { // Only stop if still running (i.e., sound didn't finish or didn't start)
+                            console.warn("Final alarm did not end as expected or autoplay failed. Stopping sequence after timeout.");
+                            stopSequence();
+                        }
+                    }, Math.max(8000, (alarmElement.duration * 1000) + 1000)); // 8s minimum, or sound duration + 1s buffer
+                } else {
+                    // No sound, or sound immediately finished playing, or there was an error.
+                    // Proceed to stop sequence directly after a very small delay.
+                    console.log("No final alarm sound or it completed instantly/errored. Stopping sequence immediately.");
+                    stopSequenceCleanupTimeoutId = setTimeout(() => {
+                        stopSequence();
+                        stopSequenceCleanupTimeoutId = null;
+                    }, 100);
+                }
+            }, 50); // Small delay to allow src and load to process
+
+            // Importantly: Halt the regular update loop for this *specific final* step
+            // so no more elapsed time accrues and we explicitly wait for sound.
+            cancelTicks();
+            return;
+        } else if (nextTimerIndex < durations.length) {
+            startTimer(nextTimerIndex); // Advance to next timer immediately
+        } else if (willLoop) {
+            loopIndex++;
+            resetTimestamps();
+            startTimer(0); // Restart sequence for loop
+        }
+    }
+
+    // Continue UI updates for the *current* timer until it ends
+    if (current < durations.length) {
+        const currentBar = barElements[current];
+        
+        // If current index changed, reset the old current bar and other bars
+        if (current !== lastCurrent) {
+            barElements.forEach((be, i) => {
+                if (i === current) {
+                    be.overlay.style.display = "flex";
+                    be.timerInfo.style.display = "none";
+                } else {
+                    be.bar.style.width = "0%";
+                    be.overlay.style.display = "none";
+                    be.timerInfo.style.display = "flex";
+                }
+            });
+            lastCurrent = current;
+        }
+
+        // Update properties for the current timer's visual elements
+        const progressPct = Math.min((elapsed / durations[current]) * 100, 100);
+        currentBar.bar.style.width = progressPct + "%";
+
+        const remainingTime = Math.max(0, durations[current] - elapsed);
+
+        let countdownText = "";
+        const hrs = Math.floor(remainingTime / 3600);
+        const mins = Math.floor((remainingTime % 3600) / 60);
+        const secs = Math.floor(remainingTime % 60);
+
+        if (hrs > 0) {
+            countdownText += `${hrs}:${String(mins).padStart(2, '0')}:${String(secs).padStart(2, '0')}`;
+        } else if (mins > 0) {
+            countdownText += `${mins}:${String(secs).padStart(2, '0')}`;
+        } else {
+            countdownText += secs;
+        }
+
+        const newCountdownHtml = `${countdownText} (${progressPct.toFixed(0)}%)`;
+        if (currentBar.timerCountdown.textContent !== newCountdownHtml) {
+            currentBar.timerCountdown.textContent = newCountdownHtml;
+        }
+    }
+
+    updateCompletionBar();
+
+    requestRepaint();
+}
+
+function updateLoopSettings() {
+    const loopVal = parseInt(document.getElementById("loopCount").value);
+    loopLimit = isNaN(loopVal) || loopVal < 1 ? null : loopVal;
+    liveChanged();
+}
+
+// --- Background/Foreground Visibility Handling ---
+// The worker deadline keeps running while hidden; only repainting stops.
+document.addEventListener('visibilitychange', () => {
+    if (!running || paused) return;
+    if (document.visibilityState === 'visible') {
+        update(); // Catch the display up, then resume animation frames
+    } else {
+        cancelAnimationFrame(animationFrameId);
+        animationFrameId = null;
+    }
+});
+
+// --- Clock sync ---
+// NTP-style estimate of the offset between this device's clock and the
+// server's: each sample brackets one /time request between two local reads,
+// offset = server - midpoint, error <= rtt / 2. The lowest-RTT samples are
+// the least queued, so the offset is the median of those. Local time comes
+// from performance.timeOrigin + now(), which Date adjustments do not move.
+const timeUrl = timerConfig.time_url;
+const CLOCK_SAMPLES = 8;
+const CLOCK_BEST_SAMPLES = 3;
+const CLOCK_RESYNC_MS = 5 * 60 * 1000;
+let clockOffset = null; // server time - local time (ms); null until measured
+let clockRtt = null;
+let clockSyncPromise = null;
+let clockResyncId = null;
+
+function localNow() {
+    return performance.timeOrigin + performance.now();
+}
+
+function serverNow() {
+    return localNow() + (clockOffset || 0);
+}
+
+async function measureClockOffset() {
+    const samples = [];
+    for (let i = 0; i < CLOCK_SAMPLES; i++) {
+        try {
+            const t0 = localNow();
+            const response = await fetch(timeUrl, { cache: 'no-store' });
+            const t3 = localNow();
+            const data = await response.json();
+            samples.push({ rtt: t3 - t0, offset: data.t - (t0 + t3) / 2 });
+        } catch (e) {
+            // Skip the sample; a flaky request just leaves fewer to choose from
+        }
+    }
+    if (!samples.length) return;
+    const best = samples.sort((a, b) => a.rtt - b.rtt).slice(0, CLOCK_BEST_SAMPLES);
+    const offsets = best.map(s => s.offset).sort((a, b) => a - b);
+    clockOffset = offsets[Math.floor(offsets.length / 2)];
+    clockRtt = best[0].rtt;
+}
+
+// Measure once, then keep the estimate fresh while a live session is active
+function syncClock() {
+    if (!clockSyncPromise) {
+        clockSyncPromise = measureClockOffset();
+        clockResyncId = setInterval(measureClockOffset, CLOCK_RESYNC_MS);
+    }
+    return clockSyncPromise;
+}
+
+// --- Live sync ---
+// A host publishes a snapshot of the engine after every state change to the
+// live sync server (live.py); viewers opened with ?live=<code> follow it over
+// Server-Sent Events. Snapshots are absolute (which timer, how far into it,
+// paused or not), so a missed or reordered message never leaves a viewer off.
+const liveUrl = timerConfig.live_url;
+const liveSessionUrl = timerConfig.live_session_url;
+const LIVE_HOST_STORAGE_KEY = `tf-live-host-${sequenceId}`;
+const GROUP_START_DELAY_MS = 5000; // Time for viewers to get ready
+let liveRole = null; // 'host', 'viewer' or null
+let liveHost = null; // {session, token, viewer_url} while hosting
+let livePublishPending = false;
+let liveSeq = 0; // Orders snapshots; viewers drop anything older than what they applied
+let liveSource = null;
+let groupStartAt = null; // Server-clock ms of a pending "start together"
+let groupStartTimeoutId = null;
+
+function liveSnapshot() {
+    let elapsedNow = 0;
+    if (running && startTime !== null) {
+        elapsedNow = ((paused && pauseStartTime !== null ? pauseStartTime : performance.now()) / 1000) - startTime;
+    }
+    liveSeq = Math.max(liveSeq + 1, Date.now());
+    return {
+        seq: liveSeq,
+        running,
+        paused,
+        current,
+        elapsed: Math.max(0, elapsedNow),
+        loop_index: loopIndex,
+        loop_enabled: loopEnabled,
+        loop_limit: loopLimit,
+        // Server-clock time the snapshot was taken; viewers advance by now - at
+        at: clockOffset !== null ? serverNow() : null,
+        scheduled_start: groupStartAt
+    };
+}
+
+// Called from every engine state change; coalesces into one publish per task
+function liveChanged() {
+    if (liveRole !== 'host' || livePublishPending) return;
+    livePublishPending = true;
+    setTimeout(() => {
+        livePublishPending = false;
+        publishLiveState();
+    }, 0);
+}
+
+function publishLiveState() {
+    if (liveRole !== 'host' || !liveHost) return;
+    fetch(liveUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ session: liveHost.session, token: liveHost.token, state: liveSnapshot() }),
+        keepalive: true
+    })
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(data => setLiveStatus(`Live · ${data.viewers} following`))
+        .catch(error => {
+            console.warn('Live publish failed:', error);
+            setLiveStatus('Live · reconnecting…');
+        });
+}
+
+function setLiveStatus(text) {
+    const status = document.getElementById(liveRole === 'viewer' ? 'liveViewerStatus' : 'liveStatus');
+    if (status) status.textContent = text;
+}
+
+function showLiveHostUI() {
+    const link = document.getElementById('liveViewerUrl');
+    if (link) link.value = liveHost.viewer_url;
+    const details = document.getElementById('liveHostDetails');
+    if (details) details.style.display = 'flex';
+    const btn = document.getElementById('liveHostBtn');
+    if (btn) btn.textContent = '⏹ Stop hosting';
+}
+
+function startHosting(event) {
+    if (event) event.preventDefault();
+    if (liveRole === 'host') {
+        stopHosting();
+        return;
+    }
+    fetch(liveSessionUrl, { method: 'POST' })
+        .then(response => response.ok ? response.json() : Promise.reject(response.status))
+        .then(data => {
+            liveHost = { session: data.session, token: data.token, viewer_url: data.viewer_url };
+            sessionStorage.setItem(LIVE_HOST_STORAGE_KEY, JSON.stringify(liveHost));
+            liveRole = 'host';
+            showLiveHostUI();
+            syncClock().then(publishLiveState);
+        })
+        .catch(error => {
+            console.error('Could not start a live session:', error);
+            setLiveStatus('Live sync is unavailable right now.');
+        });
+}
+
+function stopHosting() {
+    cancelGroupStart();
+    liveRole = null;
+    liveHost = null;
+    sessionStorage.removeItem(LIVE_HOST_STORAGE_KEY);
+    const details = document.getElementById('liveHostDetails');
+    if (details) details.style.display = 'none';
+    const btn = document.getElementById('liveHostBtn');
+    if (btn) btn.textContent = '📡 Host live session';
+    setLiveStatus('');
+}
+
+// A host that reloads the page keeps its session (and its viewers)
+function resumeHosting() {
+    try {
+        liveHost = JSON.parse(sessionStorage.getItem(LIVE_HOST_STORAGE_KEY));
+    } catch (e) {
+        liveHost = null;
+    }
+    if (liveHost && liveHost.session && liveHost.token) {
+        liveRole = 'host';
+        showLiveHostUI();
+        syncClock().then(publishLiveState);
+    }
+}
+
+function followLiveSession(session) {
+    liveRole = 'viewer';
+    let lastSeq = 0;
+    const banner = document.getElementById('liveViewerBanner');
+    if (banner) banner.style.display = 'flex';
+
+    syncClock().then(() => {
+        liveSource = new EventSource(`${liveUrl}?session=${encodeURIComponent(session)}`);
+        liveSource.addEventListener('state', e => {
+        const message = JSON.parse(e.data);
+        if (message.state.seq <= lastSeq) return;
+        lastSeq = message.state.seq;
+        applyLiveState(message.state, message.age_ms / 1000);
+        });
+        liveSource.onopen = () => setLiveStatus('📡 Following the host live');
+        liveSource.onerror = () => setLiveStatus('📡 Connection lost, reconnecting…');
+    });
+}
+
+// Bring this page's engine to the host's snapshot. With both clocks synced the
+// snapshot's age is measured end to end (host -> server -> here); otherwise the
+// live server's `age` covers everything but the last hop.
+function applyLiveState(state, age) {
+    if (state.at !== null && state.at !== undefined && clockOffset !== null) {
+        age = (serverNow() - state.at) / 1000;
+    }
+    loopEnabled = !!state.loop_enabled;
+    const loopCountInput = document.getElementById("loopCount");
+    if (loopCountInput) loopCountInput.value = state.loop_limit || "";
+    updateLoopUI();
+    updateLoopSettings();
+
+    if (!state.running) {
+        if (running) stopSequence();
+        if (state.scheduled_start) {
+            scheduleGroupStart(state.scheduled_start);
+        } else {
+            cancelGroupStart();
+        }
+        return;
+    }
+    cancelGroupStart();
+    if (!running) _toggleStart();
+    if (paused) _togglePause();
+    if (state.current !== current) _jumpToTimer(state.current);
+    loopIndex = state.loop_index;
+
+    // Align the running timer; the deadline and repaint follow from startTime
+    const elapsedNow = state.elapsed + (state.paused ? 0 : Math.max(0, age));
+    startTime = performance.now() / 1000 - elapsedNow;
+    scheduleTicks();
+    update();
+    if (state.paused && running && !paused) _togglePause();
+}
+
+// Start at a server-clock instant, so every synced device starts together
+function scheduleGroupStart(startAt) {
+    cancelGroupStart();
+    groupStartAt = startAt;
+    const tick = () => {
+        const remaining = groupStartAt - serverNow();
+        if (remaining > 0) {
+            setLiveStatus(`Starting together in ${Math.ceil(remaining / 1000)}s`);
+            groupStartTimeoutId = setTimeout(tick, Math.min(1000, remaining));
+            return;
+        }
+        const lateSeconds = -remaining / 1000;
+        groupStartAt = null;
+        groupStartTimeoutId = null;
+        if (!running) _toggleStart();
+        // Timers fire late by a few ms; anchor to the agreed instant instead
+        startTime = performance.now() / 1000 - lateSeconds;
+        scheduleTicks();
+        setLiveStatus(liveRole === 'viewer' ? '📡 Following the host live' : '');
+    };
+    tick();
+}
+
+function cancelGroupStart() {
+    clearTimeout(groupStartTimeoutId);
+    groupStartTimeoutId = null;
+    groupStartAt = null;
+}
+
+// Host: count everyone in and start on the same server-clock instant
+function startTogether(event) {
+    event.preventDefault();
+    if (liveRole !== 'host') return;
+    syncClock().then(() => {
+        if (running) stopSequence();
+        scheduleGroupStart(serverNow() + GROUP_START_DELAY_MS);
+        liveChanged();
+    });
+}
+
+function enableLiveSound(event) {
+    event.preventDefault();
+    // Viewers never press Play, so this tap is the gesture that unlocks audio
+    initAudioContext();
+    if (audioContext && audioContext.state === 'suspended') {
+        audioContext.resume().catch(e => console.warn("Failed to resume AudioContext:", e));
+    }
+    const backgroundAlarm = document.getElementById("backgroundAlarm");
+    if (backgroundAlarm) {
+        backgroundAlarm.volume = 0;
+        backgroundAlarm.play().catch(e => console.warn("Failed to start background audio:", e));
+    }
+    const btn = getButtonElement(event);
+    if (btn) btn.style.display = 'none';
+}
+
+preloadAlarmSounds();
+
+document.addEventListener('DOMContentLoaded', () => {
+    initUI(); // Initialize bars, sets all to overlay (active) state
+    // Initial setup for advanced controls links to be disabled.
+    // Advanced controls are initially hidden, so their buttons should be disabled.
+    document.querySelectorAll("#advancedControls .btn-solid-3d").forEach(link => setLinkDisabled(link, true));
+
+    // Set initial states for main buttons with specific colors and fixed width
+    setButtonState('playPauseBtn', "PLAY", 'btn-darkgreen');
+    setLinkDisabled(document.getElementById("stopBtn"), true);
+    setLinkDisabled(document.getElementById("prevBtn"), true);
+    setLinkDisabled(document.getElementById("nextBtn"), true);
+    setLinkDisabled(document.getElementById("advancedBtn"), false); // Settings button always enabled
+
+    // Apply theme preference (system default or saved cookie for logged-in users)
+    applyThemePreference();
+
+    // Initialize loop settings from database defaults
+    const loopCountInput = document.getElementById("loopCount");
+    loopEnabled = defaultLoopEnabled;
+    if (loopCountInput && defaultLoopCount !== null) {
+        loopCountInput.value = defaultLoopCount;
+    }
+    // Apply the initialized settings
+    updateLoopUI();
+    updateLoopSettings();
+
+    if (timerConfig.live_session) {
+        followLiveSession(timerConfig.live_session);
+    } else {
+        resumeHosting();
+    }
+
+    // Initial play of background silent audio (user interaction might be needed on first load)
+    const backgroundAlarm = document.getElementById("backgroundAlarm");
+    if (backgroundAlarm) {
+        backgroundAlarm.volume = 0; // Ensure it's silent
+        backgroundAlarm.play().catch(e => {
+            console.warn("Autoplay of silent background audio blocked. User interaction required for robust background audio:", e);
+            // Provide instruction to user if possible, e.g., a "Play sound" button on first interaction.
+            // For this app, simply let them know it might not work in background until first interaction.
+        });
+    }
+
+    // --- PWA INSTALL BANNER LOGIC (TIMER SPECIFIC) ---
+    let deferredPrompt;
+    const installBanner = document.getElementById('installBanner');
+    const installLink = document.getElementById('installLink');
+    const iosInstructions = document.getElementById('iosInstructions');
+
+    // 1. Chrome / Android Logic (Standard PWA)
+    window.addEventListener('beforeinstallprompt', (e) => {
+        e.preventDefault();
+        deferredPrompt = e;
+        installBanner.style.display = 'block';
+
+        installLink.addEventListener('click', (e) => {
+            e.preventDefault();
+            installBanner.style.display = 'none';
+            deferredPrompt.prompt();
+            deferredPrompt.userChoice.then((choiceResult) => {
+                if (choiceResult.outcome === 'accepted') {
+                    console.log('User accepted the PWA prompt');
+                } else {
+                    console.log('User dismissed the PWA prompt');
+                }
+                deferredPrompt = null;
+            });
+        });
+    });
+
+    // 2. Safari / iOS Logic (Manual Instruction)
+    const isIos = () => {
+        const userAgent = window.navigator.userAgent.toLowerCase();
+        return /iphone|ipad|ipod/.test(userAgent);
+    }
+
+    const isInStandaloneMode = () => ('standalone' in window.navigator) && (window.navigator.standalone);
+
+    if (isIos() && !isInStandaloneMode()) {
+        installBanner.style.display = 'block';
+        installLink.style.display = 'none'; // Hide the 'Install App' link for iOS
+        iosInstructions.style.display = 'inline'; // Show the text instructions inline
+    }
+
+    // Hide banner if app is installed
+    window.addEventListener('appinstalled', (evt) => {
+        installBanner.style.display = 'none';
+    });
+});
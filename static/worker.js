@@ -1,77 +1,302 @@
 // TimerFreak Service Worker
-// Uses relative paths to work with any deployment base URL
+// Served from /worker.js?v=<APP_VERSION> (see footer.html) so its scope is the
+// whole site; every URL is resolved against the registration scope so any
+// deployment base path works.
+//
+// Strategies:
+//   HTML pages          network-first, falling back to the last visited copy
+//   /manifest/, /qr/    stale-while-revalidate
+//   /static/dist/*      cache-first (content-hashed, never changes)
+//   other /static/*     stale-while-revalidate
+//   POST /log_activity  queued in IndexedDB while offline, replayed in batches
 
-const CACHE_NAME = 'timerfreak-cache-v1';
-const ASSETS_TO_CACHE = [
-    './',
-    './static/style.css',
-    './static/worker.js',
-    './static/manifest.json',
-    './static/logotimerfreak.svg'
-];
+const VERSION = new URL(self.location).searchParams.get('v') || 'dev';
+const PAGES_CACHE = `timerfreak-pages-${VERSION}`;
+const RUNTIME_CACHE = `timerfreak-runtime-${VERSION}`;
+// Hashed files are content-addressed, so this cache survives deploys
+const ASSETS_CACHE = 'timerfreak-assets';
+const ASSETS_CACHE_MAX_ENTRIES = 200;
+
+const SCOPE = new URL(self.registration.scope);
+const REPLAY_URL = new URL('log_activity/batch', SCOPE).href;
+const REPLAY_BATCH_SIZE = 50;
+const REPLAY_SYNC_TAG = 'replay-activity';
+
+const DB_NAME = 'timerfreak';
+const QUEUE_STORE = 'activity-queue';
+
+function scopePath(url) {
+    const path = new URL(url).pathname;
+    return path.startsWith(SCOPE.pathname) ? path.slice(SCOPE.pathname.length) : null;
+}
+
+function isHashedAsset(path) { return path.startsWith('static/dist/'); }
+function isRevalidated(path) { return path.startsWith('manifest/') || path.startsWith('qr/') || path.startsWith('static/'); }
+// Only the home page and timer pages are kept for offline use; account pages are not cached
+function isOfflinePage(path) { return path === '' || path.startsWith('timer/'); }
+
+// --- Install / activate ---
 
 self.addEventListener('install', e => {
     e.waitUntil(
-        caches.open(CACHE_NAME).then(cache => {
-            return cache.addAll(ASSETS_TO_CACHE).catch(err => {
-                console.warn('Some assets failed to cache:', err);
-                // Continue even if some assets fail
-                return Promise.resolve();
-            });
-        })
+        caches.open(PAGES_CACHE)
+            .then(cache => cache.add(SCOPE.href))
+            .catch(err => console.warn('Home page not precached:', err))
     );
-    // Activate immediately
     self.skipWaiting();
 });
 
 self.addEventListener('activate', e => {
-    // Clean up old caches
+    const current = [PAGES_CACHE, RUNTIME_CACHE, ASSETS_CACHE];
     e.waitUntil(
-        caches.keys().then(cacheNames => {
-            return Promise.all(
-                cacheNames
-                    .filter(name => name !== CACHE_NAME)
-                    .map(name => caches.delete(name))
-            );
-        })
+        caches.keys()
+            .then(names => Promise.all(
+                names.filter(name => name.startsWith('timerfreak-') && !current.includes(name))
+                     .map(name => caches.delete(name))
+            ))
+            .then(() => trimCache(ASSETS_CACHE, ASSETS_CACHE_MAX_ENTRIES))
+            .then(() => self.clients.claim())
+            .then(() => replayQueue())
     );
-    // Claim all clients
-    self.clients.claim();
 });
 
+async function trimCache(name, maxEntries) {
+    const cache = await caches.open(name);
+    const keys = await cache.keys();
+    // keys() is in insertion order; drop the oldest
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - maxEntries)).map(k => cache.delete(k)));
+}
+
+// --- Fetch strategies ---
+
+async function networkFirst(request) {
+    const cache = await caches.open(PAGES_CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok && isOfflinePage(scopePath(request.url))) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (err) {
+        const cached = await cache.match(request, { ignoreVary: true });
+        if (cached) return cached;
+        return new Response(
+            '<!DOCTYPE html><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">' +
+            '<title>Offline - TimerFreak</title><p style="font-family: sans-serif; padding: 2rem">' +
+            'You are offline and this page has not been opened on this device yet. ' +
+            'Timers you have already opened still work offline.</p>',
+            { status: 503, headers: { 'Content-Type': 'text/html; charset=utf-8' } }
+        );
+    }
+}
+
+async function staleWhileRevalidate(request, event) {
+    const cache = await caches.open(RUNTIME_CACHE);
+    const cached = await cache.match(request);
+    const refresh = fetch(request).then(response => {
+        if (response.status === 200) cache.put(request, response.clone());
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(refresh.catch(() => {}));
+        return cached;
+    }
+    return refresh;
+}
+
+async function cacheFirst(request) {
+    const cache = await caches.open(ASSETS_CACHE);
+    let response = await cache.match(request.url);
+    if (!response) {
+        // Fetch the whole file (audio elements send Range requests) so it can be cached
+        response = await fetch(request.url, { credentials: 'same-origin' });
+        if (response.status === 200) cache.put(request.url, response.clone());
+    }
+    return rangeResponse(request, response);
+}
+
+// Answer a Range request from a full cached response
+async function rangeResponse(request, response) {
+    const range = request.headers.get('range');
+    if (!range || response.status !== 200) return response;
+    const match = /^bytes=(\d*)-(\d*)$/.exec(range.trim());
+    const body = await response.arrayBuffer();
+    const size = body.byteLength;
+    let start, end;
+    if (match && match[1] !== '') {
+        start = Number(match[1]);
+        end = match[2] !== '' ? Math.min(Number(match[2]), size - 1) : size - 1;
+    } else if (match && match[2] !== '') {
+        start = Math.max(0, size - Number(match[2]));
+        end = size - 1;
+    }
+    if (start === undefined || start > end || start >= size) {
+        return new Response(null, { status: 416, headers: { 'Content-Range': `bytes */${size}` } });
+    }
+    return new Response(body.slice(start, end + 1), {
+        status: 206,
+        statusText: 'Partial Content',
+        headers: {
+            'Content-Type': response.headers.get('Content-Type') || 'application/octet-stream',
+            'Content-Range': `bytes ${start}-${end}/${size}`,
+            'Content-Length': String(end - start + 1)
+        }
+    });
+}
+
 self.addEventListener('fetch', e => {
-    // Only handle GET requests
-    if (e.request.method !== 'GET') return;
-    
-    // Skip cross-origin requests
-    if (!e.request.url.startsWith(self.location.origin)) return;
-    
-    e.respondWith(
-        caches.match(e.request).then(response => {
-            // Return cached response if found
-            if (response) {
-                return response;
-            }
-            // Clone the request
-            const fetchRequest = e.request.clone();
-            // Fetch from network
-            return fetch(fetchRequest).then(response => {
-                // Don't cache non-successful responses
-                if (!response || response.status !== 200 || response.type !== 'basic') {
-                    return response;
-                }
-                // Clone the response
-                const responseToCache = response.clone();
-                // Add to cache
-                caches.open(CACHE_NAME).then(cache => {
-                    cache.put(e.request, responseToCache);
-                });
-                return response;
-            }).catch(err => {
-                console.warn('Fetch failed:', err);
-                // Return offline fallback if available
-                return null;
+    const request = e.request;
+    if (!request.url.startsWith(self.location.origin)) return;
+    const path = scopePath(request.url);
+    if (path === null) return;
+
+    if (request.method === 'POST' && path === 'log_activity') {
+        e.respondWith(logActivity(request));
+        return;
+    }
+    if (request.method !== 'GET') return;
+
+    if (request.mode === 'navigate') {
+        e.respondWith(networkFirst(request));
+    } else if (isHashedAsset(path)) {
+        e.respondWith(cacheFirst(request));
+    } else if (isRevalidated(path) && !request.headers.has('range')) {
+        e.respondWith(staleWhileRevalidate(request, e));
+    }
+    // Everything else (APIs, search) goes straight to the network
+});
+
+// The timer page lists what it needs to run offline (its alarm sounds, QR, manifest)
+self.addEventListener('message', e => {
+    const data = e.data || {};
+    if (data.type === 'precache' && Array.isArray(data.urls)) {
+        e.waitUntil(precache(data.urls));
+    } else if (data.type === 'replay') {
+        e.waitUntil(replayQueue());
+    }
+});
+
+async function precache(urls) {
+    const assets = await caches.open(ASSETS_CACHE);
+    const runtime = await caches.open(RUNTIME_CACHE);
+    await Promise.all(urls.map(async url => {
+        const path = scopePath(new URL(url, SCOPE).href);
+        if (path === null) return;
+        const cache = isHashedAsset(path) ? assets : runtime;
+        if (await cache.match(url)) return;
+        try {
+            const response = await fetch(url, { credentials: 'same-origin' });
+            if (response.ok) await cache.put(url, response);
+        } catch (err) {
+            console.warn('Precache failed:', url, err);
+        }
+    }));
+}
+
+// --- Offline activity queue ---
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const req = indexedDB.open(DB_NAME, 1);
+        req.onupgradeneeded = () => req.result.createObjectStore(QUEUE_STORE, { autoIncrement: true });
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function queueTransaction(mode, work) {
+    return openQueue().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction(QUEUE_STORE, mode);
+        const result = work(tx.objectStore(QUEUE_STORE));
+        tx.oncomplete = () => { db.close(); resolve(result); };
+        tx.onerror = () => { db.close(); reject(tx.error); };
+    }));
+}
+
+function enqueue(event) {
+    return queueTransaction('readwrite', store => { store.add(event); });
+}
+
+function readBatch(limit) {
+    return queueTransaction('readonly', store => {
+        const batch = { keys: [], events: [] };
+        store.openCursor().onsuccess = ev => {
+            const cursor = ev.target.result;
+            if (!cursor || batch.keys.length >= limit) return;
+            batch.keys.push(cursor.key);
+            batch.events.push(cursor.value);
+            cursor.continue();
+        };
+        return batch;
+    });
+}
+
+function removeKeys(keys) {
+    return queueTransaction('readwrite', store => { keys.forEach(key => store.delete(key)); });
+}
+
+async function logActivity(request) {
+    const body = await request.clone().text();
+    try {
+        const response = await fetch(request);
+        replayQueue();
+        return response;
+    } catch (err) {
+        let event;
+        try {
+            event = JSON.parse(body);
+        } catch (parseErr) {
+            return Response.error();
+        }
+        event.occurred_at = Date.now();
+        await enqueue(event);
+        if (self.registration.sync) {
+            self.registration.sync.register(REPLAY_SYNC_TAG).catch(() => {});
+        }
+        return new Response(JSON.stringify({ message: 'Queued while offline', queued: true }), {
+            status: 202,
+            headers: { 'Content-Type': 'application/json' }
+        });
+    }
+}
+
+let replaying = null;
+
+function replayQueue() {
+    if (!replaying) {
+        replaying = drainQueue()
+            .catch(err => console.warn('Activity replay failed:', err))
+            .finally(() => { replaying = null; });
+    }
+    return replaying;
+}
+
+async function drainQueue() {
+    for (;;) {
+        const batch = await readBatch(REPLAY_BATCH_SIZE);
+        if (!batch.keys.length) return;
+        let response;
+        try {
+            response = await fetch(REPLAY_URL, {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ events: batch.events })
             });
-        })
-    );
+        } catch (err) {
+            return; // still offline; the next sync/online/activity retries
+        }
+        // 4xx other than rate limiting will never succeed, so drop those too
+        if (response.ok || (response.status >= 400 && response.status < 500 && response.status !== 429)) {
+            await removeKeys(batch.keys);
+        } else {
+            return;
+        }
+    }
+}
+
+self.addEventListener('sync', e => {
+    if (e.tag === REPLAY_SYNC_TAG) {
+        e.waitUntil(replayQueue());
+    }
 });
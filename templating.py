@@ -0,0 +1,45 @@
+"""
+TimerFreak Template Cache
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+On-disk Jinja bytecode cache shared by all workers on a node, so templates
+are compiled once per release instead of once per worker after every
+restart. Cache files carry the app version in their names; files from older
+versions are removed at startup. Jinja also checks each template's source
+checksum, so an edited template is never served stale within a version.
+"""
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+CACHE_PREFIX = '__jinja2_'
+
+
+def init_template_cache(app, version):
+    """
+    Attach a FileSystemBytecodeCache under JINJA_BYTECODE_CACHE_DIR (default
+    instance/jinja-cache). Disabled with JINJA_BYTECODE_CACHE=0.
+    """
+    if os.environ.get('JINJA_BYTECODE_CACHE', '1').lower() in ('0', 'false', 'no'):
+        return None
+    directory = os.environ.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja-cache')
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        app.logger.warning(f"Template bytecode cache disabled, cannot create {directory}: {e}")
+        return None
+
+    version_prefix = f"{CACHE_PREFIX}{version}_"
+    for name in os.listdir(directory):
+        if name.startswith(CACHE_PREFIX) and not name.startswith(version_prefix):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass  # another worker got there first
+
+    cache = FileSystemBytecodeCache(directory, pattern=f"{version_prefix}%s.cache")
+    app.jinja_env.bytecode_cache = cache
+    return cache
@@ -0,0 +1,43 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# The app is a flat set of top-level modules; import them from the repo root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+# app.py reads DATABASE_URL at import, and test modules import it while being
+# collected: point it at a throwaway SQLite file before that happens
+_DB_DIR = tempfile.mkdtemp(prefix='timerfreak-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ['ACTIVITY_JOURNAL'] = 'sync'
+atexit.register(shutil.rmtree, _DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def app():
+    """The module-level app, on the throwaway database"""
+    from app import app
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
+
+
+@pytest.fixture
+def session(app):
+    """db.session inside an app context, on freshly created tables"""
+    from models import db
+    from auth.user_cache import clear_user_cache
+    from sequence_view import clear_sequence_cache
+    with app.app_context():
+        db.create_all()
+        yield db.session
+        db.session.remove()
+        db.drop_all()
+    clear_sequence_cache()
+    clear_user_cache()
@@ -0,0 +1,107 @@
+"""Keyset pagination of /browse and /api/browse"""
+import base64
+
+import pytest
+
+from app import decode_browse_cursor, encode_browse_cursor
+from models import Sequence, Timer, TimerCategory
+
+
+def _seed(session, starts):
+    for i, count in enumerate(starts):
+        sequence = Sequence(slug=f'seq{i}', name=f'Seq {i}', start_count=count)
+        sequence.timers = [Timer(timer_name='Work', duration=60, timer_order=0)]
+        session.add(sequence)
+    session.add(Sequence(slug='private', name='Private', start_count=99, is_public=False))
+    session.commit()
+
+
+def _pages(client, **params):
+    seen, cursor = [], None
+    while True:
+        response = client.get('/api/browse', query_string=dict(params, cursor=cursor or ''))
+        assert response.status_code == 200
+        body = response.get_json()
+        seen.append([item['id'] for item in body['items']])
+        cursor = body['next_cursor']
+        if not cursor:
+            return seen
+
+
+@pytest.mark.parametrize('rank, sequence_id', [(0, 1), (12345, 678), (-3, 2**40)])
+def test_cursor_round_trip(rank, sequence_id):
+    cursor = encode_browse_cursor(rank, sequence_id)
+    assert '=' not in cursor
+    assert decode_browse_cursor(cursor) == (rank, sequence_id)
+
+
+def test_trending_cursor_keeps_float_rank():
+    cursor = encode_browse_cursor(-1234.5678901234567, 7)
+    assert decode_browse_cursor(cursor, sort='trending') == (-1234.5678901234567, 7)
+    with pytest.raises(ValueError):
+        decode_browse_cursor(cursor, sort='popular')
+    with pytest.raises(ValueError):
+        decode_browse_cursor(base64.urlsafe_b64encode(b'[NaN,1]').decode(), sort='trending')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'not json').decode(),
+    base64.urlsafe_b64encode(b'[1]').decode(),
+    base64.urlsafe_b64encode(b'{"a":1,"b":2}').decode(),
+    base64.urlsafe_b64encode(b'[true,1]').decode(),
+    base64.urlsafe_b64encode(b'[1,"x"]').decode(),
+    base64.urlsafe_b64encode(b'5').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+    base64.urlsafe_b64encode(b'[1,9223372036854775808]').decode(),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_browse_cursor(cursor)
+
+
+def test_pages_are_stable_with_tied_ranks(app, session):
+    # Ties on start_count are broken by id, newest first
+    _seed(session, [5, 3, 3, 3, 3, 3, 1, 0, 0])
+    client = app.test_client()
+
+    pages = _pages(client, limit=2)
+
+    flat = [slug for page in pages for slug in page]
+    assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+    assert flat == ['seq0', 'seq5', 'seq4', 'seq3', 'seq2', 'seq1', 'seq6', 'seq8', 'seq7']
+    assert _pages(client, limit=2) == pages
+
+
+def test_trending_pages_cover_every_sequence_once(app, session):
+    _seed(session, [0] * 5)
+    client = app.test_client()
+
+    flat = [slug for page in _pages(client, limit=2, sort='trending') for slug in page]
+
+    assert sorted(flat) == [f'seq{i}' for i in range(5)]
+
+
+def test_category_filter(app, session):
+    session.add(TimerCategory(id=1, name='HIIT', slug='hiit', is_active=1))
+    _seed(session, [1, 2, 3])
+    session.get(Sequence, 1).category_id = 1
+    session.commit()
+    client = app.test_client()
+
+    assert _pages(client, category='hiit') == [['seq0']]
+    assert _pages(client, category='uncategorized') == [['seq2', 'seq1']]
+    assert client.get('/api/browse?category=nope').status_code == 400
+
+
+@pytest.mark.parametrize('query', [
+    'cursor=not-a-cursor',
+    'cursor=' + base64.urlsafe_b64encode(b'[1.5,2]').decode(),
+    'cursor=' + base64.urlsafe_b64encode(b'[100000000000000000000000000,2]').decode(),
+    'sort=sideways',
+    'limit=ten',
+])
+def test_api_rejects_bad_parameters_with_400(app, session, query):
+    response = app.test_client().get('/api/browse?' + query)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
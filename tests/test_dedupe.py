@@ -0,0 +1,110 @@
+"""flask sequence-dedupe: keeper choice, aliases and merged rankings"""
+import math
+from datetime import datetime, timedelta, timezone
+
+from dedupe import dedupe_sequences, find_sequence, find_sequences
+from models import CounterLog, Sequence, SequenceShare, Timer, TRENDING_NO_STARTS
+from ranking import trending_exponent
+
+NOW = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+
+
+def _sequence(session, slug, created_at, starts=0, name='Pomodoro', owner_id=None):
+    sequence = Sequence(slug=slug, name=name, created_at=created_at, owner_id=owner_id, start_count=starts,
+                        trending_score=trending_exponent(created_at) + math.log(starts) if starts else TRENDING_NO_STARTS)
+    sequence.timers = [Timer(timer_name='Work', duration=1500, timer_order=0, color='#ff0000', alarm_sound='bell.mp3'),
+                       Timer(timer_name='Break', duration=300, timer_order=1, color='#00ff00', alarm_sound='bell.mp3')]
+    session.add(sequence)
+    session.flush()
+    return sequence
+
+
+def test_merges_into_oldest_by_created_at(session):
+    # The oldest duplicate has the highest id, so "lowest id" would pick the wrong one
+    newest = _sequence(session, 'newest', NOW, starts=2)
+    middle = _sequence(session, 'middle', NOW - timedelta(days=1))
+    oldest = _sequence(session, 'oldest', NOW - timedelta(days=2), starts=3)
+    other = _sequence(session, 'other', NOW, name='Tabata')
+    session.add(CounterLog(sequence_id=newest.id, event_type='sequence_start', timestamp=NOW))
+    session.add(SequenceShare(sequence_id=newest.id, share_token='tok-newest'))
+    session.commit()
+    keeper_id, merged_ids, other_id = oldest.id, {newest.id, middle.id}, other.id
+    expected_score = math.log(math.exp(newest.trending_score - oldest.trending_score) + 1) + oldest.trending_score
+
+    report = dedupe_sequences(batch_size=2)
+    session.expire_all()
+
+    assert report['scanned'] == 4
+    assert report['groups'] == 1
+    assert report['sequence'] == 2
+    assert report['timer'] == 4
+
+    keeper = session.get(Sequence, keeper_id)
+    assert keeper.start_count == 5
+    assert math.isclose(keeper.trending_score, expected_score)
+    assert keeper.content_hash is not None
+    assert [t.timer_name for t in keeper.timers] == ['Work', 'Break']
+    assert Sequence.query.filter(Sequence.id.in_(merged_ids)).count() == 0
+    assert session.get(Sequence, other_id).content_hash not in (None, keeper.content_hash)
+
+    # Old public ids, logs and share links follow the keeper
+    assert find_sequence('newest').id == keeper_id
+    assert find_sequence('middle').id == keeper_id
+    assert find_sequence('oldest').id == keeper_id
+    assert find_sequence('gone') is None
+    assert {slug: s.id for slug, s in find_sequences(['newest', 'other', 'gone']).items()} == \
+        {'newest': keeper_id, 'other': other_id}
+    assert CounterLog.query.one().sequence_id == keeper_id
+    assert SequenceShare.query.filter_by(share_token='tok-newest').one().sequence_id == keeper_id
+
+
+def test_already_hashed_sequence_stays_keeper(session):
+    first_id = _sequence(session, 'first', NOW - timedelta(days=5)).id
+    session.commit()
+    dedupe_sequences()
+    # Older by created_at, but the hash already belongs to `first`
+    late = _sequence(session, 'late', NOW - timedelta(days=9), starts=1)
+    session.commit()
+
+    report = dedupe_sequences()
+    session.expire_all()
+
+    assert report['sequence'] == 1
+    assert find_sequence('late').id == first_id
+    assert session.get(Sequence, first_id).start_count == 1
+
+
+def test_no_starts_sentinel_is_absorbed(session):
+    started = _sequence(session, 'started', NOW - timedelta(days=1), starts=1)
+    _sequence(session, 'unused', NOW)
+    session.commit()
+    started_id, score = started.id, started.trending_score
+
+    dedupe_sequences()
+    session.expire_all()
+
+    assert session.get(Sequence, started_id).trending_score == score
+
+
+def test_owned_sequences_are_left_alone(session):
+    _sequence(session, 'anon', NOW)
+    owned_id = _sequence(session, 'owned', NOW - timedelta(days=1), owner_id=1).id  # SQLite skips the FK check
+    session.commit()
+
+    report = dedupe_sequences()
+
+    assert report['scanned'] == 1
+    assert report['sequence'] == 0
+    assert find_sequence('owned').id == owned_id
+
+
+def test_dry_run_changes_nothing(session):
+    _sequence(session, 'a', NOW)
+    _sequence(session, 'b', NOW - timedelta(days=1))
+    session.commit()
+
+    report = dedupe_sequences(dry_run=True)
+
+    assert (report['groups'], report['sequence'], report['timer']) == (1, 1, 2)
+    assert Sequence.query.count() == 2
+    assert Sequence.query.filter(Sequence.content_hash.isnot(None)).count() == 0
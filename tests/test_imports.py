@@ -0,0 +1,24 @@
+"""Worker boot must not import the subsystems app.py defers to first use"""
+import json
+import os
+import subprocess
+import sys
+
+from diagnostics import DEFERRED_MODULES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import json, sys, app; "
+    "print(json.dumps(sorted({m.split('.', 1)[0] for m in sys.modules} & set(%r))))"
+)
+
+
+def test_import_app_skips_deferred_modules(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'boot.db'}")
+    # The flask CLI loads Flask-Migrate on purpose; a worker does not
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    result = subprocess.run([sys.executable, '-c', PROBE % (DEFERRED_MODULES,)],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    eager = json.loads(result.stdout.strip().splitlines()[-1])
+    assert eager == [], f"imported at boot: {', '.join(eager)}"
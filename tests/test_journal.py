@@ -0,0 +1,119 @@
+"""ActivityJournal: sync and queued writes, spill to file, flush on close"""
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import journal as journal_module
+from journal import ActivityJournal, ingest_file
+from models import UserActivityLog
+
+
+def _record(n):
+    return {'user_id': 1, 'action': f'action{n}', 'category': 'timer', 'ip_address': None, 'user_agent': '',
+            'session_id': '', 'sequence_id': None, 'timer_order': None, 'extra_data': None,
+            'timestamp': datetime(2025, 6, 1, 12, n, tzinfo=timezone.utc)}
+
+
+@pytest.fixture
+def make_journal(app, session, tmp_path, monkeypatch):
+    journals = []
+
+    def make(mode, **config):
+        monkeypatch.setitem(app.config, 'ACTIVITY_JOURNAL', mode)
+        monkeypatch.setitem(app.config, 'ACTIVITY_JOURNAL_FILE', str(tmp_path / 'journal.jsonl'))
+        # Nothing is written before close() unless a test says otherwise
+        monkeypatch.setitem(app.config, 'ACTIVITY_JOURNAL_BATCH', config.get('batch', 1000))
+        monkeypatch.setitem(app.config, 'ACTIVITY_JOURNAL_INTERVAL', config.get('interval', 60))
+        j = ActivityJournal()
+        j.init_app(app)
+        journals.append(j)
+        return j
+
+    yield make
+    for j in journals:
+        j.close()
+
+
+def _actions():
+    return sorted(action for action, in UserActivityLog.query.with_entities(UserActivityLog.action))
+
+
+def test_sync_mode_writes_immediately(make_journal):
+    j = make_journal('sync')
+    j.append(_record(1))
+
+    assert _actions() == ['action1']
+    assert j.stats()['written'] == 1
+
+
+def test_db_mode_close_writes_queued_records(make_journal):
+    j = make_journal('db')
+    for n in range(3):
+        j.append(_record(n))
+    assert _actions() == []
+    assert j.stats()['pending'] >= 1
+
+    assert j.close()
+
+    assert _actions() == ['action0', 'action1', 'action2']
+    assert j.stats()['written'] == 3
+    assert j.close()  # idempotent
+
+
+def test_db_mode_flush(make_journal):
+    j = make_journal('db')
+    j.append(_record(1))
+
+    assert j.flush()
+
+    assert _actions() == ['action1']
+
+
+def test_full_batch_is_written_without_waiting(make_journal):
+    j = make_journal('db', batch=2)
+    for n in range(4):
+        j.append(_record(n))
+
+    deadline = time.monotonic() + 5
+    while len(_actions()) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(_actions()) == 4
+
+
+def test_failed_insert_spills_to_file(make_journal, monkeypatch):
+    insert_records = journal_module.insert_records
+
+    def fail(records, batch_size=500):
+        raise OperationalError('INSERT', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(journal_module, 'insert_records', fail)
+    j = make_journal('db')
+    j.append(_record(1))
+    j.append(_record(2))
+    assert j.close()
+
+    assert _actions() == []
+    assert j.stats()['spilled_to_file'] == 2
+    assert j.stats()['lost'] == 0
+
+    monkeypatch.setattr(journal_module, 'insert_records', insert_records)
+    assert ingest_file(j.path) == (2, 0)
+    assert _actions() == ['action1', 'action2']
+
+
+def test_file_mode_then_ingest(make_journal):
+    j = make_journal('file')
+    j.append(_record(1))
+    assert j.close()
+    assert _actions() == []
+
+    assert ingest_file(j.path) == (1, 0)
+    assert _actions() == ['action1']
+    assert ingest_file(j.path) == (0, 0)
+
+
+def test_unknown_mode_is_rejected(make_journal):
+    with pytest.raises(ValueError):
+        make_journal('carrier-pigeon')
@@ -0,0 +1,144 @@
+"""
+PostgreSQL support (database.py, `flask db-copy`). Tests that need a server
+run only when TEST_DATABASE_URL points at a throwaway PostgreSQL database,
+whose tables they drop and recreate:
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/timerfreak_test python -m pytest tests
+"""
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import DateTime, create_engine, literal, select, text
+
+from database import resolve_database_uri, utc_date, utc_hour
+from models import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PG_URL = os.environ.get('TEST_DATABASE_URL', '')
+needs_postgres = pytest.mark.skipif(
+    not PG_URL.startswith(('postgres://', 'postgresql')),
+    reason='set TEST_DATABASE_URL to a throwaway PostgreSQL database',
+)
+
+# Runs inside the app (DATABASE_URL = the copy) and reports what the checks need
+PROBE = """
+import json, os
+from app import app, browse_page
+client = app.test_client()
+stats = client.get('/admin/stats?token=' + os.environ['ADMIN_STATS_TOKEN'])
+with app.test_request_context('/browse'):
+    items, next_cursor = browse_page(limit=2)
+    trending, _ = browse_page(limit=10, sort='trending')
+    dialect = app.extensions['sqlalchemy'].engine.dialect.name
+print(json.dumps({
+    'dialect': dialect,
+    'stats_status': stats.status_code,
+    'stats_body': stats.get_data(as_text=True),
+    'browse': [(i['name'], i['use_count'], i['timer_count']) for i in items],
+    'next_cursor': next_cursor,
+    'trending': len(trending),
+}))
+"""
+
+
+def test_heroku_style_url_is_rewritten(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://user:pw@db.example/timerfreak')
+    assert resolve_database_uri(ROOT) == 'postgresql://user:pw@db.example/timerfreak'
+
+
+def _target_engine():
+    return create_engine(PG_URL.replace('postgres://', 'postgresql://', 1))
+
+
+def _reset_target():
+    engine = _target_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    db.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def target():
+    _reset_target()
+    yield PG_URL
+    _reset_target()
+
+
+@needs_postgres
+def test_utc_helpers_convert_to_utc():
+    engine = _target_engine()
+    # 00:30 at UTC+2 is 22:30 the day before in UTC
+    when = literal(datetime(2025, 3, 2, 0, 30, tzinfo=timezone(timedelta(hours=2))), DateTime(timezone=True))
+    with engine.connect() as conn:
+        conn.execute(text("SET TIME ZONE 'Asia/Tokyo'"))
+        day, hour = conn.execute(select(utc_date(when), utc_hour(when))).one()
+    engine.dispose()
+    assert str(day) == '2025-03-01'
+    assert hour == 22
+
+
+def _seed_sqlite(path):
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    tables = db.metadata.tables
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    sequences = [
+        {'id': i + 1, 'slug': f'slug{i}', 'name': f'Seq {i}', 'featured': 0, 'is_public': True,
+         'created_at': now - timedelta(days=i), 'start_count': i, 'trending_score': float(i),
+         'loop_default': False}
+        for i in range(3)
+    ]
+    # Sequence i has i + 1 timers and i starts
+    timers = [
+        {'sequence_id': i + 1, 'timer_name': f't{n}', 'duration': 60, 'timer_order': n,
+         'color': '#ffffff', 'alarm_sound': 'bell.mp3'}
+        for i in range(3) for n in range(i + 1)
+    ]
+    logs = [
+        {'sequence_id': i + 1, 'event_type': 'sequence_start', 'timestamp': now - timedelta(hours=n)}
+        for i in range(3) for n in range(i)
+    ]
+    with engine.begin() as conn:
+        conn.execute(tables['sequence'].insert(), sequences)
+        conn.execute(tables['timer'].insert(), timers)
+        conn.execute(tables['counter_log'].insert(), logs)
+    engine.dispose()
+
+
+@needs_postgres
+def test_db_copy_then_serve_from_postgres(tmp_path, target):
+    source = tmp_path / 'source.db'
+    _seed_sqlite(source)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{source}", ADMIN_STATS_TOKEN='test-token')
+
+    copy = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db-copy', '--target', target,
+                           '--batch-size', '2'], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert copy.returncode == 0, copy.stderr
+    assert 'Done: 12 rows' in copy.stdout
+
+    env['DATABASE_URL'] = target
+    env.pop('FLASK_RUN_FROM_CLI', None)
+    probe = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert probe.returncode == 0, probe.stderr
+    report = json.loads(probe.stdout.strip().splitlines()[-1])
+
+    assert report['dialect'] == 'postgresql'
+    assert report['stats_status'] == 200
+    assert 'Seq 2' in report['stats_body']
+    assert report['browse'] == [['Seq 2', 2, 3], ['Seq 1', 1, 2]]
+    assert report['next_cursor']
+    assert report['trending'] == 3
+
+    # Serial sequences were moved past the copied ids
+    engine = _target_engine()
+    with engine.begin() as conn:
+        new_id = conn.execute(text(
+            "INSERT INTO sequence (slug, featured, is_public, start_count, trending_score, loop_default) "
+            "VALUES ('fresh', 0, true, 0, 0, false) RETURNING id")).scalar()
+    engine.dispose()
+    assert new_id == 4
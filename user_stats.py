@@ -0,0 +1,119 @@
+"""
+TimerFreak User Stats
+Copyright (c) 2025 - Pet Martino
+
+This software is licensed under the MIT License.
+See the LICENSE file for more details.
+
+Per-user totals (sequences, timers, starts, last activity) kept in the
+user_stats table so the dashboard and profile read one row instead of
+counting a user's sequences, timers and events on every view. The write
+paths that create sequences or record sequence starts call
+bump_user_stats(), a single-row upsert that commits with the caller; the
+other timer events (pause, timer_end, ...) do not move last_activity, so
+the beacon path stays at one INSERT for them. `flask user-stats-rebuild`
+recomputes every row from the source tables.
+
+sequence_stats() answers per-sequence numbers for many sequences at once.
+"""
+from datetime import datetime, timezone
+
+import click
+from sqlalchemy import case, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, UserStats, Sequence, Timer, CounterLog
+
+_REBUILD_SQL = """
+INSERT INTO user_stats (user_id, sequence_count, timer_count, total_starts, last_activity)
+SELECT u.id,
+       (SELECT COUNT(*) FROM sequence s WHERE s.owner_id = u.id),
+       (SELECT COUNT(*) FROM timer t JOIN sequence s ON s.id = t.sequence_id WHERE s.owner_id = u.id),
+       (SELECT COALESCE(SUM(s.start_count), 0) FROM sequence s WHERE s.owner_id = u.id),
+       (SELECT MAX(c.timestamp) FROM counter_log c JOIN sequence s ON s.id = c.sequence_id
+        WHERE s.owner_id = u.id AND c.event_type = 'sequence_start')
+FROM "user" u
+"""
+
+
+def _insert(values):
+    """INSERT for the app's database; both supported dialects have ON CONFLICT"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(UserStats).values(**values)
+    return sqlite.insert(UserStats).values(**values)
+
+
+def bump_user_stats(user_id, sequences=0, timers=0, starts=0, when=None):
+    """
+    Add to a user's totals and move last_activity forward to `when`
+    (default: now; an older, replayed event leaves it alone). Single
+    upsert that commits with the caller.
+    """
+    if not user_id:
+        return
+    when = when or datetime.now(timezone.utc)
+    values = {'user_id': user_id, 'sequence_count': sequences, 'timer_count': timers,
+              'total_starts': starts, 'last_activity': when}
+    stmt = _insert(values)
+    new = stmt.excluded
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={
+            'sequence_count': UserStats.sequence_count + new.sequence_count,
+            'timer_count': UserStats.timer_count + new.timer_count,
+            'total_starts': UserStats.total_starts + new.total_starts,
+            'last_activity': case(
+                (UserStats.last_activity.is_(None) | (UserStats.last_activity < new.last_activity), new.last_activity),
+                else_=UserStats.last_activity),
+        },
+    ))
+
+
+def get_user_stats(user_id):
+    """The user's UserStats row, or an unsaved all-zero one"""
+    return db.session.get(UserStats, user_id) or UserStats(
+        user_id=user_id, sequence_count=0, timer_count=0, total_starts=0, last_activity=None)
+
+
+def sequence_stats(owner_id, slugs):
+    """
+    {slug: {'timer_count', 'start_count', 'last_activity'}} for those of the
+    public sequence ids (slugs) owned by owner_id, in one query.
+    """
+    if not slugs:
+        return {}
+    timer_count = (select(func.count(Timer.id))
+                   .where(Timer.sequence_id == Sequence.id)
+                   .correlate(Sequence).scalar_subquery())
+    last_activity = (select(func.max(CounterLog.timestamp))
+                     .where(CounterLog.sequence_id == Sequence.id)
+                     .correlate(Sequence).scalar_subquery())
+    rows = db.session.execute(
+        select(Sequence.slug, Sequence.start_count, timer_count, last_activity)
+        .where(Sequence.owner_id == owner_id, Sequence.slug.in_(list(slugs)))
+    )
+    stats = {}
+    for slug, start_count, timers, last in rows:
+        if isinstance(last, str):
+            last = datetime.fromisoformat(last)
+        if last is not None and last.tzinfo is None:
+            last = last.replace(tzinfo=timezone.utc)
+        stats[slug] = {'timer_count': timers, 'start_count': start_count, 'last_activity': last}
+    return stats
+
+
+def rebuild_user_stats():
+    """Recompute user_stats from sequence, timer and counter_log; returns rows written"""
+    db.session.execute(text("DELETE FROM user_stats"))
+    db.session.execute(text(_REBUILD_SQL))
+    db.session.commit()
+    return db.session.query(func.count(UserStats.user_id)).scalar()
+
+
+def register_user_stats_commands(app):
+    """Attach user stats maintenance to the Flask CLI"""
+
+    @app.cli.command('user-stats-rebuild')
+    def user_stats_rebuild():
+        """Recompute every user's dashboard totals from the source tables."""
+        click.echo(f"Rebuilt stats for {rebuild_user_stats()} users.")